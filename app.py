@@ -1,29 +1,45 @@
-from flask import Flask, render_template, request
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, send_file, url_for
+import click
+import hmac
+import io
+import json
 import math
+import os
+import time
 from decimal import Decimal
-from skyfield.api import Loader, EarthSatellite
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from flask import render_template, request
-from tle_utils import tle_to_state_km
-from datetime import datetime, timezone
+from tle_utils import tle_to_state_km, parse_tle_catalog, parse_tle_block, propagate_grid, times_to_jd, TLEParseResult, SATREC_CACHE, BULK_SATREC_CACHE, norad_id, norad_number, as_satrec
+from catalog import iter_tle_lines
+import frames
+from frames import FRAMES
+from conjunction import screen_linear, DEFAULT_WINDOW_S, DEFAULT_STEP_S
+import collision
+import numpy as np
+import screening
+from tle_cache import LRUCache
+from roi_montecarlo import simulate_roi, DEFAULT_TRIALS
+import portfolio
+from roi_grid import GridCache, tornado
+from jobs import JobManager, JOB_TYPES
+import metrics
+import ephemeris
+import passes
+import maneuver
+import assets
+from page_cache import PageCache
+from shared_catalog import CatalogStore
+from catalog import TLECatalog
+from history import History, run_key, tle_epoch
 
 
 app = Flask(__name__)
+metrics.init_app(app)
+assets.init_app(app)
+PAGES = PageCache(app)
+HISTORY = History()
 
 
-def distance(a, b):
-    return ((a[0]-b[0])**2 + (a[1]-b[1])**2 + (a[2]-b[2])**2) ** 0.5
-
-def risk_level(min_dist_km: float) -> str:
-    if min_dist_km < 1:   return "🚨 High"
-    if min_dist_km < 5:   return "⚠️ Medium"
-    return "✅ Low"
-
-
-
-load = Loader('./skycache')
-ts = load.timescale()
-
 
 EXPERIMENT_LIBRARY = {
   "Pharma": {
@@ -116,11 +132,9 @@ SCENARIOS = {
 }
 
 def tle_to_state_vectors(tle1: str, tle2: str):
-    sat = EarthSatellite(tle1.strip(), tle2.strip(), "obj", ts)
-    t = ts.from_datetime(datetime.utcnow().replace(tzinfo=timezone.utc))
-    g = sat.at(t)
-    x, y, z = g.position.km          # km
-    vx, vy, vz = g.velocity.km_per_s # km/s
+    # GCRS state now; same sgp4 + frames path (and Satrec cache) as safety()
+    (x, y, z), (vx, vy, vz) = tle_to_state_km(f"{tle1.strip()}\n{tle2.strip()}",
+                                              when=datetime.now(timezone.utc))
     return x, y, z, vx, vy, vz
 
 # -------- Scenario-aware probabilities --------
@@ -132,28 +146,13 @@ def scenario_probabilities(base_p: float, investment_usd: float):
     base_p: experiment['success_prob'] in [0,1]
     investment_usd: user-entered investment in $
     Returns probabilities for Low/Medium/High in [0,1]
+    (the curve itself lives in portfolio.scenario_probabilities_vec)
     """
-    p = clamp01(float(base_p))
-    # Investment boost: up to +10 pts at $5M+ (tunable)
-    invest_boost = min(investment_usd / 5_000_000.0, 0.10)
-
-    # Spread depends on base probability (tighter if strong base)
-    if p >= 0.75:
-        d_low, d_high = 0.08, 0.05
-    elif p >= 0.55:
-        d_low, d_high = 0.12, 0.10
-    elif p >= 0.35:
-        d_low, d_high = 0.15, 0.12
-    else:
-        d_low, d_high = 0.10, 0.18
-
-    p_low  = clamp01(p - d_low  + 0.30 * invest_boost)
-    p_med  = clamp01(p + 0.60 * invest_boost)
-    p_high = clamp01(p + d_high + 1.00 * invest_boost)
-
-    return {"Low": p_low, "Medium": p_med, "High": p_high}
+    probs = portfolio.scenario_probabilities_vec(float(base_p), float(investment_usd))
+    return {label: float(p) for label, p in probs.items()}
 
 # -------- Core computation (with ROI multiple) --------
+@metrics.timed("compute_roi")
 def compute_roi(experiment: dict, investment: float, scenario_index: int = 1):
     if not experiment:
         return None
@@ -194,6 +193,32 @@ def compute_roi(experiment: dict, investment: float, scenario_index: int = 1):
     }
 
 
+def monte_carlo_roi(experiment: dict, investment: float, trials: int = DEFAULT_TRIALS, seed=None, dist=None):
+    # Scenario multiplier is sampled across Low..High, so success is centred on Medium
+    probs = scenario_probabilities(float(experiment["success_prob"]), float(investment))
+    mults = tuple(float(SCENARIOS[i]["mult"]) for i in (0, 1, 2))
+    return simulate_roi(experiment, investment, success_prob=probs["Medium"],
+                        trials=trials, seed=seed, dist=dist, scenario_mults=mults)
+
+
+# Sensitivity surfaces (built lazily per experiment) and memoised /roi results
+ROI_GRIDS = GridCache(EXPERIMENT_LIBRARY, {v["label"]: float(v["mult"]) for v in SCENARIOS.values()})
+ROI_RESULT_CACHE = LRUCache(maxsize=4096)
+metrics.register_cache("satrec", SATREC_CACHE)
+metrics.register_cache("satrec_bulk", BULK_SATREC_CACHE)
+metrics.register_cache("roi_result", ROI_RESULT_CACHE)
+metrics.register_cache("pages", PAGES)
+
+def cached_roi(field: str, name: str, investment: float, scenario_index: int):
+    def build():
+        experiment = EXPERIMENT_LIBRARY[field][name]
+        result = compute_roi(experiment, investment, scenario_index)
+        result["tornado"] = tornado(experiment, investment, scenario_index, ROI_GRIDS.mults)
+        return result
+    # shallow copy so per-request additions (monte_carlo) never leak into the cache
+    return dict(ROI_RESULT_CACHE.get_or_create((field, name, investment, scenario_index), build))
+
+
 def clamp(v, lo, hi):
     try:
         v = float(v)
@@ -207,7 +232,7 @@ def getf(form, key, default=0.0):
         return float(default)
     try:
         return float(v)
-    except ValueError:
+    except (TypeError, ValueError):      # non-numeric or non-scalar (JSON list / object)
         return float(default)
 
 def total_cost(slot_cost, monthly_ops, ops_months, service_fees):
@@ -247,14 +272,6 @@ def scenarios(benefit, cost, spread_pct):
 def distance(p1, p2):
     return math.sqrt(sum((a - b) ** 2 for a, b in zip(p1, p2)))
 
-def risk_level(d):
-    if d < 1:
-        return "⚠ Very High Risk (Collision Likely)"
-    elif d < 10:
-        return "Medium Risk (Close Approach)"
-    else:
-        return "Safe Distance"
-
 # simple formatters for template (avoid Jinja lambdas)
 def fmt_usd(v): return "${:,.0f}".format(v or 0)
 def fmt_pct(v): return "{:,.1f}%".format((v or 0) * 100)
@@ -262,7 +279,27 @@ def fmt_pct(v): return "{:,.1f}%".format((v or 0) * 100)
 
 @app.route("/")
 def index():
-    return render_template("index.html")
+    return PAGES.render("index.html")
+
+def _maneuver_summary(satellite, debris, tca_s, window_s, sigma_km, hbr_km, rows=6):
+    # cheapest burn that clears MEDIUM_PC plus a thinned fuel / miss-distance front;
+    # linear dynamics over the same window, as screen_linear found the event with
+    try:
+        space = maneuver.evaluate(satellite["position"], satellite["velocity"],
+                                  debris["position"], debris["velocity"], tca_s=tca_s,
+                                  sigma_km=sigma_km, hbr_km=hbr_km, dynamics="linear", window_s=window_s)
+    except ValueError:
+        return None
+    front = space.pareto()
+    if len(front) > rows:
+        front = [front[round(i * (len(front) - 1) / (rows - 1))] for i in range(rows)]
+    cheapest = space.cheapest(max_pc=collision.MEDIUM_PC)
+    return {
+        "candidates": len(space),
+        "baseline_miss_km": space.miss_km,
+        "cheapest": cheapest.to_dict() if cheapest else None,
+        "pareto": [c.to_dict() for c in front],
+    }
 
 @app.route("/safety", methods=["GET","POST"])
 def safety():
@@ -320,33 +357,40 @@ def safety():
         satellite = {"position": [sx, sy, sz], "velocity": [svx, svy, svz]}
         debris    = {"position": [dx, dy, dz], "velocity": [dvx, dvy, dvz]}
 
-        # ---------- Your original calculation (unchanged) ----------
-        min_dist = float("inf")
-        time_of_min = 0
-        collision = False
-
-        for t in range(0, 3600, 60):  # 1 hour, 60 s step
-            sat_pos = [satellite["position"][i] + satellite["velocity"][i]*t for i in range(3)]
-            deb_pos = [debris["position"][i] + debris["velocity"][i]*t for i in range(3)]
-            dist = distance(sat_pos, deb_pos)
-
-            if dist < min_dist:
-                min_dist = dist
-                time_of_min = t
-
-            if dist < 1:
-                collision = True
-                break
-
-        risk_percentage = round(max(0, (10 - min_dist) / 10 * 100), 2)
+        # ---------- Closest approach (vectorized, exact TCA) ----------
+        window_s = clamp(getf(request.form, "window_min", DEFAULT_WINDOW_S / 60), 1, 7 * 24 * 60) * 60
+        step_s = clamp(getf(request.form, "step_s", DEFAULT_STEP_S), 1, 3600)
+        ca = screen_linear(satellite["position"], satellite["velocity"],
+                           debris["position"], debris["velocity"],
+                           window_s=window_s, step_s=step_s)
+        min_dist = ca.miss_km
+        time_of_min = ca.tca_s
+
+        # ---------- Probability of collision (2D encounter plane) ----------
+        sigma_km = clamp(getf(request.form, "sigma_km", collision.DEFAULT_SIGMA_KM), 1e-3, 100)
+        hbr_km = clamp(getf(request.form, "hbr_m", collision.DEFAULT_HBR_KM * 1000), 0.1, 1000) / 1000
+        dv = np.subtract(debris["velocity"], satellite["velocity"])
+        dr = np.subtract(debris["position"], satellite["position"]) + dv * time_of_min
+        if np.any(dv):
+            pc = float(collision.pc_2d(dr, dv, collision.default_covariance(sigma_km) * 2, hbr_km)[0])
+        else:
+            pc = 1.0 if min_dist <= hbr_km else 0.0
 
         result = {
             "min_dist": round(min_dist, 2),
-            "time_of_min": time_of_min / 60,
-            "risk": risk_level(min_dist),
-            "risk_percentage": risk_percentage
+            "time_of_min": round(time_of_min / 60, 2),
+            "pc": pc,
+            "risk": collision.risk_label(pc),
+            "risk_percentage": collision.threat_percent(pc)
         }
 
+        # ---------- Avoidance options when the approach is flagged ----------
+        if pc >= collision.MEDIUM_PC:
+            result["maneuver"] = _maneuver_summary(satellite, debris, time_of_min, window_s, sigma_km, hbr_km)
+
+        _record_safety(sat_tle if sat_derived else "", deb_tle if deb_derived else "",
+                       ca, float(np.linalg.norm(dv)), pc, sigma_km, hbr_km, window_s, step_s)
+
     return render_template("safety.html",
                            result=result,
                            sat_derived=sat_derived,
@@ -354,90 +398,106 @@ def safety():
                            sat_tle_error=sat_tle_error,
                            deb_tle_error=deb_tle_error)
 
+def _record_safety(sat_tle, deb_tle, ca, rel_speed_km_s, pc, sigma_km, hbr_km, window_s, step_s):
+    # TLE input: times count from the satellite TLE epoch; raw state vectors: from now
+    sat = parse_tle_block(sat_tle) if sat_tle else None
+    deb = parse_tle_block(deb_tle) if deb_tle else None
+    HISTORY.record_tles([r for r in (sat, deb) if r])
+    start = tle_epoch(sat.line1) if sat else datetime.now(timezone.utc)
+    event = screening.Conjunction(
+        obj1=(sat.name if sat else None) or "Satellite", obj2=(deb.name if deb else None) or "Debris",
+        tca=start + timedelta(seconds=ca.tca_s), miss_km=ca.miss_km,
+        rel_speed_km_s=rel_speed_km_s, pc=pc,
+        norad1=norad_id(sat.line1) if sat else "", norad2=norad_id(deb.line1) if deb else "")
+    HISTORY.save_run("safety", [event], start=start, hours=window_s / 3600, step_s=step_s,
+                     sigma_km=sigma_km, hbr_km=hbr_km, objects=2)
+
+# Hosted-payload providers shown on /investment (static; rendered once by PAGES)
+INVESTMENT_ITEMS = {
+    "Loft Orbital (YAM / Longbow satellites)": {
+        "Company": "Loft Orbital",
+        "Description": "Provides satellite infrastructure as a service; hosts customer payloads on shared bus architectures (YAM satellites).",
+        "Price": "Not publicly disclosed; subscription / in-orbit service model.",
+        "Duration": "Multi-year missions (payload stays for the life of the satellite).",
+        "Slot capacity / space": "Universal payload interface (Payload Hub) to host multiple sensors; modular system.",
+        "Applications": "Earth observation, sensors, data tasks across industries.",
+        "Short-term feasibility": "❌ Not supported — missions are multi-year only."
+    },
+
+    "Spire Space Services (LEMUR constellation)": {
+        "Company": "Spire Global",
+        "Description": "Operates the LEMUR nanosatellite fleet. Offers hosted payloads and data-as-a-service.",
+        "Price": "Hosted payloads available from 1/3U to 4U (via SatSearch).",
+        "Duration": "Mission-lifetime, typically 3–5 years.",
+        "Slot capacity / space": "4U: 160×97×97 mm, ~30 W | 8U: 220×200×97 mm, ~60 W | 16U: 220×200×200 mm, ~120 W.",
+        "Applications": "Sensors, RF, Earth observation instruments.",
+        "Short-term feasibility": "❌ Not supported — contracts are annual or multi-year."
+    },
+
+    "Rogue Space Systems": {
+        "Company": "Rogue Space Systems",
+        "Description": "Developing spacecraft for on-orbit servicing; offers payload hosting options.",
+        "Price": "Not publicly documented.",
+        "Duration": "Mission-lifetime or negotiated per contract.",
+        "Slot capacity / space": "Not publicly documented.",
+        "Applications": "Sensors, cameras, experiments.",
+        "Short-term feasibility": "⚠ Unclear — early-stage, not designed for very short experiments."
+    },
+
+    "Momentus Space (Vigoride transfer vehicle)": {
+        "Company": "Momentus Space",
+        "Description": "Provides orbital transfer vehicles that can also host payloads in transit.",
+        "Price": "Not publicly disclosed (direct quote required).",
+        "Duration": "Mission-dependent; payload hosted during transfer (weeks to months).",
+        "Slot capacity / space": "Depends on vehicle configuration; modular mounting available.",
+        "Applications": "Hosted experiments, sensors, small payloads in transit.",
+        "Short-term feasibility": "✅ Yes — transfers can last weeks to a few months."
+    },
+
+    "Exolaunch": {
+        "Company": "Exolaunch",
+        "Description": "Provides rideshare deployment and hosted payloads on partner satellites.",
+        "Price": "Variable by mission; not published publicly.",
+        "Duration": "Payload remains for the host satellite’s mission (multi-year).",
+        "Slot capacity / space": "Based on host satellite bus and payload interface.",
+        "Applications": "Sensors, experiments, remote sensing, telecoms.",
+        "Short-term feasibility": "❌ Not supported — payloads fly for full mission duration."
+    },
+
+    "Sidus Space (LizzieSat)": {
+        "Company": "Sidus Space",
+        "Description": "Operates the LizzieSat platform designed to host customer payloads.",
+        "Price": "Not publicly disclosed.",
+        "Duration": "Mission-lifetime (multi-year).",
+        "Slot capacity / space": "Depends on satellite bus design.",
+        "Applications": "Sensors, data collection, small experiments.",
+        "Short-term feasibility": "❌ Not supported — multi-year operation."
+    },
+
+    "Intelsat (Hosted Payloads)": {
+        "Company": "Intelsat",
+        "Description": "GEO/LEO satellite operator; offers hosted payloads for instruments.",
+        "Price": "High (million-dollar scale), negotiated case by case.",
+        "Duration": "Host satellite lifetime (10–15 years for GEO).",
+        "Slot capacity / space": "Varies by available capacity.",
+        "Applications": "Communications, sensors, Earth observation, instruments.",
+        "Short-term feasibility": "❌ Not supported — designed for very long-term commitments."
+    },
+
+    "Satellogic": {
+        "Company": "Satellogic",
+        "Description": "Earth observation constellation operator; offers data and hosted sensors.",
+        "Price": "Not publicly disclosed.",
+        "Duration": "Multi-year (life of each satellite).",
+        "Slot capacity / space": "Depends on bus; not broadly public.",
+        "Applications": "Imaging, sensors, data collection.",
+        "Short-term feasibility": "❌ Not supported — service model is data subscription, not short hosting."
+    }
+}
+
 @app.route('/investment', methods=["GET","POST"])
 def investment():
-    items = {
-        "Loft Orbital (YAM / Longbow satellites)": {
-            "Company": "Loft Orbital",
-            "Description": "Provides satellite infrastructure as a service; hosts customer payloads on shared bus architectures (YAM satellites).",
-            "Price": "Not publicly disclosed; subscription / in-orbit service model.",
-            "Duration": "Multi-year missions (payload stays for the life of the satellite).",
-            "Slot capacity / space": "Universal payload interface (Payload Hub) to host multiple sensors; modular system.",
-            "Applications": "Earth observation, sensors, data tasks across industries.",
-            "Short-term feasibility": "❌ Not supported — missions are multi-year only."
-        },
-
-        "Spire Space Services (LEMUR constellation)": {
-            "Company": "Spire Global",
-            "Description": "Operates the LEMUR nanosatellite fleet. Offers hosted payloads and data-as-a-service.",
-            "Price": "Hosted payloads available from 1/3U to 4U (via SatSearch).",
-            "Duration": "Mission-lifetime, typically 3–5 years.",
-            "Slot capacity / space": "4U: 160×97×97 mm, ~30 W | 8U: 220×200×97 mm, ~60 W | 16U: 220×200×200 mm, ~120 W.",
-            "Applications": "Sensors, RF, Earth observation instruments.",
-            "Short-term feasibility": "❌ Not supported — contracts are annual or multi-year."
-        },
-
-        "Rogue Space Systems": {
-            "Company": "Rogue Space Systems",
-            "Description": "Developing spacecraft for on-orbit servicing; offers payload hosting options.",
-            "Price": "Not publicly documented.",
-            "Duration": "Mission-lifetime or negotiated per contract.",
-            "Slot capacity / space": "Not publicly documented.",
-            "Applications": "Sensors, cameras, experiments.",
-            "Short-term feasibility": "⚠ Unclear — early-stage, not designed for very short experiments."
-        },
-
-        "Momentus Space (Vigoride transfer vehicle)": {
-            "Company": "Momentus Space",
-            "Description": "Provides orbital transfer vehicles that can also host payloads in transit.",
-            "Price": "Not publicly disclosed (direct quote required).",
-            "Duration": "Mission-dependent; payload hosted during transfer (weeks to months).",
-            "Slot capacity / space": "Depends on vehicle configuration; modular mounting available.",
-            "Applications": "Hosted experiments, sensors, small payloads in transit.",
-            "Short-term feasibility": "✅ Yes — transfers can last weeks to a few months."
-        },
-
-        "Exolaunch": {
-            "Company": "Exolaunch",
-            "Description": "Provides rideshare deployment and hosted payloads on partner satellites.",
-            "Price": "Variable by mission; not published publicly.",
-            "Duration": "Payload remains for the host satellite’s mission (multi-year).",
-            "Slot capacity / space": "Based on host satellite bus and payload interface.",
-            "Applications": "Sensors, experiments, remote sensing, telecoms.",
-            "Short-term feasibility": "❌ Not supported — payloads fly for full mission duration."
-        },
-
-        "Sidus Space (LizzieSat)": {
-            "Company": "Sidus Space",
-            "Description": "Operates the LizzieSat platform designed to host customer payloads.",
-            "Price": "Not publicly disclosed.",
-            "Duration": "Mission-lifetime (multi-year).",
-            "Slot capacity / space": "Depends on satellite bus design.",
-            "Applications": "Sensors, data collection, small experiments.",
-            "Short-term feasibility": "❌ Not supported — multi-year operation."
-        },
-
-        "Intelsat (Hosted Payloads)": {
-            "Company": "Intelsat",
-            "Description": "GEO/LEO satellite operator; offers hosted payloads for instruments.",
-            "Price": "High (million-dollar scale), negotiated case by case.",
-            "Duration": "Host satellite lifetime (10–15 years for GEO).",
-            "Slot capacity / space": "Varies by available capacity.",
-            "Applications": "Communications, sensors, Earth observation, instruments.",
-            "Short-term feasibility": "❌ Not supported — designed for very long-term commitments."
-        },
-
-        "Satellogic": {
-            "Company": "Satellogic",
-            "Description": "Earth observation constellation operator; offers data and hosted sensors.",
-            "Price": "Not publicly disclosed.",
-            "Duration": "Multi-year (life of each satellite).",
-            "Slot capacity / space": "Depends on bus; not broadly public.",
-            "Applications": "Imaging, sensors, data collection.",
-            "Short-term feasibility": "❌ Not supported — service model is data subscription, not short hosting."
-        }
-    }
-    return render_template('investment.html', items=items)
+    return PAGES.render('investment.html', items=INVESTMENT_ITEMS)
 
 @app.route("/form", methods=["GET", "POST"])
 def form():
@@ -446,7 +506,7 @@ def form():
 # If this file is run directly:
 @app.route("/education")
 def education():
-    return render_template("education.html")
+    return PAGES.render("education.html")
 
 @app.route("/roi", methods=["GET", "POST"])
 def roi():
@@ -473,7 +533,9 @@ def roi():
             experiment = EXPERIMENT_LIBRARY[field][experiment_name]
 
         if experiment:
-            result = compute_roi(experiment, investment, scenario_index)
+            result = cached_roi(field, experiment_name, investment, scenario_index)
+            if request.form.get("monte_carlo"):
+                result["monte_carlo"] = monte_carlo_roi(experiment, investment)
     return render_template(
         "roi.html",
         data=EXPERIMENT_LIBRARY,
@@ -484,13 +546,66 @@ def roi():
         investment=investment,
         scenario_index=scenario_index,
     )
+@app.post("/api/roi/monte-carlo")
+def api_roi_monte_carlo():
+    body = request.get_json(silent=True) or {}
+    experiment = EXPERIMENT_LIBRARY.get(body.get("field"), {}).get(body.get("experiment"))
+    if not experiment:
+        return jsonify({"ok": False, "error": "Unknown field/experiment."}), 400
+    try:
+        investment = float(str(body.get("investment", 0)).replace(",", ""))
+        trials = int(body.get("trials", DEFAULT_TRIALS))
+        seed = body.get("seed")
+        seed = int(seed) if seed is not None else None
+        dist = {k: float(v) for k, v in (body.get("distributions") or {}).items()}
+        mc = monte_carlo_roi(experiment, investment, trials=trials, seed=seed, dist=dist)
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    return jsonify({"ok": True, **mc}), 200
+
+@app.post("/api/portfolio")
+def api_portfolio():
+    """
+    Efficient frontier across EXPERIMENT_LIBRARY (plus any "experiments" posted
+    as [{"field", "name", "annual_market_impact", "leo_months_saved", "success_prob"}]).
+    """
+    body = request.get_json(silent=True) or {}
+    items = portfolio.flatten_library(EXPERIMENT_LIBRARY)
+    try:
+        for extra in body.get("experiments") or []:
+            exp = {k: float(extra[k]) for k in ("annual_market_impact", "leo_months_saved", "success_prob")}
+            items.append((extra.get("field", "Custom"), extra.get("name", f"Custom {len(items)}"), exp))
+        result = portfolio.optimize(
+            items,
+            budget=float(body.get("budget", 10_000_000)),
+            levels=[float(x) for x in body.get("levels") or portfolio.DEFAULT_LEVELS],
+            objective=body.get("objective", "expected"),
+            solver=body.get("solver", "auto"),
+            scenario_mults={v["label"]: float(v["mult"]) for v in SCENARIOS.values()},
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"ok": False, "error": f"{type(e).__name__}: {e}"}), 400
+    return jsonify({"ok": True, **result}), 200
+
+@app.get("/api/roi/grid")
+def api_roi_grid():
+    # ?field=&experiment=[&format=bin] -> cached sensitivity surface
+    grid = ROI_GRIDS.get(request.args.get("field", ""), request.args.get("experiment", ""))
+    if grid is None:
+        return jsonify({"ok": False, "error": "Unknown field/experiment."}), 404
+    if request.args.get("format") == "bin":
+        shape = ",".join(str(d) for d in grid.roi_percent.shape)
+        return Response(grid.to_bytes(), mimetype="application/octet-stream",
+                        headers={"X-Grid-Shape": shape, "X-Grid-Dtype": "float32-le"})
+    return Response(grid.to_json(), mimetype="application/json")
+
 @app.route("/game")
 def game():
-    return render_template("game.html")
+    return PAGES.render("game.html")
 
 @app.route("/adventure")
 def adventure():
-    return render_template("adventure.html")
+    return PAGES.render("adventure.html")
 
 @app.post("/api/convert-tle")
 def api_convert_tle():
@@ -501,6 +616,7 @@ def api_convert_tle():
         return jsonify({"ok": False, "error": "Missing TLE lines (tle1, tle2)."}), 400
     try:
         x, y, z, vx, vy, vz = tle_to_state_vectors(tle1, tle2)
+        HISTORY.record_tles([TLEParseResult(None, tle1, tle2)])
         return jsonify({
             "ok": True,
             "x": round(x, 3), "y": round(y, 3), "z": round(z, 3),
@@ -510,3 +626,595 @@ def api_convert_tle():
         # Always JSON, never HTML
         return jsonify({"ok": False, "error": f"{type(e).__name__}: {e}"}), 500
 
+CATALOGS = CatalogStore()
+CATALOG_TOKEN = os.environ.get("ORBIO_CATALOG_TOKEN")
+
+@app.get("/api/catalog")
+def api_catalog_info():
+    snap = CATALOGS.current()
+    if snap is None:
+        return jsonify({"ok": False, "error": "No catalog has been published."}), 404
+    return jsonify({"ok": True, **snap.info()}), 200
+
+@app.get("/api/catalog/<norad>")
+def api_catalog_object(norad):
+    snap = CATALOGS.current()
+    try:
+        norad = norad_number(norad)         # "25544", or Alpha-5 "A0001" = 100001
+    except ValueError:
+        return jsonify({"ok": False, "error": "Unknown NORAD ID."}), 404
+    found, _ = snap.find([norad]) if snap else ([], None)
+    if not found:
+        return jsonify({"ok": False, "error": "Unknown NORAD ID."}), 404
+    rec = found[0]
+    return jsonify({"ok": True, "version": snap.version, "norad": norad,
+                    "name": rec.name, "tle1": rec.line1, "tle2": rec.line2}), 200
+
+@app.post("/api/catalog")
+def api_catalog_publish():
+    """
+    Publish a new shared catalog (multipart "catalog" file or JSON {"tles": ...}).
+    Every worker switches to it on its next lookup. Disabled unless
+    ORBIO_CATALOG_TOKEN is set; requests must send it as X-Orbio-Token
+    (`flask publish-catalog` needs no token).
+    """
+    if not CATALOG_TOKEN:
+        return jsonify({"ok": False, "error": "Catalog publishing is disabled (set ORBIO_CATALOG_TOKEN)."}), 403
+    if not hmac.compare_digest(request.headers.get("X-Orbio-Token", "").encode(), CATALOG_TOKEN.encode()):
+        return jsonify({"ok": False, "error": "Forbidden."}), 403
+    body = request.get_json(silent=True) or {}
+    try:
+        snap = CATALOGS.publish(TLECatalog.from_records(_batch_records({**body, "norad": None})))
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    HISTORY.record_tles(snap.catalog)
+    return jsonify({"ok": True, **snap.info()}), 201
+
+def _window_start(raw):
+    # No explicit start: the top of the current UTC hour, so repeat screenings
+    # within the hour share one window (and one stored / cached run).
+    if not raw:
+        return datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    start = datetime.fromisoformat(raw)
+    return start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+
+CATALOG_SCREENS = LRUCache(maxsize=16, ttl_s=None)   # window params -> (version, ScreeningRun)
+
+@app.post("/api/catalog/screen")
+def api_catalog_screen():
+    """
+    Screen the published catalog. JSON {"start", "hours", "step_s", "threshold_km"};
+    start defaults to the top of the current UTC hour. A repeat for the same
+    window after a new publish reuses the previous run: only added / changed
+    objects are re-screened.
+    """
+    params = request.get_json(silent=True) or request.form
+    snap = CATALOGS.current()
+    if snap is None:
+        return jsonify({"ok": False, "error": "No catalog has been published."}), 404
+    try:
+        start = _window_start(params.get("start"))
+        window = (start, getf(params, "hours", screening.DEFAULT_HOURS),
+                  getf(params, "step_s", screening.DEFAULT_STEP_S),
+                  getf(params, "threshold_km", screening.DEFAULT_THRESHOLD_KM))
+        cached = CATALOG_SCREENS.get(window)
+        fresh = not (cached and cached[0] == snap.version)
+        if not fresh:
+            run = cached[1]
+        elif cached:
+            run = screening.rescreen(cached[1], list(snap.catalog))
+        else:
+            run = screening.screen_run(list(snap.catalog), *window)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    CATALOG_SCREENS.put(window, (snap.version, run))
+    if fresh:
+        HISTORY.save_run("catalog", run.events, start=run.start, hours=run.hours, step_s=run.step_s,
+                         threshold_km=run.threshold_km, sigma_km=run.sigma_km, hbr_km=run.hbr_km,
+                         objects=len(run.records), stats=run.stats)
+    return jsonify({
+        "ok": True,
+        "version": snap.version,
+        "objects": len(run.records),
+        "stats": run.stats,
+        "count": len(run.events),
+        "conjunctions": [ev.to_dict() for ev in run.events],
+    }), 200
+
+BATCH_CHUNK = 500   # objects per propagate_grid call / NDJSON flush
+
+def _parse_epochs(raw):
+    if isinstance(raw, str):
+        raw = [x for x in raw.split(",") if x.strip()]
+    out = []
+    for item in raw or []:
+        when = datetime.fromisoformat(str(item).strip())
+        out.append(when if when.tzinfo else when.replace(tzinfo=timezone.utc))
+    return out or [datetime.now(timezone.utc)]
+
+def _batch_records(body):
+    # {"norad": [ids]} selects objects from the published shared catalog
+    if body.get("norad"):
+        return CATALOGS.records(norad_number(x) for x in body["norad"])
+    upload = request.files.get("catalog")
+    if upload:
+        return list(iter_tle_lines(io.TextIOWrapper(upload.stream, encoding="utf-8", errors="replace")))
+    tles = body.get("tles") or []
+    if isinstance(tles, str):           # one pasted catalog, not a list of characters
+        tles = [tles]
+    records = []
+    for item in tles:
+        if isinstance(item, dict):
+            records.append(TLEParseResult(name=item.get("name"),
+                                          line1=(item.get("tle1") or "").strip(),
+                                          line2=(item.get("tle2") or "").strip()))
+        else:
+            records.extend(parse_tle_catalog(str(item)) or [parse_tle_block(str(item))])
+    return records
+
+@app.post("/api/convert-tle/batch")
+def api_convert_tle_batch():
+    """
+    Many TLEs x many epochs in one call, streamed back as NDJSON (one object per line).
+    Body: JSON {"tles": [text | {"tle1","tle2","name"}], "epochs": [iso, ...]},
+          a bare JSON array of TLEs (same as {"tles": [...]}, at the current epoch)
+          or multipart with a "catalog" file and optional comma-separated "epochs".
+    Optional "frame": gcrs (default), itrs or teme; see tle_utils.tle_to_state_km.
+    An element set that SGP4 cannot initialise fails only its own row.
+    """
+    body = request.get_json(silent=True) or {}
+    if isinstance(body, list):
+        body = {"tles": body}
+    elif not isinstance(body, dict):
+        return jsonify({"ok": False, "error": "Body must be a JSON object or an array of TLEs."}), 400
+    try:
+        epochs = _parse_epochs(body.get("epochs") or request.form.get("epochs"))
+        records = _batch_records(body)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    if not records:
+        return jsonify({"ok": False, "error": "No TLEs supplied."}), 400
+    if not body.get("norad"):   # shared-catalog objects were recorded when it was published
+        HISTORY.record_tles(records)
+    frame = body.get("frame") or request.form.get("frame") or "gcrs"
+    if frame not in FRAMES:
+        return jsonify({"ok": False, "error": f"frame must be one of {FRAMES}."}), 400
+    jd, fr = times_to_jd(epochs)
+    stamps = [t.isoformat() for t in epochs]
+
+    def generate():
+        for start in range(0, len(records), BATCH_CHUNK):
+            chunk = records[start:start + BATCH_CHUNK]
+            # initialise per record so one bad element set cannot fail its chunk
+            sats, good, errors = [], [], {}
+            for k, rec in enumerate(chunk):
+                try:
+                    sats.append(as_satrec(rec))
+                    good.append(k)
+                except Exception as e:
+                    errors[k] = f"{type(e).__name__}: {e}"
+            try:
+                r, v = propagate_grid(sats, (jd, fr), frame=frame) if sats else (None, None)
+            except Exception as e:
+                errors.update((k, f"{type(e).__name__}: {e}") for k in good)
+                good = []
+            row_of = {k: n for n, k in enumerate(good)}
+            lines = []
+            for k, rec in enumerate(chunk):
+                if k not in row_of:
+                    lines.append(json.dumps({"i": start + k, "ok": False, "error": errors[k]}))
+                    continue
+                m = row_of[k]
+                states = [
+                    {"t": stamps[n],
+                     "x": round(float(r[m, n, 0]), 3), "y": round(float(r[m, n, 1]), 3), "z": round(float(r[m, n, 2]), 3),
+                     "vx": round(float(v[m, n, 0]), 4), "vy": round(float(v[m, n, 1]), 4), "vz": round(float(v[m, n, 2]), 4)}
+                    for n in range(len(stamps)) if r[m, n, 0] == r[m, n, 0]  # NaN = SGP4 error
+                ]
+                row = {"i": start + k, "name": rec.name, "norad": rec.line1[2:7].strip(),
+                       "ok": bool(states), "states": states}
+                if len(states) < len(stamps):
+                    row["error"] = f"SGP4 failed at {len(stamps) - len(states)} epoch(s)"
+                lines.append(json.dumps(row, ensure_ascii=False))
+            yield "\n".join(lines) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.post("/api/ephemeris")
+def api_ephemeris():
+    """
+    Time series for many objects, for the globe view.
+    Body: JSON {"tles": [...], "start": iso, "hours", "step_s", "frame",
+                "fields": "r"|"rv", "layout": "time"|"object", "max_points",
+                "format": "bin"|"npy"|"json"} or multipart with a "catalog" file.
+    bin/npy are float32; shape, step and start come back in X-Ephemeris-* headers.
+    The step may be coarsened to respect max_points (see ephemeris.plan_step);
+    json is capped at ephemeris.MAX_JSON_SAMPLES object-epochs, bin/npy at MAX_SAMPLES.
+    """
+    body = request.get_json(silent=True) or {}
+    params = body or request.form
+    fmt = params.get("format") or request.args.get("format") or "bin"
+    if fmt not in ("bin", "npy", "json"):
+        return jsonify({"ok": False, "error": "format must be 'bin', 'npy' or 'json'."}), 400
+    frame = params.get("frame") or "gcrs"
+    if frame not in FRAMES:
+        return jsonify({"ok": False, "error": f"frame must be one of {FRAMES}."}), 400
+    try:
+        start = params.get("start")
+        eph = ephemeris.compute(
+            _batch_records(body),
+            start=datetime.fromisoformat(start) if start else None,
+            hours=getf(params, "hours", ephemeris.DEFAULT_HOURS),
+            step_s=getf(params, "step_s", ephemeris.DEFAULT_STEP_S),
+            frame=frame,
+            fields=params.get("fields") or "r",
+            layout=params.get("layout") or "time",
+            max_points=int(getf(params, "max_points", ephemeris.DEFAULT_MAX_POINTS)),
+            max_samples=ephemeris.MAX_JSON_SAMPLES if fmt == "json" else ephemeris.MAX_SAMPLES,
+        )
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    if fmt == "json":
+        return jsonify({"ok": True, **eph.to_json()}), 200
+    if fmt == "npy":
+        return Response(eph.to_npy(), mimetype="application/octet-stream", headers={
+            **eph.headers(), "Content-Disposition": "attachment; filename=ephemeris.npy"})
+    return Response(eph.to_bytes(), mimetype="application/octet-stream", headers=eph.headers())
+
+def _stations(raw):
+    out = []
+    for i, item in enumerate(raw or []):
+        if not isinstance(item, dict):
+            raise ValueError("stations must be objects with lat / lon.")
+        try:
+            out.append(passes.Station(name=str(item.get("name") or f"station-{i + 1}"),
+                                      lat_deg=float(item["lat"]), lon_deg=float(item["lon"]),
+                                      alt_km=float(item.get("alt_km") or 0.0),
+                                      min_el_deg=float(item.get("min_el", passes.DEFAULT_MIN_EL_DEG))))
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Station {i + 1}: missing or invalid {e}.")
+    return out
+
+@app.post("/api/passes")
+def api_passes():
+    """
+    Ground-station passes. Body: JSON {"tles": [...] | "norad": [...],
+      "stations": [{"name", "lat", "lon", "alt_km", "min_el"}],
+      "start": iso, "days", "step_s", "profile": bool}.
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        start = body.get("start")
+        found = passes.predict(
+            _batch_records(body),
+            _stations(body.get("stations")),
+            start=datetime.fromisoformat(start) if start else None,
+            days=getf(body, "days", passes.DEFAULT_DAYS),
+            step_s=getf(body, "step_s", passes.DEFAULT_STEP_S),
+            profile=bool(body.get("profile")),
+        )
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    return jsonify({"ok": True, "count": len(found), "passes": [p.to_dict() for p in found]}), 200
+
+def _state(body, key, when):
+    # {"<key>": {"position": [..], "velocity": [..]}} or "<key>_tle" propagated to `when`
+    tle = (body.get(f"{key}_tle") or "").strip()
+    if tle:
+        return tle_to_state_km(tle, when=when)
+    item = body.get(key) or {}
+    try:
+        r = [float(x) for x in item["position"]]
+        v = [float(x) for x in item["velocity"]]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"{key}: position / velocity (km, km/s) or {key}_tle required ({e}).")
+    if len(r) != 3 or len(v) != 3:
+        raise ValueError(f"{key}: position and velocity need 3 components.")
+    return r, v
+
+@app.post("/api/maneuver")
+def api_maneuver():
+    """
+    Avoidance-maneuver trade space for one conjunction (see maneuver.evaluate).
+    Body: JSON {"sat": {"position", "velocity"} | "sat_tle", "deb": ... | "deb_tle",
+      "epoch": iso (TLE states; default now), "tca_s" (else searched over "window_s"),
+      "magnitudes_m_s", "directions": [[r, t, n], ...], "leads_s", "sigma_km", "hbr_km",
+      "dynamics": "kepler" (default) | "linear"}.
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        epoch = body.get("epoch")
+        epoch = datetime.fromisoformat(epoch) if epoch else datetime.now(timezone.utc)
+        r1, v1 = _state(body, "sat", epoch)
+        r2, v2 = _state(body, "deb", epoch)
+        tca_s = body.get("tca_s")
+        if tca_s is None:
+            tca_s, _ = maneuver.find_tca(r1, v1, r2, v2, getf(body, "window_s", DEFAULT_WINDOW_S))
+        kwargs = {k: body[k] for k in ("magnitudes_m_s", "directions", "leads_s", "dynamics") if body.get(k)}
+        space = maneuver.evaluate(
+            r1, v1, r2, v2, float(tca_s),
+            sigma_km=getf(body, "sigma_km", collision.DEFAULT_SIGMA_KM),
+            hbr_km=getf(body, "hbr_km", collision.DEFAULT_HBR_KM),
+            **kwargs,
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    cheapest = space.cheapest(max_pc=collision.MEDIUM_PC)
+    return jsonify({"ok": True, **space.to_dict(),
+                    "cheapest": cheapest.to_dict() if cheapest else None}), 200
+
+MAX_MC_SAMPLES = 2_000_000   # per /api/pc request, split across its events
+
+@app.post("/api/pc")
+def api_pc():
+    """
+    Batch Pc. Body: {"events": [{"dr": [..], "dv": [..]} or {"r1","v1","r2","v2"},
+                                 optional "cov" (combined) or "cov1"/"cov2" (3x3 km^2),
+                                 "sigma_km", "hbr_km"}],
+                     "method": "2d" | "mc", "samples"}
+    dr/r1/r2 should be at TCA; r/v pairs are reduced to TCA with linear motion first.
+    """
+    body = request.get_json(silent=True) or {}
+    events = body.get("events") or []
+    if not events:
+        return jsonify({"ok": False, "error": "No events supplied."}), 400
+    try:
+        n = len(events)
+        dr, dv, cov, hbr = np.empty((n, 3)), np.empty((n, 3)), np.empty((n, 3, 3)), np.empty(n)
+        for k, ev in enumerate(events):
+            if "dr" in ev:
+                dr[k], dv[k] = ev["dr"], ev["dv"]
+            else:
+                dv[k] = np.subtract(ev["v2"], ev["v1"])
+                dr0 = np.subtract(ev["r2"], ev["r1"])
+                dv2 = float(dv[k] @ dv[k])
+                dr[k] = dr0 - dv[k] * (float(dr0 @ dv[k]) / dv2 if dv2 else 0.0)
+            if "cov" in ev:
+                cov[k] = ev["cov"]
+            elif "cov1" in ev or "cov2" in ev:
+                sigma = collision.DEFAULT_SIGMA_KM
+                cov[k] = np.add(ev.get("cov1", np.eye(3) * sigma ** 2), ev.get("cov2", np.eye(3) * sigma ** 2))
+            else:
+                cov[k] = collision.default_covariance(float(ev.get("sigma_km", collision.DEFAULT_SIGMA_KM)))[0] * 2
+            hbr[k] = float(ev.get("hbr_km", collision.DEFAULT_HBR_KM))
+        if not np.all(np.linalg.norm(dv, axis=1) > 0):
+            raise ValueError("Relative velocity must be non-zero.")
+        # Monte Carlo draws are (samples, 3) per event: bound the whole request
+        samples = int(clamp(int(body.get("samples", 200_000)), 1_000, max(1_000, MAX_MC_SAMPLES // n)))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"ok": False, "error": f"{type(e).__name__}: {e}"}), 400
+
+    if body.get("method") == "mc":
+        out = [collision.pc_monte_carlo(dr[k], dv[k], cov[k], hbr[k], samples=samples) for k in range(n)]
+        pcs, errs = [p for p, _ in out], [e for _, e in out]
+    else:
+        pcs, errs = collision.pc_2d(dr, dv, cov, hbr).tolist(), None
+    return jsonify({
+        "ok": True,
+        "pc": pcs,
+        "std_err": errs,
+        "risk": [collision.risk_label(p) for p in pcs],
+    }), 200
+
+@app.post("/api/screen")
+def api_screen():
+    # Catalog as uploaded file ("catalog"), JSON {"tles": text | [blocks]} or form text.
+    # A repeat of a stored run (same catalog and window; start defaults to the top of the
+    # current UTC hour) is served from HISTORY.
+    body = request.get_json(silent=True) or {}
+    params = body or request.form
+    upload = request.files.get("catalog")
+    tles = body.get("tles") or request.form.get("tles") or ""
+    if upload:
+        tles = upload.read().decode("utf-8", errors="replace")
+    if isinstance(tles, list):
+        tles = "\n".join(tles)
+    try:
+        catalog = parse_tle_catalog(tles)
+        start = _window_start(params.get("start"))
+        window = dict(start=start,
+                      hours=getf(params, "hours", screening.DEFAULT_HOURS),
+                      step_s=getf(params, "step_s", screening.DEFAULT_STEP_S),
+                      threshold_km=getf(params, "threshold_km", screening.DEFAULT_THRESHOLD_KM))
+        key = run_key(catalog, sigma_km=collision.DEFAULT_SIGMA_KM, hbr_km=collision.DEFAULT_HBR_KM, **window)
+        stored = HISTORY.find_run(key)
+        if stored:
+            events = stored[1]
+        else:
+            events = screening.screen_catalog(catalog, **window)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    if not stored:
+        HISTORY.record_tles(catalog)
+        HISTORY.save_run("screen", events, key, sigma_km=collision.DEFAULT_SIGMA_KM,
+                         hbr_km=collision.DEFAULT_HBR_KM, objects=len(catalog), **window)
+    return jsonify({
+        "ok": True,
+        "objects": len(catalog),
+        "cached": bool(stored),
+        "count": len(events),
+        "conjunctions": [ev.to_dict() for ev in events],
+    }), 200
+
+@app.get("/api/history/events")
+def api_history_events():
+    """
+    Stored conjunctions for one object: ?norad=25544[&start=iso][&hours=72][&all=1].
+    By default only the newest prediction for each object pair is returned.
+    """
+    norad = (request.args.get("norad") or "").strip()
+    if not norad:
+        return jsonify({"ok": False, "error": "Missing norad."}), 400
+    try:
+        start = request.args.get("start")
+        start = datetime.fromisoformat(start) if start else None
+        hours = clamp(getf(request.args, "hours", 72.0), 0, 24 * 366)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    events = HISTORY.events_for(norad, start, hours, latest=request.args.get("all") not in ("1", "true"))
+    return jsonify({"ok": True, "norad": norad, "count": len(events),
+                    "conjunctions": [ev.to_dict() for ev in events]}), 200
+
+@app.get("/api/history/tle/<norad>")
+def api_history_tle(norad):
+    return jsonify({"ok": True, "norad": norad, "elements": HISTORY.tle_history(norad)}), 200
+
+@app.get("/api/history/runs")
+def api_history_runs():
+    runs = HISTORY.runs(int(clamp(getf(request.args, "limit", 50), 1, 1000)), request.args.get("kind"))
+    return jsonify({"ok": True, "runs": runs, **HISTORY.stats()}), 200
+
+JOBS = JobManager()
+
+def _job_or_404(job_id):
+    job = JOBS.get(job_id)
+    if job is None:
+        return None, (jsonify({"ok": False, "error": "Unknown job."}), 404)
+    return job, None
+
+def _chunk_payload(job, k, path):
+    if job.type == "screen":
+        with open(path, encoding="utf-8") as fh:
+            return {"chunk": k, "conjunctions": json.load(fh)}
+    return {"chunk": k, "url": url_for("api_job_chunk", job_id=job.id, k=k)}
+
+@app.post("/api/jobs")
+def api_jobs_submit():
+    """
+    Queue a long run on the process pool; poll /api/jobs/<id> for progress.
+    Body (JSON or multipart with a "catalog" file):
+      {"type": "screen", "tles": ..., "start", "hours", "step_s", "threshold_km", "chunk_hours"}
+      {"type": "propagate", "tles": ..., "epochs": [iso, ...], "frame", "chunk_objects"}
+    """
+    body = request.get_json(silent=True) or {}
+    params = body or request.form
+    kind = params.get("type", "screen")
+    if kind not in JOB_TYPES:
+        return jsonify({"ok": False, "error": f"type must be one of {JOB_TYPES}."}), 400
+    if not body and request.form.get("tles"):
+        body = {"tles": request.form["tles"]}
+    try:
+        records = _batch_records(body)
+        tles = [(rec.name, rec.line1, rec.line2) for rec in records]
+        if kind == "screen":
+            start = params.get("start")
+            job = JOBS.submit_screen(
+                tles,
+                start=datetime.fromisoformat(start) if start else None,
+                hours=getf(params, "hours", screening.DEFAULT_HOURS),
+                step_s=getf(params, "step_s", screening.DEFAULT_STEP_S),
+                threshold_km=getf(params, "threshold_km", screening.DEFAULT_THRESHOLD_KM),
+                chunk_hours=getf(params, "chunk_hours", 0.0) or None,
+            )
+        else:
+            frame = params.get("frame") or "gcrs"
+            if frame not in FRAMES:
+                raise ValueError(f"frame must be one of {FRAMES}.")
+            jd, fr = times_to_jd(_parse_epochs(params.get("epochs")))
+            job = JOBS.submit_propagate(tles, jd, fr, frame=frame,
+                                        chunk_objects=int(getf(params, "chunk_objects", 2000)) or 2000)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    return jsonify({"ok": True, **job.to_dict()}), 202
+
+@app.get("/api/jobs")
+def api_jobs_list():
+    return jsonify({"ok": True, "jobs": [job.to_dict() for job in JOBS.list()]}), 200
+
+@app.get("/api/jobs/<job_id>")
+def api_job_status(job_id):
+    job, err = _job_or_404(job_id)
+    if err:
+        return err
+    return jsonify({"ok": True, **job.to_dict()}), 200
+
+@app.get("/api/jobs/<job_id>/results")
+def api_job_results(job_id):
+    # Whatever has finished so far; "partial" stays true until every chunk is in
+    job, err = _job_or_404(job_id)
+    if err:
+        return err
+    out = {"ok": True, **job.to_dict(), "partial": job.status != "done"}
+    if job.type == "screen":
+        events = JOBS.screen_results(job)
+        out.update(count=len(events), conjunctions=events)
+    else:
+        out["chunks"] = [_chunk_payload(job, k, p) for k, p in enumerate(job.chunks) if job.done[k]]
+    return jsonify(out), 200
+
+@app.get("/api/jobs/<job_id>/stream")
+def api_job_stream(job_id):
+    # NDJSON: one line per chunk as it finishes, then a final status line
+    job, err = _job_or_404(job_id)
+    if err:
+        return err
+
+    def generate():
+        for k, path in JOBS.iter_chunks(job):
+            yield json.dumps(_chunk_payload(job, k, path), ensure_ascii=False) + "\n"
+        yield json.dumps({"done": True, **(JOBS.get(job.id) or job).to_dict()}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.get("/api/jobs/<job_id>/chunks/<int:k>")
+def api_job_chunk(job_id, k):
+    job, err = _job_or_404(job_id)
+    if err:
+        return err
+    if not (0 <= k < len(job.chunks)) or not job.done[k]:
+        return jsonify({"ok": False, "error": "Chunk not ready."}), 404
+    return send_file(job.chunks[k], as_attachment=True, download_name=f"{job.id}-{k:04d}.{job.chunks[k].rsplit('.', 1)[-1]}")
+
+@app.delete("/api/jobs/<job_id>")
+def api_job_cancel(job_id):
+    # Cancels queued chunks; ?purge=1 also drops the job and its spill directory
+    purge = request.args.get("purge") in ("1", "true")
+    ok = JOBS.delete(job_id) if purge else JOBS.cancel(job_id)
+    if not ok:
+        return jsonify({"ok": False, "error": "Unknown job."}), 404
+    return jsonify({"ok": True, "id": job_id, "purged": purge}), 200
+
+def warm(years=None) -> dict:
+    """
+    Build the on-disk / in-memory caches a worker would otherwise fill on its
+    first requests: TEME frame tables (skyfield is only imported if a year is
+    missing from ORBIO_SKYCACHE) and the ROI sensitivity grids. Safe to run
+    at deploy time or before forking workers.
+    """
+    now = datetime.now(timezone.utc).year
+    years = list(years or (now - 1, now, now + 1))
+    frames.warm(years)
+    grids = ROI_GRIDS.warm()
+    for field, exps in EXPERIMENT_LIBRARY.items():
+        for name in exps:
+            ROI_GRIDS.get(field, name).to_json()
+    return {"frame_years": years, "roi_grids": grids}
+
+@app.cli.command("warm")
+@click.option("--years", default="", help="comma-separated years for the frame tables (default: last, this, next)")
+def warm_command(years):
+    """Pre-build frame tables and ROI grids: flask --app app warm"""
+    t0 = time.perf_counter()
+    out = warm([int(y) for y in years.split(",") if y.strip()] or None)
+    click.echo(json.dumps({**out, "seconds": round(time.perf_counter() - t0, 3)}))
+
+@app.cli.command("assets")
+def assets_command():
+    """Build resized / fingerprinted static assets: flask --app app assets"""
+    manifest = assets.build()
+    click.echo(json.dumps({"assets": len(manifest), "dist": assets.DIST_DIR}))
+
+@app.cli.command("publish-catalog")
+@click.argument("path")
+def publish_catalog_command(path):
+    """Publish a 2LE/3LE, OMM or .npy catalog to ORBIO_CATALOG_DIR for all workers."""
+    snap = CATALOGS.publish(TLECatalog.from_file(path))
+    HISTORY.record_tles(snap.catalog)
+    click.echo(json.dumps(snap.info()))
+
+@app.cli.command("prune-history")
+@click.option("--days", default=30.0, help="delete screening runs (and their events) older than this")
+def prune_history_command(days):
+    """Trim the conjunction history in ORBIO_DB: flask --app app prune-history --days 30"""
+    deleted = HISTORY.prune(datetime.now(timezone.utc) - timedelta(days=days))
+    click.echo(json.dumps({"runs_deleted": deleted, **HISTORY.stats()}))
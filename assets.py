@@ -0,0 +1,221 @@
+# assets.py
+"""
+Static asset build + serving helpers.
+
+    python assets.py build            # or: flask --app app assets
+
+Build (needs Pillow; AVIF needs Pillow >= 11.2 built with libavif):
+- every static/img/*.jpg|png -> resized WebP / AVIF variants at WIDTHS plus a
+  recompressed fallback in the original format, all with content-hashed names;
+- static/css/*.css -> fingerprinted copy + precompressed .gz (and .br when the
+  brotli module is installed);
+- static/dist/manifest.json maps "img/about.jpg" to all of the above.
+  Unchanged sources are skipped on rebuild.
+
+Serving: init_app(app) adds /assets/<file> (immutable, one-year Cache-Control,
+.br/.gz negotiated from Accept-Encoding) and the Jinja helpers asset_url(),
+srcset() and picture(). Without a manifest they fall back to plain /static
+URLs, so templates work before the first build.
+"""
+from __future__ import annotations
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Sequence
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DIST_DIR = os.environ.get("ORBIO_ASSETS_DIR", os.path.join(STATIC_DIR, "dist"))
+MANIFEST = "manifest.json"
+WIDTHS = (480, 960, 1600)
+MAX_WIDTH = 2400                       # fallback image is capped here
+FORMATS = ("avif", "webp")             # <source> order: best first
+QUALITY = {"avif": 55, "webp": 78, "jpeg": 82}
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+PRECOMPRESS_EXTS = (".css", ".js", ".svg")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+def _digest(data: bytes, n: int = 10) -> str:
+    return hashlib.sha256(data).hexdigest()[:n]
+
+def _write(rel: str, data: bytes, dist: str) -> str:
+    path = os.path.join(dist, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path):           # content-addressed: same name, same bytes
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    return rel
+
+def _fingerprinted(rel: str, data: bytes, suffix: str = "") -> str:
+    stem, ext = os.path.splitext(rel)
+    return f"{stem}{suffix}.{_digest(data)}{ext}"
+
+# -------- build --------
+def _encode(img, fmt: str) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "jpeg":
+        img.convert("RGB").save(buf, "JPEG", quality=QUALITY["jpeg"], optimize=True, progressive=True)
+    elif fmt == "png":
+        img.save(buf, "PNG", optimize=True)
+    else:
+        img.save(buf, fmt.upper(), quality=QUALITY[fmt])
+    return buf.getvalue()
+
+def _supported_formats() -> List[str]:
+    from PIL import features
+    return [f for f in FORMATS if features.check(f)]
+
+def build_image(rel: str, src: bytes, dist: str, formats: Sequence[str], widths: Sequence[int] = WIDTHS) -> dict:
+    from PIL import Image, ImageOps
+    img = ImageOps.exif_transpose(Image.open(io.BytesIO(src)))
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+    w0, h0 = img.size
+    targets = sorted({w for w in widths if w < w0} | {min(w0, MAX_WIDTH)})
+    resized = {w: img if w == w0 else img.resize((w, round(h0 * w / w0)), Image.LANCZOS) for w in targets}
+
+    variants: Dict[str, List[dict]] = {}
+    for fmt in formats:
+        variants[fmt] = []
+        for w, im in resized.items():
+            data = _encode(im, fmt)
+            name = _fingerprinted(os.path.splitext(rel)[0] + f".{fmt}", data, f".{w}")
+            variants[fmt].append({"w": w, "path": _write(name, data, dist), "bytes": len(data)})
+
+    top = resized[targets[-1]]
+    fallback_fmt = "png" if rel.lower().endswith(".png") else "jpeg"
+    data = _encode(top, fallback_fmt)
+    fallback = _write(_fingerprinted(rel, data), data, dist)
+    return {"src": fallback, "width": top.size[0], "height": top.size[1],
+            "variants": variants, "source_bytes": len(src), "fallback_bytes": len(data)}
+
+def build_text(rel: str, src: bytes, dist: str) -> dict:
+    name = _write(_fingerprinted(rel, src), src, dist)
+    out = {"src": name, "encodings": []}
+    _write(name + ".gz", gzip.compress(src, compresslevel=9, mtime=0), dist)
+    out["encodings"].append("gzip")
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    if brotli is not None:
+        _write(name + ".br", brotli.compress(src, quality=11), dist)
+        out["encodings"].append("br")
+    return out
+
+def build(static_dir: str = STATIC_DIR, dist: str = DIST_DIR, log=sys.stderr) -> dict:
+    """(Re)build dist/ and its manifest; returns the manifest."""
+    old = load_manifest(dist)
+    formats = _supported_formats()
+    manifest: Dict[str, dict] = {}
+    for sub, exts in (("img", IMAGE_EXTS), ("css", PRECOMPRESS_EXTS), ("js", PRECOMPRESS_EXTS)):
+        folder = os.path.join(static_dir, sub)
+        if not os.path.isdir(folder):
+            continue
+        for fname in sorted(os.listdir(folder)):
+            if not fname.lower().endswith(exts):
+                continue
+            rel = f"{sub}/{fname}"
+            with open(os.path.join(folder, fname), "rb") as fh:
+                src = fh.read()
+            sha = _digest(src, 16)
+            prev = old.get(rel)
+            if prev and prev.get("sha") == sha and prev.get("formats", formats) == formats \
+                    and os.path.exists(os.path.join(dist, prev["src"])):
+                manifest[rel] = prev
+                continue
+            entry = build_image(rel, src, dist, formats) if sub == "img" else build_text(rel, src, dist)
+            entry["sha"] = sha
+            if sub == "img":
+                entry["formats"] = formats
+            manifest[rel] = entry
+            if log:
+                print(f"{rel}: {len(src):,} B -> {entry['src']}", file=log)
+    os.makedirs(dist, exist_ok=True)
+    tmp = os.path.join(dist, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(dist, MANIFEST))
+    return manifest
+
+def load_manifest(dist: str = DIST_DIR) -> Dict[str, dict]:
+    try:
+        with open(os.path.join(dist, MANIFEST), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+# -------- Flask wiring --------
+def init_app(app, dist: str = DIST_DIR) -> None:
+    from flask import request, send_from_directory, url_for
+    from markupsafe import Markup, escape
+
+    manifest = load_manifest(dist)
+    mimetypes = {".css": "text/css", ".js": "text/javascript", ".svg": "image/svg+xml"}
+
+    @app.get("/assets/<path:filename>")
+    def asset(filename):
+        ext = os.path.splitext(filename)[1].lower()
+        accept = request.headers.get("Accept-Encoding", "")
+        if ext in PRECOMPRESS_EXTS:
+            for enc, suffix in (("br", ".br"), ("gzip", ".gz")):
+                if enc in accept and os.path.exists(os.path.join(dist, filename + suffix)):
+                    resp = send_from_directory(dist, filename + suffix, mimetype=mimetypes[ext], max_age=31536000)
+                    resp.headers["Content-Encoding"] = enc
+                    break
+            else:
+                resp = send_from_directory(dist, filename, max_age=31536000)
+            resp.headers["Vary"] = "Accept-Encoding"
+        else:
+            resp = send_from_directory(dist, filename, max_age=31536000)
+        resp.headers["Cache-Control"] = IMMUTABLE
+        return resp
+
+    def asset_url(path: str) -> str:
+        entry = manifest.get(path)
+        if entry:
+            return url_for("asset", filename=entry["src"])
+        return url_for("static", filename=path)
+
+    def srcset(path: str, fmt: Optional[str] = None) -> str:
+        entry = manifest.get(path)
+        if not entry or not entry.get("variants"):
+            return ""
+        fmt = fmt or next(iter(entry["variants"]), None)
+        return ", ".join(f"{url_for('asset', filename=v['path'])} {v['w']}w"
+                         for v in entry["variants"].get(fmt, []))
+
+    def picture(path: str, alt: str = "", sizes: str = "100vw", **attrs) -> Markup:
+        """<picture> with AVIF/WebP sources when built; a lazy <img> otherwise."""
+        entry = manifest.get(path) or {}
+        attrs.setdefault("loading", "lazy")
+        attrs.setdefault("decoding", "async")
+        if entry.get("width") and "width" not in attrs and "height" not in attrs:
+            attrs["width"], attrs["height"] = entry["width"], entry["height"]
+        img_attrs = " ".join(f'{escape(k.rstrip("_").replace("_", "-"))}="{escape(v)}"' for k, v in attrs.items())
+        img = f'<img src="{escape(asset_url(path))}" alt="{escape(alt)}" {img_attrs}>'
+        sources = "".join(
+            f'<source type="image/{fmt}" srcset="{escape(srcset(path, fmt))}" sizes="{escape(sizes)}">'
+            for fmt in entry.get("variants", {}) if entry["variants"][fmt]
+        )
+        return Markup(f"<picture>{sources}{img}</picture>" if sources else img)
+
+    app.jinja_env.globals.update(asset_url=asset_url, srcset=srcset, picture=picture)
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Build fingerprinted / resized static assets.")
+    ap.add_argument("command", choices=["build"])
+    ap.add_argument("--static", default=STATIC_DIR)
+    ap.add_argument("--dist", default=DIST_DIR)
+    args = ap.parse_args(argv)
+    manifest = build(args.static, args.dist)
+    print(json.dumps({"assets": len(manifest), "dist": args.dist}))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+# bench.py
+"""
+Reproducible micro/route benchmarks for the TLE, safety and ROI hot paths.
+
+    python bench.py -o bench.json                  # record
+    python bench.py --baseline bench.json          # compare, exit 1 on regression
+    python bench.py --sizes 10,1000 --filter route
+
+Catalogs are synthetic (seeded, valid checksums) at 10 / 1k / 20k objects.
+Each case reports min / median / mean seconds per call over several repeats;
+the baseline comparison uses the median.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from catalog import tle_checksum
+
+DEFAULT_SIZES = (10, 1_000, 20_000)
+DEFAULT_TOLERANCE = 0.10      # median slower than baseline by more than this = regression
+MIN_REPEAT_S = 0.2            # target wall time of one repeat
+REPEATS = 5
+EPOCH = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+
+# -------- synthetic data --------
+def synthetic_catalog(n: int, seed: int = 1) -> str:
+    """3LE text for n LEO objects with random plane/phase, epoch 2024-01-01 12:00 UTC."""
+    rnd = random.Random(seed)
+    out = []
+    for k in range(n):
+        norad = 10_000 + k
+        inc, raan, argp, ma = rnd.uniform(0, 99), rnd.uniform(0, 360), rnd.uniform(0, 360), rnd.uniform(0, 360)
+        ecc, mm = rnd.uniform(1e-4, 1e-2), rnd.uniform(14.0, 15.6)
+        l1 = f"1 {norad:05d}U 24001A   24001.50000000  .00001000  00000-0  10000-3 0  999"
+        l2 = f"2 {norad:05d} {inc:8.4f} {raan:8.4f} {int(ecc * 1e7):07d} {argp:8.4f} {ma:8.4f} {mm:11.8f}    1"
+        out.append(f"OBJ {k}\n{l1}{tle_checksum(l1)}\n{l2}{tle_checksum(l2)}")
+    return "\n".join(out) + "\n"
+
+def _blocks(text: str) -> List[str]:
+    lines = text.splitlines()
+    return ["\n".join(lines[i:i + 3]) for i in range(0, len(lines), 3)]
+
+# -------- timing --------
+def measure(fn: Callable[[], object], repeats: int = REPEATS, min_time: float = MIN_REPEAT_S) -> dict:
+    """Call fn enough times per repeat to fill min_time; per-call seconds."""
+    t0 = time.perf_counter()
+    fn()                                            # warm-up (imports, caches, JIT-free first touch)
+    first = time.perf_counter() - t0
+    number = max(1, int(min_time / max(first, 1e-9)))
+    samples = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t0) / number)
+    return {
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "first_s": first,
+        "number": number,
+        "repeats": repeats,
+    }
+
+# -------- cases --------
+Case = Tuple[str, int, Callable[[], Callable[[], object]]]   # (name, size, setup -> fn)
+
+def _import_app() -> None:
+    # fresh interpreter: the cold-start cost every new / forked-then-exec'd worker pays
+    here = os.path.dirname(os.path.abspath(__file__))
+    subprocess.run([sys.executable, "-c", "import app"], cwd=here, check=True)
+
+def _cases(sizes: Sequence[int]) -> Iterator[Case]:
+    yield "startup.import_app", 1, lambda: _import_app
+    import app as orbio
+    from tle_utils import parse_tle_block, parse_tle_catalog, tle_to_state_km, propagate_grid, times_to_jd
+    from conjunction import screen_linear, DEFAULT_WINDOW_S, DEFAULT_STEP_S
+    import screening
+    import passes
+    import maneuver
+
+    texts = {n: synthetic_catalog(n) for n in sizes}
+    client = orbio.app.test_client()
+    orbio.HISTORY.enabled = False   # time the computation, not a lookup of the previous repeat's stored run
+    experiment = orbio.EXPERIMENT_LIBRARY["Pharma"]["Protein Crystallization"]
+    sat = ([6778.0, 0.0, 0.0], [0.0, 7.67, 0.0])
+    deb = ([6779.0, 5.0, 0.0], [0.0, -7.60, 0.5])
+    safety_form = {"sat_x": 6778, "sat_y": 0, "sat_z": 0, "sat_vx": 0, "sat_vy": 7.67, "sat_vz": 0,
+                   "deb_x": 6779, "deb_y": 5, "deb_z": 0, "deb_vx": 0, "deb_vy": -7.6, "deb_vz": 0.5}
+
+    # single-call paths
+    yield "compute_roi", 1, lambda: (lambda: orbio.compute_roi(experiment, 2_000_000, 1))
+    yield "safety.screen_linear", 1, lambda: (lambda: screen_linear(*sat, *deb, window_s=DEFAULT_WINDOW_S,
+                                                                   step_s=DEFAULT_STEP_S))
+    yield "maneuver.evaluate", 1, lambda: (lambda: maneuver.evaluate(*sat, *deb, tca_s=0.0))
+    yield "route.index", 1, lambda: (lambda: client.get("/").data)
+    yield "route.education", 1, lambda: (lambda: client.get("/education").data)
+    yield "route.investment", 1, lambda: (lambda: client.get("/investment").data)
+    yield "route.safety_state", 1, lambda: (lambda: client.post("/safety", data=safety_form).data)
+    yield "route.roi", 1, lambda: (lambda: client.post("/roi", data={
+        "field": "Pharma", "experiment": "Protein Crystallization",
+        "investment": "2000000", "scenario_index": "1"}).data)
+
+    for n in sizes:
+        text = texts[n]
+        blocks = _blocks(text)
+        first = blocks[0]
+        lines = first.splitlines()
+        if n == sizes[0]:
+            yield "route.safety_tle", 1, lambda: (lambda: client.post("/safety", data={
+                **safety_form, "sat_tle": first, "deb_tle": blocks[-1]}).data)
+            yield "route.convert_tle", 1, lambda: (lambda: client.post("/api/convert-tle", json={
+                "tle1": lines[1], "tle2": lines[2]}).data)
+        yield "parse_tle_block", n, lambda b=blocks: (lambda: [parse_tle_block(x) for x in b])
+        yield "parse_tle_catalog", n, lambda t=text: (lambda: parse_tle_catalog(t))
+        yield "tle_to_state_km", n, lambda b=blocks: (lambda: [tle_to_state_km(x, when=EPOCH) for x in b])
+
+        def vectors_setup(t=text):
+            recs = parse_tle_catalog(t)
+            return lambda: [orbio.tle_to_state_vectors(r.line1, r.line2) for r in recs]
+        yield "tle_to_state_vectors", n, vectors_setup
+
+        def grid_setup(t=text):
+            recs = parse_tle_catalog(t)
+            times = times_to_jd([EPOCH.replace(minute=m) for m in range(60)])
+            return lambda: propagate_grid(recs, times)
+        yield "propagate_grid_60", n, grid_setup
+
+        yield "route.convert_tle_batch", n, lambda t=text: (lambda: client.post(
+            "/api/convert-tle/batch", json={"tles": [t], "epochs": [EPOCH.isoformat()]}).data)
+
+        if n <= 1_000:   # all-vs-all screening at 20k is a job-queue workload, not a benchmark
+            def screen_setup(t=text):
+                recs = parse_tle_catalog(t)
+                return lambda: screening.screen_catalog(recs, start=EPOCH, hours=1.0)
+            yield "screen_catalog_1h", n, screen_setup
+            yield "route.screen_1h", n, lambda t=text: (lambda: client.post("/api/screen", json={
+                "tles": t, "start": EPOCH.isoformat(), "hours": 1}).data)
+
+            def passes_setup(t=text):
+                recs = parse_tle_catalog(t)
+                stations = [passes.Station("MAD", 40.43, -3.95, 0.8), passes.Station("CAN", -35.4, 148.98, 0.7),
+                            passes.Station("GDS", 35.43, -116.89, 1.0)]
+                return lambda: passes.predict(recs, stations, start=EPOCH, days=1.0)
+            yield "passes_1d_3st", n, passes_setup
+
+def _key(name: str, size: int) -> str:
+    return f"{name}[{size}]"
+
+def run(sizes: Sequence[int] = DEFAULT_SIZES, pattern: str = "",
+        repeats: int = REPEATS, min_time: float = MIN_REPEAT_S, log=sys.stderr) -> dict:
+    results: Dict[str, dict] = {}
+    for name, size, setup in _cases(sizes):
+        key = _key(name, size)
+        if pattern and pattern not in key:
+            continue
+        stats = measure(setup(), repeats=repeats, min_time=min_time)
+        stats["size"] = size
+        stats["per_item_us"] = stats["median_s"] / max(size, 1) * 1e6
+        results[key] = stats
+        if log:
+            print(f"{key:<36} {stats['median_s'] * 1e3:10.3f} ms  ({stats['per_item_us']:.1f} us/item)", file=log)
+    return {"meta": _meta(sizes), "results": results}
+
+def _meta(sizes: Sequence[int]) -> dict:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        rev = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_rev": rev,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "sizes": list(sizes),
+    }
+
+def compare(current: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> List[dict]:
+    """Per-case median ratio current / baseline; cases missing on either side are skipped."""
+    rows = []
+    for key, cur in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if not base:
+            continue
+        ratio = cur["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        status = "regression" if ratio > 1 + tolerance else "improved" if ratio < 1 - tolerance else "ok"
+        rows.append({"case": key, "baseline_s": base["median_s"], "current_s": cur["median_s"],
+                     "ratio": ratio, "status": status})
+    return rows
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark Orbio hot paths.")
+    ap.add_argument("-o", "--output", help="write JSON results here (default: stdout)")
+    ap.add_argument("--baseline", help="previous JSON results to compare against")
+    ap.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown, fraction")
+    ap.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="catalog sizes, comma-separated")
+    ap.add_argument("--filter", default="", help="only cases whose key contains this")
+    ap.add_argument("--repeats", type=int, default=REPEATS)
+    ap.add_argument("--min-time", type=float, default=MIN_REPEAT_S, help="seconds per repeat")
+    args = ap.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = run(sizes, args.filter, args.repeats, args.min_time)
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            rows = compare(report, json.load(fh), args.tolerance)
+        report["comparison"] = {"baseline": args.baseline, "tolerance": args.tolerance, "cases": rows}
+        for row in rows:
+            print(f"{row['case']:<36} x{row['ratio']:6.2f}  {row['status']}", file=sys.stderr)
+        if any(row["status"] == "regression" for row in rows):
+            exit_code = 1
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
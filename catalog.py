@@ -0,0 +1,206 @@
+# catalog.py
+"""
+Bulk TLE catalog ingestion.
+
+- iter_tle_lines / iter_catalog_file: streaming parsers (3LE/2LE, OMM CSV/JSON)
+  that read line by line and yield TLEParseResult records.
+- TLECatalog: one NumPy structured array per catalog, saved as a single .npy
+  that loads memory-mapped in milliseconds.
+"""
+from __future__ import annotations
+import csv
+import io
+import json
+import os
+from math import pi
+from typing import IO, Iterable, Iterator, List, Optional, Union
+import numpy as np
+from sgp4.api import Satrec, jday
+from sgp4 import omm
+from sgp4.exporter import export_tle
+from tle_utils import TLEParseResult, norad_number
+
+_MU_KM3_S2 = 398600.8      # WGS72, matches sgp4's default gravity model
+_RE_KM = 6378.135
+
+CATALOG_DTYPE = np.dtype([
+    ("norad", "i4"),
+    ("name", "S24"),
+    ("epoch_jd", "f8"),            # full Julian date (UTC) of the element set
+    ("inclination_deg", "f4"),
+    ("eccentricity", "f4"),
+    ("mean_motion", "f8"),         # rev/day
+    ("perigee_radius_km", "f4"),   # from Earth centre
+    ("apogee_radius_km", "f4"),
+    ("line1", "S69"),
+    ("line2", "S69"),
+])
+
+# -------- checksums --------
+def tle_checksum(line: str) -> int:
+    return sum(int(ch) if ch.isdigit() else (ch == "-") for ch in line[:68]) % 10
+
+def valid_checksum(line: str) -> bool:
+    return len(line) >= 69 and line[68].isdigit() and int(line[68]) == tle_checksum(line)
+
+# -------- streaming parsers --------
+def iter_tle_lines(lines: Iterable[str], validate: bool = True, strict: bool = False) -> Iterator[TLEParseResult]:
+    """
+    Yield one record per 2LE/3LE block from any line iterable (open file, stdin, list).
+    - Name lines are optional; a leading "0 " (3LE line 0) is dropped.
+    - Bad checksums / mismatched catalog numbers are skipped, or raise if strict.
+    """
+    name: Optional[str] = None
+    line1: Optional[str] = None
+    for raw in lines:
+        ln = raw.strip()
+        if not ln:
+            continue
+        if ln.startswith("1 "):
+            line1 = ln
+            continue
+        if ln.startswith("2 ") and line1 is not None:
+            rec = TLEParseResult(name=name, line1=line1, line2=ln)
+            name, line1 = None, None
+            problem = _check(rec) if validate else None
+            if problem:
+                if strict:
+                    raise ValueError(problem)
+                continue
+            yield rec
+            continue
+        name = ln[2:].strip() if ln.startswith("0 ") else ln
+        line1 = None
+
+def _check(rec: TLEParseResult) -> Optional[str]:
+    if not valid_checksum(rec.line1):
+        return f"Bad checksum on line 1: {rec.line1!r}"
+    if not valid_checksum(rec.line2):
+        return f"Bad checksum on line 2: {rec.line2!r}"
+    if rec.line1[2:7] != rec.line2[2:7]:
+        return f"Catalog number mismatch: {rec.line1[2:7]!r} vs {rec.line2[2:7]!r}"
+    return None
+
+def _omm_to_record(fields: dict) -> TLEParseResult:
+    fields = {k: (v if isinstance(v, str) else str(v)) for k, v in fields.items() if v is not None}
+    fields.setdefault("CLASSIFICATION_TYPE", "U")
+    fields.setdefault("OBJECT_ID", "")
+    fields.setdefault("EPHEMERIS_TYPE", "0")
+    fields.setdefault("ELEMENT_SET_NO", "999")
+    fields.setdefault("REV_AT_EPOCH", "0")
+    if "." not in fields.get("EPOCH", ""):
+        fields["EPOCH"] = fields.get("EPOCH", "") + ".0"
+    sat = Satrec()
+    omm.initialize(sat, fields)
+    line1, line2 = export_tle(sat)
+    return TLEParseResult(name=fields.get("OBJECT_NAME"), line1=line1, line2=line2)
+
+def iter_omm_csv(fh: IO[str], strict: bool = False) -> Iterator[TLEParseResult]:
+    for fields in omm.parse_csv(fh):
+        try:
+            yield _omm_to_record(fields)
+        except (KeyError, ValueError):
+            if strict:
+                raise
+
+def iter_omm_json(fh: IO[str], strict: bool = False) -> Iterator[TLEParseResult]:
+    """OMM JSON array (loaded whole, as json has no incremental reader) or NDJSON (streamed)."""
+    head = fh.read(1)
+    while head and head.isspace():
+        head = fh.read(1)
+    if head == "[":
+        rows: Iterable[dict] = json.loads(head + fh.read())
+    else:
+        rows = (json.loads(ln) for ln in _prepend(head, fh) if ln.strip())
+    for fields in rows:
+        try:
+            yield _omm_to_record(fields)
+        except (KeyError, ValueError):
+            if strict:
+                raise
+
+def _prepend(head: str, fh: IO[str]) -> Iterator[str]:
+    first = fh.readline()
+    yield head + first
+    yield from fh
+
+def iter_catalog_file(path: str, fmt: Optional[str] = None, strict: bool = False) -> Iterator[TLEParseResult]:
+    """Stream records from a file; fmt is 'tle', 'csv' or 'json' (default: by extension)."""
+    fmt = fmt or {".csv": "csv", ".json": "json", ".ndjson": "json"}.get(os.path.splitext(path)[1].lower(), "tle")
+    with open(path, encoding="utf-8", newline="" if fmt == "csv" else None) as fh:
+        if fmt == "csv":
+            yield from iter_omm_csv(fh, strict=strict)
+        elif fmt == "json":
+            yield from iter_omm_json(fh, strict=strict)
+        else:
+            yield from iter_tle_lines(fh, strict=strict)
+
+# -------- columnar store --------
+def epoch_jd(line1: str) -> float:
+    """Element-set epoch (columns 19-32 of line 1) as a Julian date."""
+    yy = int(line1[18:20])
+    year = 2000 + yy if yy < 57 else 1900 + yy
+    jd, fr = jday(year, 1, 1, 0, 0, 0.0)
+    return jd + fr + float(line1[20:32]) - 1.0
+
+def _row(rec: TLEParseResult) -> tuple:
+    l1, l2 = rec.line1, rec.line2
+    ecc = float("0." + l2[26:33].strip())
+    mm = float(l2[52:63])
+    n_rad_s = mm * 2.0 * pi / 86400.0
+    a = (_MU_KM3_S2 / n_rad_s ** 2) ** (1.0 / 3.0) if n_rad_s > 0 else 0.0
+    name = (rec.name or "").encode("utf-8")[:24]
+    return (norad_number(l1[2:7]), name, epoch_jd(l1), float(l2[8:16]), ecc, mm,
+            a * (1.0 - ecc), a * (1.0 + ecc), l1.encode("ascii"), l2.encode("ascii"))
+
+class TLECatalog:
+    """Columnar TLE catalog (structured array, one row per object, ~200 bytes/row)."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: np.ndarray):
+        if data.dtype != CATALOG_DTYPE:
+            raise ValueError("Catalog array has an unexpected dtype.")
+        self.data = data
+
+    @classmethod
+    def from_records(cls, records: Iterable[TLEParseResult]) -> "TLECatalog":
+        return cls(np.fromiter((_row(rec) for rec in records), dtype=CATALOG_DTYPE))
+
+    @classmethod
+    def from_file(cls, path: str, fmt: Optional[str] = None, strict: bool = False) -> "TLECatalog":
+        if path.endswith(".npy"):
+            return cls.load(path)
+        return cls.from_records(iter_catalog_file(path, fmt=fmt, strict=strict))
+
+    @classmethod
+    def from_text(cls, text: str, strict: bool = False) -> "TLECatalog":
+        return cls.from_records(iter_tle_lines(io.StringIO(text), strict=strict))
+
+    def save(self, path: str) -> None:
+        np.save(path, self.data, allow_pickle=False)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "TLECatalog":
+        return cls(np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            return _record(self.data[idx])
+        return TLECatalog(self.data[idx])
+
+    def __iter__(self) -> Iterator[TLEParseResult]:
+        for row in self.data:
+            yield _record(row)
+
+    def satrecs(self) -> List[Satrec]:
+        # bulk build, bypassing the per-object LRU cache
+        return [Satrec.twoline2rv(l1.decode("ascii"), l2.decode("ascii"))
+                for l1, l2 in zip(self.data["line1"], self.data["line2"])]
+
+def _record(row) -> TLEParseResult:
+    name = row["name"].decode("utf-8", errors="replace") or None
+    return TLEParseResult(name=name, line1=row["line1"].decode("ascii"), line2=row["line2"].decode("ascii"))
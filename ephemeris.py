@@ -0,0 +1,127 @@
+# ephemeris.py
+"""
+Position (and optionally velocity) time series for many objects, for the 3D
+globe.
+
+- Uniform time axis [start, start + hours] at step_s. Level of detail: the
+  step is coarsened server-side so one object never exceeds max_points
+  samples and a request never exceeds MAX_SAMPLES object-epochs
+  (MAX_JSON_SAMPLES for JSON, which is built in memory as Python lists).
+  The effective step is returned with the data.
+- Propagation goes through tle_utils.propagate_grid in object chunks and
+  lands straight in one float32 array (km, km/s).
+- layout "time" is (n_time, n_obj, C) so each animation frame is
+  contiguous; "object" is (n_obj, n_time, C). C = 3 (r) or 6 (r, v).
+"""
+from __future__ import annotations
+import io
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional, Sequence, Union
+import numpy as np
+from tle_utils import TLEParseResult, propagate_grid, times_to_jd
+from metrics import timed
+
+DEFAULT_STEP_S = 60.0
+DEFAULT_HOURS = 1.5            # about one LEO revolution
+DEFAULT_MAX_POINTS = 2_000     # per object
+MAX_SAMPLES = int(os.environ.get("ORBIO_EPHEMERIS_MAX_SAMPLES", "5000000"))
+MAX_JSON_SAMPLES = int(os.environ.get("ORBIO_EPHEMERIS_MAX_JSON_SAMPLES", "200000"))
+CHUNK_OBJECTS = 500
+LAYOUTS = ("time", "object")
+FIELDS = ("r", "rv")
+
+@dataclass
+class Ephemeris:
+    start: datetime
+    step_s: float
+    n_time: int
+    frame: str
+    layout: str
+    fields: str
+    data: np.ndarray            # float32, see module docstring for the layout
+
+    def headers(self) -> dict:
+        return {
+            "X-Ephemeris-Shape": ",".join(str(d) for d in self.data.shape),
+            "X-Ephemeris-Layout": self.layout,
+            "X-Ephemeris-Fields": self.fields,
+            "X-Ephemeris-Frame": self.frame,
+            "X-Ephemeris-Start": self.start.isoformat(),
+            "X-Ephemeris-Step": repr(self.step_s),
+            "X-Ephemeris-Dtype": "float32-le",
+        }
+
+    def to_bytes(self) -> bytes:
+        # raw little-endian float32 in C order: new Float32Array(buffer) in the browser
+        return self.data.astype("<f4", copy=False).tobytes()
+
+    def to_npy(self) -> bytes:
+        buf = io.BytesIO()
+        np.save(buf, self.data.astype("<f4", copy=False), allow_pickle=False)
+        return buf.getvalue()
+
+    def to_json(self, decimals: int = 3) -> dict:
+        # NaN (SGP4 failure) -> null
+        rounded = np.round(self.data.astype(float), decimals)
+        values = np.where(np.isnan(rounded), None, rounded).tolist()
+        return {
+            "start": self.start.isoformat(),
+            "step_s": self.step_s,
+            "n_time": self.n_time,
+            "frame": self.frame,
+            "layout": self.layout,
+            "fields": self.fields,
+            "shape": list(self.data.shape),
+            "data": values,
+        }
+
+def plan_step(hours: float, step_s: float, n_obj: int, max_points: int = DEFAULT_MAX_POINTS,
+              max_samples: int = MAX_SAMPLES) -> tuple:
+    """(effective step_s, n_time) after the per-object and per-request caps."""
+    if hours <= 0 or step_s <= 0:
+        raise ValueError("hours and step_s must be positive.")
+    if n_obj * 2 > max_samples:
+        raise ValueError(f"Too many objects for one request (max {max_samples // 2}).")
+    span = hours * 3600.0
+    cap = max(2, min(int(max_points), max_samples // max(n_obj, 1)))
+    n_time = int(span // step_s) + 1
+    if n_time > cap:
+        step_s = span / (cap - 1)
+        n_time = cap
+    return float(step_s), n_time
+
+@timed("ephemeris")
+def compute(records: Sequence[Union[str, TLEParseResult]],
+            start: Optional[datetime] = None,
+            hours: float = DEFAULT_HOURS,
+            step_s: float = DEFAULT_STEP_S,
+            frame: str = "gcrs",
+            fields: str = "r",
+            layout: str = "time",
+            max_points: int = DEFAULT_MAX_POINTS,
+            max_samples: int = MAX_SAMPLES) -> Ephemeris:
+    if fields not in FIELDS:
+        raise ValueError(f"fields must be one of {FIELDS}.")
+    if layout not in LAYOUTS:
+        raise ValueError(f"layout must be one of {LAYOUTS}.")
+    if not records:
+        raise ValueError("No TLEs supplied.")
+    start = start or datetime.now(timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    step_s, n_time = plan_step(hours, step_s, len(records), max_points, max_samples)
+    t0 = np.datetime64(start.astimezone(timezone.utc).replace(tzinfo=None), "us")
+    jd, fr = times_to_jd(t0 + np.round(np.arange(n_time) * step_s * 1e6).astype("timedelta64[us]"))
+    width = 3 if fields == "r" else 6
+    out = np.empty((len(records), n_time, width), dtype=np.float32)
+    for lo in range(0, len(records), CHUNK_OBJECTS):
+        r, v = propagate_grid(records[lo:lo + CHUNK_OBJECTS], (jd, fr), frame=frame)
+        out[lo:lo + len(r), :, :3] = r
+        if width == 6:
+            out[lo:lo + len(r), :, 3:] = v
+    if layout == "time":
+        out = np.ascontiguousarray(out.transpose(1, 0, 2))
+    return Ephemeris(start=start, step_s=step_s, n_time=n_time, frame=frame,
+                     layout=layout, fields=fields, data=out)
@@ -0,0 +1,116 @@
+# frames.py
+"""
+Vectorised TEME -> GCRS / ITRS conversion for SGP4 output.
+
+Precession-nutation (skyfield's TEME.rotation_at) and UT1-UTC change slowly,
+so they are tabulated hourly per calendar year, saved to ./skycache and
+linearly interpolated. Skyfield is only imported to build a missing table;
+the hot path is NumPy plus the analytic IAU-1982 GMST that SGP4 itself uses.
+"""
+from __future__ import annotations
+import os
+import threading
+from functools import lru_cache
+from math import pi
+from typing import Tuple
+import numpy as np
+
+CACHE_DIR = os.environ.get("ORBIO_SKYCACHE", "./skycache")
+FRAMES = ("teme", "gcrs", "itrs")
+
+_UNIX_EPOCH_JD = 2440587.5
+_OMEGA_EARTH_RAD_S = 7.292115146706979e-5
+_table_lock = threading.Lock()
+
+def gmst82_rad(jd_ut1, fr_ut1=0.0):
+    """IAU-1982 GMST (the angle SGP4's TEME is defined against); float or ndarray."""
+    T = ((jd_ut1 - 2451545.0) + fr_ut1) / 36525.0
+    gmst_sec = (67310.54841
+                + (876600.0 * 3600 + 8640184.812866) * T
+                + 0.093104 * T**2
+                - 6.2e-6 * T**3)
+    return ((gmst_sec % 86400.0) * (2.0 * pi / 86400.0)) % (2.0 * pi)
+
+def _build_year(year: int) -> Tuple[float, np.ndarray, np.ndarray]:
+    from skyfield.api import load
+    from skyfield.sgp4lib import TEME
+    from sgp4.api import jday
+    ts = load.timescale(builtin=True)   # bundled IERS/leap-second data, no download
+    n_hours = int(round((ts.utc(year + 1).tt - ts.utc(year).tt) * 24))
+    t = ts.utc(year, 1, 1, np.arange(n_hours + 1))
+    R = np.moveaxis(TEME.rotation_at(t), -1, 0)   # (n, 3, 3): r_teme = R @ r_gcrs
+    jd0 = float(sum(jday(year, 1, 1, 0, 0, 0.0)))
+    return jd0, np.ascontiguousarray(R), np.asarray(t.dut1, dtype=float)
+
+@lru_cache(maxsize=8)
+def _year_table(year: int) -> Tuple[float, np.ndarray, np.ndarray]:
+    path = os.path.join(CACHE_DIR, f"frames-{year}.npz")
+    try:
+        with np.load(path) as z:
+            return float(z["jd0"]), z["R"], z["dut1"]
+    except (OSError, KeyError, ValueError):
+        pass
+    with _table_lock:
+        jd0, R, dut1 = _build_year(year)
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp, jd0=jd0, R=R, dut1=dut1)
+            os.replace(tmp, path)
+        except OSError:
+            pass   # read-only deploy: keep the in-memory table
+    return jd0, R, dut1
+
+def warm(years) -> None:
+    """Build / load the tables for the given years ahead of time."""
+    for y in years:
+        _year_table(int(y))
+
+def _interp(jd: np.ndarray, fr: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # (n, 3, 3) TEME<-GCRS rotations and (n,) UT1-UTC seconds at UTC (jd, fr)
+    days = (jd - _UNIX_EPOCH_JD) + fr
+    years = (days * 86400e6).astype("datetime64[us]").astype("datetime64[Y]").astype(int) + 1970
+    R = np.empty((len(jd), 3, 3))
+    dut1 = np.empty(len(jd))
+    for year in np.unique(years):
+        sel = years == year
+        jd0, tab_R, tab_dut1 = _year_table(int(year))
+        x = ((jd[sel] - jd0) + fr[sel]) * 24.0
+        i = np.clip(np.floor(x).astype(int), 0, len(tab_dut1) - 2)
+        w = (x - i)[:, None, None]
+        R[sel] = tab_R[i] * (1.0 - w) + tab_R[i + 1] * w
+        dut1[sel] = tab_dut1[i] * (1.0 - w[:, 0, 0]) + tab_dut1[i + 1] * w[:, 0, 0]
+    return R, dut1
+
+def teme_to_gcrs(r: np.ndarray, v: np.ndarray, jd, fr) -> Tuple[np.ndarray, np.ndarray]:
+    """r/v (..., n_time, 3) in TEME at UTC times (jd, fr) of shape (n_time,) -> GCRS."""
+    jd, fr = np.atleast_1d(np.asarray(jd, dtype=float)), np.atleast_1d(np.asarray(fr, dtype=float))
+    R, _ = _interp(jd, fr)
+    # r_gcrs = R^T r_teme
+    return np.einsum("tji,...tj->...ti", R, r), np.einsum("tji,...tj->...ti", R, v)
+
+def teme_to_itrs(r: np.ndarray, v: np.ndarray, jd, fr) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    TEME -> Earth-fixed (PEF ~ ITRS without polar motion), including the
+    omega x r term in velocity.
+    """
+    jd, fr = np.atleast_1d(np.asarray(jd, dtype=float)), np.atleast_1d(np.asarray(fr, dtype=float))
+    _, dut1 = _interp(jd, fr)
+    theta = gmst82_rad(jd, fr + dut1 / 86400.0)
+    c, s = np.cos(theta), np.sin(theta)
+    r = np.asarray(r, dtype=float)
+    v = np.asarray(v, dtype=float)
+    rx, ry = c * r[..., 0] + s * r[..., 1], -s * r[..., 0] + c * r[..., 1]
+    vx, vy = c * v[..., 0] + s * v[..., 1], -s * v[..., 0] + c * v[..., 1]
+    r_out = np.stack([rx, ry, r[..., 2]], axis=-1)
+    v_out = np.stack([vx + _OMEGA_EARTH_RAD_S * ry, vy - _OMEGA_EARTH_RAD_S * rx, v[..., 2]], axis=-1)
+    return r_out, v_out
+
+def from_teme(r: np.ndarray, v: np.ndarray, jd, fr, frame: str = "gcrs") -> Tuple[np.ndarray, np.ndarray]:
+    if frame == "teme":
+        return r, v
+    if frame == "gcrs":
+        return teme_to_gcrs(r, v, jd, fr)
+    if frame == "itrs":
+        return teme_to_itrs(r, v, jd, fr)
+    raise ValueError(f"frame must be one of {FRAMES}.")
@@ -0,0 +1,264 @@
+# history.py
+"""
+SQLite persistence for conjunction events, TLE epochs and screening runs.
+
+    ORBIO_DB=./orbio.db        (ORBIO_DB=off: nothing is stored, queries return [])
+
+- WAL journal + synchronous=NORMAL: readers never block the writer and a
+  commit is one WAL append. One connection per thread and per process
+  (never carried across fork).
+- Writes are bulk (executemany in one transaction). Everything is
+  best-effort: an unusable database (bad path, locked, corrupt) counts an
+  error in stats() and reads come back empty, so callers recompute instead
+  of failing the request.
+- conjunctions are indexed on (norad1, tca), (norad2, tca) and tca, so "all
+  events for object X in the next 72 h" is two index range scans.
+- A screening run carries a key over its catalog contents and window
+  (run_key); find_run(key) serves a repeat screening from stored events.
+Times are stored as UTC unix seconds.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Sequence, Tuple
+from catalog import epoch_jd
+from screening import Conjunction
+from tle_utils import TLEParseResult, norad_id
+from metrics import timed
+
+DB_PATH = os.environ.get("ORBIO_DB", "./orbio.db")
+ENABLED = DB_PATH.lower() not in ("", "0", "off", "false", "no")
+_UNIX_EPOCH_JD = 2440587.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tle_epochs (
+    norad       TEXT NOT NULL,
+    epoch       REAL NOT NULL,
+    name        TEXT,
+    line1       TEXT NOT NULL,
+    line2       TEXT NOT NULL,
+    first_seen  REAL NOT NULL,
+    PRIMARY KEY (norad, epoch)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS screening_runs (
+    id            INTEGER PRIMARY KEY,
+    created       REAL NOT NULL,
+    kind          TEXT NOT NULL,
+    run_key       TEXT,
+    start         REAL,
+    hours         REAL,
+    step_s        REAL,
+    threshold_km  REAL,
+    sigma_km      REAL,
+    hbr_km        REAL,
+    objects       INTEGER NOT NULL DEFAULT 0,
+    events        INTEGER NOT NULL DEFAULT 0,
+    stats         TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_key ON screening_runs (run_key, id);
+CREATE INDEX IF NOT EXISTS runs_created ON screening_runs (created);
+
+CREATE TABLE IF NOT EXISTS conjunctions (
+    id              INTEGER PRIMARY KEY,
+    run_id          INTEGER NOT NULL REFERENCES screening_runs (id) ON DELETE CASCADE,
+    norad1          TEXT NOT NULL,
+    norad2          TEXT NOT NULL,
+    obj1            TEXT,
+    obj2            TEXT,
+    tca             REAL NOT NULL,
+    miss_km         REAL NOT NULL,
+    rel_speed_km_s  REAL,
+    pc              REAL
+);
+CREATE INDEX IF NOT EXISTS conj_norad1_tca ON conjunctions (norad1, tca);
+CREATE INDEX IF NOT EXISTS conj_norad2_tca ON conjunctions (norad2, tca);
+CREATE INDEX IF NOT EXISTS conj_tca ON conjunctions (tca);
+CREATE INDEX IF NOT EXISTS conj_run ON conjunctions (run_id);
+"""
+
+_EVENT_COLUMNS = "c.run_id, c.norad1, c.norad2, c.obj1, c.obj2, c.tca, c.miss_km, c.rel_speed_km_s, c.pc"
+
+def _ts(when: datetime) -> float:
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+def _dt(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, tz=timezone.utc)
+
+def tle_epoch(line1: str) -> datetime:
+    """Epoch of a TLE (line 1 columns 19-32) as an aware UTC datetime."""
+    return _dt((epoch_jd(line1) - _UNIX_EPOCH_JD) * 86400.0)
+
+def run_key(records: Sequence[TLEParseResult], start: datetime, hours: float, step_s: float,
+            threshold_km: float, sigma_km: float, hbr_km: float) -> str:
+    """Identity of a screening: catalog contents (order-free) plus every window parameter."""
+    h = hashlib.blake2b(digest_size=16)
+    for l1, l2 in sorted((r.line1.strip(), r.line2.strip()) for r in records):
+        h.update(f"{l1}\n{l2}\n".encode("ascii", "replace"))
+    h.update(repr((round(_ts(start), 6), float(hours), float(step_s), float(threshold_km),
+                   float(sigma_km), float(hbr_km))).encode("ascii"))
+    return h.hexdigest()
+
+def _event(row) -> Conjunction:
+    _, n1, n2, o1, o2, tca, miss, speed, pc = row
+    return Conjunction(obj1=o1, obj2=o2, tca=_dt(tca), miss_km=miss, rel_speed_km_s=speed or 0.0,
+                       pc=pc or 0.0, norad1=n1, norad2=n2)
+
+class History:
+    def __init__(self, path: str = DB_PATH, enabled: bool = ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self._local = threading.local()
+        self.write_errors = 0
+        self.read_errors = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-32768")      # 32 MB: bulk inserts touch 4 indexes at random
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(_SCHEMA)
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _write(self, fn):
+        # best-effort: history must never break the request that produced the data
+        if not self.enabled:
+            return None
+        try:
+            conn = self._conn()
+            with conn:
+                return fn(conn)
+        except (sqlite3.Error, OSError):
+            self.write_errors += 1
+            return None
+
+    def _read(self, sql: str, args: tuple = ()) -> list:
+        if not self.enabled:
+            return []
+        try:
+            return self._conn().execute(sql, args).fetchall()
+        except (sqlite3.Error, OSError):
+            self.read_errors += 1
+            return []
+
+    # -------- writes --------
+    def record_tles(self, records: Iterable[TLEParseResult]) -> Optional[int]:
+        """Remember each (NORAD ID, epoch) element set once; returns rows newly stored."""
+        now = time.time()
+        rows = []
+        for rec in records:
+            try:
+                epoch = (epoch_jd(rec.line1) - _UNIX_EPOCH_JD) * 86400.0
+            except (ValueError, IndexError):
+                continue
+            rows.append((norad_id(rec.line1), epoch, rec.name, rec.line1, rec.line2, now))
+        if not rows:
+            return 0
+        return self._write(lambda c: c.executemany(
+            "INSERT OR IGNORE INTO tle_epochs (norad, epoch, name, line1, line2, first_seen) "
+            "VALUES (?, ?, ?, ?, ?, ?)", rows).rowcount)
+
+    @timed("history_save_run")
+    def save_run(self, kind: str, events: Sequence[Conjunction], key: Optional[str] = None,
+                 start: Optional[datetime] = None, hours: Optional[float] = None,
+                 step_s: Optional[float] = None, threshold_km: Optional[float] = None,
+                 sigma_km: Optional[float] = None, hbr_km: Optional[float] = None,
+                 objects: int = 0, stats: Optional[dict] = None) -> Optional[int]:
+        """Store one run and its events in one transaction; returns the run id."""
+        def write(conn):
+            cur = conn.execute(
+                "INSERT INTO screening_runs (created, kind, run_key, start, hours, step_s, threshold_km, "
+                "sigma_km, hbr_km, objects, events, stats) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), kind, key, _ts(start) if start else None, hours, step_s, threshold_km,
+                 sigma_km, hbr_km, objects, len(events), json.dumps(stats) if stats else None))
+            run_id = cur.lastrowid
+            conn.executemany(
+                "INSERT INTO conjunctions (run_id, norad1, norad2, obj1, obj2, tca, miss_km, rel_speed_km_s, pc) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, ev.norad1, ev.norad2, ev.obj1, ev.obj2, _ts(ev.tca), ev.miss_km,
+                  ev.rel_speed_km_s, ev.pc) for ev in events])
+            return run_id
+        return self._write(write)
+
+    def prune(self, before: datetime) -> Optional[int]:
+        """Delete runs (and their events) created before `before`; returns runs deleted."""
+        return self._write(lambda c: c.execute(
+            "DELETE FROM screening_runs WHERE created < ?", (_ts(before),)).rowcount)
+
+    # -------- queries --------
+    @timed("history_find_run")
+    def find_run(self, key: str) -> Optional[Tuple[dict, List[Conjunction]]]:
+        """Newest stored run with this run_key and its events (ranked by miss distance), or None."""
+        rows = self._read("SELECT id, created, kind, objects, events, stats FROM screening_runs "
+                          "WHERE run_key = ? ORDER BY id DESC LIMIT 1", (key,))
+        if not rows:
+            return None
+        run_id, created, kind, objects, n_events, stats = rows[0]
+        events = [_event(r) for r in self._read(
+            f"SELECT {_EVENT_COLUMNS} FROM conjunctions c WHERE c.run_id = ? ORDER BY c.miss_km", (run_id,))]
+        if len(events) != n_events:     # read failed part-way: recompute rather than serve a partial run
+            return None
+        return ({"id": run_id, "created": _dt(created).isoformat(), "kind": kind, "objects": objects,
+                 "events": n_events, "stats": json.loads(stats) if stats else None}, events)
+
+    @timed("history_events")
+    def events_for(self, norad: str, start: Optional[datetime] = None, hours: float = 72.0,
+                   latest: bool = True, limit: int = 1000) -> List[Conjunction]:
+        """
+        Events involving one object with TCA in [start, start + hours], by TCA.
+        latest=True keeps, per object pair, only the newest run's events (a
+        re-screen supersedes earlier predictions for the same pair).
+        """
+        start = start or datetime.now(timezone.utc)
+        lo, hi = _ts(start), _ts(start + timedelta(hours=hours))
+        hits = (f"SELECT {_EVENT_COLUMNS} FROM conjunctions c WHERE c.norad1 = ? AND c.tca BETWEEN ? AND ? "
+                f"UNION ALL SELECT {_EVENT_COLUMNS} FROM conjunctions c WHERE c.norad2 = ? AND c.tca BETWEEN ? AND ?")
+        if latest:
+            sql = (f"WITH hits AS ({hits}), ranked AS (SELECT *, MAX(run_id) OVER "
+                   f"(PARTITION BY norad1, norad2) AS newest FROM hits) "
+                   f"SELECT run_id, norad1, norad2, obj1, obj2, tca, miss_km, rel_speed_km_s, pc "
+                   f"FROM ranked WHERE run_id = newest ORDER BY tca LIMIT ?")
+        else:
+            sql = f"{hits} ORDER BY tca LIMIT ?"
+        return [_event(r) for r in self._read(sql, (norad, lo, hi, norad, lo, hi, int(limit)))]
+
+    def tle_history(self, norad: str, limit: int = 100) -> List[dict]:
+        """Element sets seen for one object, newest epoch first."""
+        rows = self._read("SELECT epoch, name, line1, line2, first_seen FROM tle_epochs "
+                          "WHERE norad = ? ORDER BY epoch DESC LIMIT ?", (norad, int(limit)))
+        return [{"epoch": _dt(e).isoformat(), "name": n, "tle1": l1, "tle2": l2,
+                 "first_seen": _dt(s).isoformat()} for e, n, l1, l2, s in rows]
+
+    def runs(self, limit: int = 50, kind: Optional[str] = None) -> List[dict]:
+        sql = "SELECT id, created, kind, start, hours, threshold_km, objects, events FROM screening_runs"
+        args: tuple = ()
+        if kind:
+            sql += " WHERE kind = ?"
+            args = (kind,)
+        rows = self._read(sql + " ORDER BY id DESC LIMIT ?", args + (int(limit),))
+        return [{"id": i, "created": _dt(c).isoformat(), "kind": k, "start": _dt(s).isoformat() if s else None,
+                 "hours": h, "threshold_km": t, "objects": o, "events": e} for i, c, k, s, h, t, o, e in rows]
+
+    def stats(self) -> dict:
+        if not self.enabled:
+            return {"enabled": False}
+        counts = {}
+        for table in ("tle_epochs", "screening_runs", "conjunctions"):
+            rows = self._read(f"SELECT COUNT(*) FROM {table}")
+            counts[table] = rows[0][0] if rows else None
+        return {"enabled": True, "path": self.path, "write_errors": self.write_errors,
+                "read_errors": self.read_errors, **counts}
@@ -0,0 +1,362 @@
+# jobs.py
+"""
+Local background jobs for long screening / propagation runs.
+
+Work is split into chunks (time sub-windows for screening, object slices for
+propagation) and run on a ProcessPoolExecutor. Every finished chunk is spilled
+to ORBIO_JOB_DIR/<job id>/ so partial results can be polled or streamed while
+the rest is still running. No external broker: the process that submitted a
+job owns its futures and mirrors its state to <job id>/job.json, so any other
+worker sharing ORBIO_JOB_DIR (pre-forked servers) can report status, serve
+results and stream chunks; a cancel from another worker is flagged there and
+honoured by the owner on its next lookup.
+Settled jobs (and their spill directories) are dropped after ORBIO_JOB_TTL_S,
+or oldest first once more than ORBIO_MAX_JOBS are kept.
+"""
+from __future__ import annotations
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+JOB_DIR = os.environ.get("ORBIO_JOB_DIR", "./jobdata")
+MAX_WORKERS = int(os.environ.get("ORBIO_JOB_WORKERS", "0")) or None   # None = os.cpu_count()
+JOB_TYPES = ("screen", "propagate")
+JOB_TTL_S = float(os.environ.get("ORBIO_JOB_TTL_S", str(24 * 3600)))
+MAX_JOBS = int(os.environ.get("ORBIO_MAX_JOBS", "200"))
+
+TLETuple = Tuple[Optional[str], str, str]   # (name, line1, line2) - cheap to pickle
+
+# -------- worker functions (run in child processes) --------
+def _screen_chunk(tles: List[TLETuple], start_iso: str, hours: float, step_s: float,
+                  threshold_km: float, out_path: str) -> int:
+    from screening import screen_catalog
+    from tle_utils import TLEParseResult
+    records = [TLEParseResult(name=n, line1=l1, line2=l2) for n, l1, l2 in tles]
+    events = screen_catalog(records, start=datetime.fromisoformat(start_iso), hours=hours,
+                            step_s=step_s, threshold_km=threshold_km)
+    _write_json(out_path, [ev.to_dict() for ev in events])
+    return len(events)
+
+def _propagate_chunk(tles: List[TLETuple], jd: np.ndarray, fr: np.ndarray, frame: str, out_path: str) -> int:
+    from tle_utils import TLEParseResult, norad_number, propagate_grid
+    records = [TLEParseResult(name=n, line1=l1, line2=l2) for n, l1, l2 in tles]
+    r, v = propagate_grid(records, (jd, fr), frame=frame)
+    tmp = out_path + ".tmp.npz"
+    np.savez(tmp, r=r.astype(np.float32), v=v.astype(np.float32),
+             norad=np.array([norad_number(l1[2:7]) for _, l1, _ in tles], dtype=np.int32))
+    os.replace(tmp, out_path)
+    return len(records)
+
+def _write_json(path: str, data) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, ensure_ascii=False)
+    os.replace(tmp, path)
+
+# -------- job bookkeeping (parent process) --------
+@dataclass
+class Job:
+    id: str
+    type: str
+    params: dict
+    chunks: List[str]                       # spill file per chunk
+    futures: List[Future] = field(default_factory=list)
+    done: List[bool] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    created: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    cancelled: bool = False
+
+    @property
+    def status(self) -> str:
+        if self.cancelled:
+            return "cancelled"
+        if self.errors:
+            return "failed"
+        if all(self.done):
+            return "done"
+        return "running" if any(self.done) or any(f.running() or f.done() for f in self.futures) else "queued"
+
+    def to_dict(self) -> dict:
+        n_done = sum(self.done)
+        return {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "progress": n_done / len(self.chunks) if self.chunks else 1.0,
+            "chunks_done": n_done,
+            "chunks_total": len(self.chunks),
+            "errors": self.errors,
+            "params": self.params,
+            "created": datetime.fromtimestamp(self.created, timezone.utc).isoformat(),
+            "finished": datetime.fromtimestamp(self.finished, timezone.utc).isoformat() if self.finished else None,
+        }
+
+    def state(self) -> dict:
+        # what job.json carries for other workers (done chunks are the spill files themselves)
+        return {"id": self.id, "type": self.type, "params": self.params, "chunks": self.chunks,
+                "errors": self.errors, "created": self.created, "finished": self.finished,
+                "cancelled": self.cancelled}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "Job":
+        return cls(id=state["id"], type=state["type"], params=state["params"], chunks=state["chunks"],
+                   done=[os.path.exists(path) for path in state["chunks"]], errors=state["errors"],
+                   created=state["created"], finished=state["finished"], cancelled=state["cancelled"])
+
+class JobManager:
+    def __init__(self, job_dir: str = JOB_DIR, max_workers: Optional[int] = MAX_WORKERS,
+                 ttl_s: float = JOB_TTL_S, max_jobs: int = MAX_JOBS):
+        self.job_dir = job_dir
+        self.max_workers = max_workers
+        self.ttl_s = ttl_s
+        self.max_jobs = max_jobs
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # created (and multiprocessing imported) on first submit; "spawn" keeps
+        # children clear of the parent's threads
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    import multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+                    ctx = multiprocessing.get_context(os.environ.get("ORBIO_JOB_START_METHOD", "spawn"))
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx)
+        return self._pool
+
+    def _submit(self, fn, *args) -> Future:
+        from concurrent.futures.process import BrokenProcessPool
+        try:
+            return self.pool.submit(fn, *args)
+        except BrokenProcessPool:
+            # a worker died (OOM, kill); start a fresh pool rather than failing every later job
+            with self._lock:
+                self._pool = None
+            return self.pool.submit(fn, *args)
+
+    def _workers(self) -> int:
+        return self.max_workers or os.cpu_count() or 1
+
+    def _state_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir, job_id, "job.json")
+
+    def _save(self, job: Job) -> None:
+        try:
+            _write_json(self._state_path(job.id), job.state())
+        except OSError:
+            pass                # spill directory purged underneath us
+
+    def _load(self, job_id: str) -> Optional[Job]:
+        # a job submitted by another worker, as of its last saved state
+        if not job_id.isalnum():
+            return None
+        try:
+            return Job.from_state(_read_json(self._state_path(job_id)))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _evict(self) -> None:
+        # settled jobs only: past the TTL, then oldest first down to max_jobs;
+        # on disk, jobs of other (possibly dead) workers once they are past the TTL
+        now = time.time()
+        with self._lock:
+            settled = sorted((j for j in self._jobs.values() if j.finished is not None or j.cancelled),
+                             key=lambda j: j.created)
+            excess = len(self._jobs) + 1 - self.max_jobs      # room for the job being created
+            drop = [j.id for k, j in enumerate(settled)
+                    if k < excess or now - (j.finished or j.created) > self.ttl_s]
+            for job_id in drop:
+                self._jobs.pop(job_id, None)
+            owned = set(self._jobs)
+        try:
+            names = os.listdir(self.job_dir)
+        except OSError:
+            names = []
+        for name in names:
+            if name not in owned and name not in drop:
+                job = self._load(name)
+                if job is None or now - (job.finished or job.created) > self.ttl_s:
+                    drop.append(name)
+        for job_id in drop:
+            shutil.rmtree(os.path.join(self.job_dir, job_id), ignore_errors=True)
+
+    def _new_job(self, kind: str, params: dict, n_chunks: int, ext: str) -> Job:
+        self._evict()
+        job_id = uuid.uuid4().hex[:12]
+        path = os.path.join(self.job_dir, job_id)
+        os.makedirs(path, exist_ok=True)
+        job = Job(id=job_id, type=kind, params=params,
+                  chunks=[os.path.join(path, f"chunk-{k:04d}.{ext}") for k in range(n_chunks)],
+                  done=[False] * n_chunks)
+        self._save(job)
+        with self._lock:
+            self._jobs[job_id] = job
+        return job
+
+    def _attach(self, job: Job, k: int, fut: Future) -> None:
+        def on_done(f: Future, k=k):
+            with self._lock:
+                if f.cancelled():
+                    pass
+                elif f.exception() is not None:
+                    job.errors.append(f"chunk {k}: {type(f.exception()).__name__}: {f.exception()}")
+                else:
+                    job.done[k] = True
+                # the job is visible while later chunks are still being submitted:
+                # it has finished only once every chunk has a future and all are done
+                if (job.finished is None and len(job.futures) == len(job.chunks)
+                        and all(x.done() for x in job.futures)):
+                    job.finished = time.time()
+                self._save(job)
+        with self._lock:
+            job.futures.append(fut)
+        fut.add_done_callback(on_done)
+
+    def submit_screen(self, tles: Sequence[TLETuple], start: Optional[datetime] = None,
+                      hours: float = 24.0, step_s: float = 30.0, threshold_km: float = 5.0,
+                      chunk_hours: Optional[float] = None) -> Job:
+        """All-vs-all screening split into time sub-windows, one per chunk."""
+        if hours <= 0 or step_s <= 0 or threshold_km <= 0:
+            raise ValueError("hours, step_s and threshold_km must be positive.")
+        if len(tles) < 2:
+            raise ValueError("Need at least two TLEs to screen.")
+        start = start or datetime.now(timezone.utc)
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        # whole steps per chunk: each sub-window then ends on the next one's first
+        # sample, so an approach between chunks is seen by both (and merged once)
+        chunk_steps = (max(1, round(chunk_hours * 3600.0 / step_s)) if chunk_hours
+                       else max(1, int(np.ceil(hours * 3600.0 / step_s / self._workers()))))
+        chunk_hours = chunk_steps * step_s / 3600.0
+        n = max(1, int(np.ceil(hours / chunk_hours - 1e-9)))
+        params = {"objects": len(tles), "start": start.isoformat(), "hours": hours,
+                  "step_s": step_s, "threshold_km": threshold_km, "chunk_hours": chunk_hours}
+        job = self._new_job("screen", params, n, "json")
+        tles = [tuple(t) for t in tles]
+        for k in range(n):
+            sub_start = start + timedelta(seconds=k * chunk_steps * step_s)
+            sub_hours = min(chunk_hours, hours - k * chunk_hours)
+            self._attach(job, k, self._submit(_screen_chunk, tles, sub_start.isoformat(), sub_hours,
+                                              step_s, threshold_km, job.chunks[k]))
+        return job
+
+    def submit_propagate(self, tles: Sequence[TLETuple], jd: np.ndarray, fr: np.ndarray,
+                         frame: str = "gcrs", chunk_objects: int = 2000) -> Job:
+        """propagate_grid over object slices; each chunk spills r/v as float32 .npz."""
+        if not tles:
+            raise ValueError("No TLEs supplied.")
+        n = max(1, int(np.ceil(len(tles) / chunk_objects)))
+        params = {"objects": len(tles), "epochs": len(jd), "frame": frame, "chunk_objects": chunk_objects}
+        job = self._new_job("propagate", params, n, "npz")
+        for k in range(n):
+            part = [tuple(t) for t in tles[k * chunk_objects:(k + 1) * chunk_objects]]
+            self._attach(job, k, self._submit(_propagate_chunk, part, np.asarray(jd), np.asarray(fr),
+                                              frame, job.chunks[k]))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """This worker's job, or another worker's as last saved to ORBIO_JOB_DIR."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return self._load(job_id)
+        if not job.cancelled and job.finished is None:
+            saved = self._load(job_id)
+            if saved is not None and saved.cancelled:      # cancelled via another worker
+                self._cancel(job)
+        return job
+
+    def list(self) -> List[Job]:
+        jobs = dict(self._jobs)
+        try:
+            names = os.listdir(self.job_dir)
+        except OSError:
+            names = []
+        for name in names:
+            if name not in jobs:
+                job = self._load(name)
+                if job is not None:
+                    jobs[name] = job
+        return sorted(jobs.values(), key=lambda j: j.created, reverse=True)
+
+    def _cancel(self, job: Job) -> None:
+        job.cancelled = True
+        for f in job.futures:
+            f.cancel()
+        self._save(job)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel queued chunks; chunks already running finish but are discarded."""
+        job = self._jobs.get(job_id) or self._load(job_id)
+        if job is None:
+            return False
+        self._cancel(job)
+        return True
+
+    def delete(self, job_id: str) -> bool:
+        if not self.cancel(job_id):
+            return False
+        with self._lock:
+            self._jobs.pop(job_id, None)
+        shutil.rmtree(os.path.join(self.job_dir, job_id), ignore_errors=True)
+        return True
+
+    def screen_results(self, job: Job) -> List[dict]:
+        """
+        Merged events from finished chunks, ranked by miss distance. A pair (by
+        NORAD IDs: names repeat) keeps every approach; one found by two adjacent
+        chunks (TCAs within a step) is kept once.
+        """
+        tol_s = float(job.params.get("step_s", 30.0))
+        by_pair: Dict[Tuple[str, str], List[dict]] = {}
+        for k, ok in enumerate(job.done):
+            if ok:
+                for ev in _read_json(job.chunks[k]):
+                    same = by_pair.setdefault((ev["norad1"], ev["norad2"]), [])
+                    tca = datetime.fromisoformat(ev["tca"])
+                    dup = next((n for n, prev in enumerate(same)
+                                if abs((datetime.fromisoformat(prev["tca"]) - tca).total_seconds()) < tol_s), None)
+                    if dup is None:
+                        same.append(ev)
+                    elif ev["miss_km"] < same[dup]["miss_km"]:
+                        same[dup] = ev
+        return sorted((ev for same in by_pair.values() for ev in same), key=lambda ev: ev["miss_km"])
+
+    def iter_chunks(self, job: Job, poll_s: float = 0.5, timeout_s: float = 3600.0) -> Iterator[Tuple[int, str]]:
+        """Yield (chunk index, spill path) as chunks finish, until the job settles."""
+        seen = set()
+        deadline = time.monotonic() + timeout_s
+        while time.monotonic() < deadline:
+            job = self.get(job.id) or job          # another worker's job: re-read its saved state
+            for k, ok in enumerate(job.done):
+                if ok and k not in seen:
+                    seen.add(k)
+                    yield k, job.chunks[k]
+            if job.finished is not None or job.cancelled:
+                if all(k in seen for k, ok in enumerate(job.done) if ok):
+                    return
+            time.sleep(poll_s)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+def _read_json(path: str):
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
@@ -0,0 +1,333 @@
+# maneuver.py
+"""
+Collision-avoidance maneuver trade space for one conjunction.
+
+Candidates are impulsive burns of the satellite (object 1): delta-v
+magnitude x direction (in its radial / along-track / cross-track frame at
+burn time) x lead time before TCA, all evaluated in one array pass.
+- Both objects are re-propagated with the dynamics the conjunction was
+  found with: "kepler" (two-body, vectorised universal-variable solver;
+  SGP4 cannot apply an impulsive burn) or "linear" (straight-line tracks,
+  as conjunction.screen_linear / safety()). The unburned baseline is
+  recomputed with the same model, so every candidate is compared like with
+  like.
+- Burns happen between the state epoch and TCA: default leads that would
+  fall before the epoch are dropped, explicit ones are rejected.
+- Each candidate's new TCA is found by re-linearising around the nominal
+  one; it then gets a miss distance and a 2D Pc (collision.pc_isotropic,
+  the same covariance model as safety()).
+- pareto() is the fuel vs. miss-distance front: the least delta-v for each
+  achievable miss distance.
+All states are km and km/s in one inertial frame (GCRS / TEME).
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+import collision
+from metrics import timed
+
+MU_KM3_S2 = 398600.4418
+DEFAULT_MAGNITUDES_M_S = tuple(np.round(np.geomspace(0.01, 2.0, 16), 4))
+DEFAULT_LEADS_REV = (0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 2.5, 3.0, 4.0)   # orbits of the satellite
+DEFAULT_AZIMUTHS = 12                       # directions in the radial / along-track plane
+DEFAULT_ELEVATIONS_DEG = (-60.0, -30.0, 0.0, 30.0, 60.0)
+DYNAMICS = ("kepler", "linear")
+_FALLBACK_LEADS = (0.25, 0.5, 0.75, 1.0)    # fractions of the time to TCA when no default lead fits
+MAX_CANDIDATES = 200_000
+_KEPLER_ITERS = 50
+_TCA_ITERS = 4
+
+def _stumpff(z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # C(z), S(z) with a series near z = 0, where the closed forms cancel
+    c = np.empty_like(z)
+    s = np.empty_like(z)
+    pos, neg = z > 1e-3, z < -1e-3
+    mid = ~(pos | neg)
+    sq = np.sqrt(z[pos])
+    c[pos] = (1.0 - np.cos(sq)) / z[pos]
+    s[pos] = (sq - np.sin(sq)) / sq ** 3
+    sq = np.sqrt(-z[neg])
+    c[neg] = (np.cosh(sq) - 1.0) / -z[neg]
+    s[neg] = (np.sinh(sq) - sq) / sq ** 3
+    zm = z[mid]
+    c[mid] = 0.5 - zm / 24.0 + zm * zm / 720.0
+    s[mid] = 1.0 / 6.0 - zm / 120.0 + zm * zm / 5040.0
+    return c, s
+
+def kepler(r0, v0, dt) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Two-body state after dt seconds (universal variables, Newton on chi).
+    r0, v0: (..., 3); dt: (...); all broadcast. Returns (r, v) (..., 3).
+    """
+    r0, v0 = np.broadcast_arrays(np.asarray(r0, dtype=float), np.asarray(v0, dtype=float))
+    dt = np.asarray(dt, dtype=float)
+    shape = np.broadcast_shapes(r0.shape[:-1], dt.shape)
+    r0 = np.broadcast_to(r0, shape + (3,)).reshape(-1, 3)
+    v0 = np.broadcast_to(v0, shape + (3,)).reshape(-1, 3)
+    dt = np.broadcast_to(dt, shape).ravel()
+
+    sqmu = np.sqrt(MU_KM3_S2)
+    rn = np.linalg.norm(r0, axis=1)
+    rv = np.einsum("ni,ni->n", r0, v0) / sqmu
+    alpha = 2.0 / rn - np.einsum("ni,ni->n", v0, v0) / MU_KM3_S2
+    chi = sqmu * np.abs(alpha) * dt
+    for _ in range(_KEPLER_ITERS):
+        z = alpha * chi * chi
+        c, s = _stumpff(z)
+        f = rv * chi * chi * c + (1.0 - alpha * rn) * chi ** 3 * s + rn * chi - sqmu * dt
+        df = rv * chi * (1.0 - z * s) + (1.0 - alpha * rn) * chi * chi * c + rn
+        step = f / df
+        chi = chi - step
+        if np.all(np.abs(step) < 1e-9):
+            break
+    z = alpha * chi * chi
+    c, s = _stumpff(z)
+    fg_f = 1.0 - chi * chi / rn * c
+    fg_g = dt - chi ** 3 * s / sqmu
+    r = fg_f[:, None] * r0 + fg_g[:, None] * v0
+    r1 = np.linalg.norm(r, axis=1)
+    fdot = sqmu / (r1 * rn) * (z * chi * s - chi)
+    gdot = 1.0 - chi * chi / r1 * c
+    v = fdot[:, None] * r0 + gdot[:, None] * v0
+    return r.reshape(shape + (3,)), v.reshape(shape + (3,))
+
+def rtn_basis(r, v) -> np.ndarray:
+    """(..., 3, 3) rows: radial, along-track (in-plane, towards v), cross-track."""
+    r, v = np.asarray(r, dtype=float), np.asarray(v, dtype=float)
+    rh = r / np.linalg.norm(r, axis=-1, keepdims=True)
+    n = np.cross(r, v)
+    nh = n / np.linalg.norm(n, axis=-1, keepdims=True)
+    return np.stack([rh, np.cross(nh, rh), nh], axis=-2)
+
+def direction_grid(n_azimuth: int = DEFAULT_AZIMUTHS,
+                   elevations_deg: Sequence[float] = DEFAULT_ELEVATIONS_DEG) -> np.ndarray:
+    """
+    (D, 3) unit RTN directions: n_azimuth in the radial / along-track plane
+    (azimuth 0 = +T, 90 = +R) at each elevation towards +N, plus +/-N.
+    """
+    az = np.radians(np.arange(n_azimuth) * 360.0 / n_azimuth)
+    el = np.radians(np.asarray(elevations_deg, dtype=float))
+    el = el[np.abs(el) < np.pi / 2 - 1e-9]
+    A, E = np.meshgrid(az, el, indexing="ij")
+    d = np.stack([np.sin(A) * np.cos(E), np.cos(A) * np.cos(E), np.sin(E)], axis=-1).reshape(-1, 3)
+    return np.vstack([d, [[0.0, 0.0, 1.0], [0.0, 0.0, -1.0]]])
+
+def period_s(r, v) -> float:
+    """Two-body orbital period of one state (inf if unbound)."""
+    r, v = np.asarray(r, dtype=float), np.asarray(v, dtype=float)
+    inv_a = 2.0 / np.linalg.norm(r) - v @ v / MU_KM3_S2
+    return float(2.0 * np.pi * np.sqrt(1.0 / inv_a ** 3 / MU_KM3_S2)) if inv_a > 0 else float("inf")
+
+def _refine_tca(r1, v1, t1, r2, v2, t_guess: float, lo: float, hi: float, iters: int = _TCA_ITERS):
+    """
+    TCA near t_guess for object 1 (state r1, v1 at times t1) and object 2
+    (state r2, v2 at t = 0): both are carried to t_guess once, then Newton
+    on d/dt |dr|^2 re-propagates them over the (short) remaining offsets.
+    Returns (tca, dr, dv).
+    """
+    a0, va0 = kepler(r1, v1, t_guess - np.asarray(t1, dtype=float))
+    b0, vb0 = kepler(r2, v2, t_guess)
+    t = np.full(a0.shape[:-1], float(t_guess))
+    dr, dv = b0 - a0, vb0 - va0
+    for _ in range(iters):
+        dv2 = np.einsum("...i,...i->...", dv, dv)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = np.where(dv2 > 0, -np.einsum("...i,...i->...", dr, dv) / dv2, 0.0)
+        t = np.clip(t + step, lo, hi)
+        a, va = kepler(a0, va0, t - t_guess)
+        b, vb = kepler(b0, vb0, t - t_guess)
+        dr, dv = b - a, vb - va
+    return t, dr, dv
+
+def _linear_tca(dr0, dv, lo: float, hi: float):
+    # straight-line relative motion dr0 + dv t: closed-form TCA clipped to [lo, hi]
+    dv2 = np.einsum("...i,...i->...", dv, dv)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(dv2 > 0, -np.einsum("...i,...i->...", dr0, dv) / dv2, lo)
+    t = np.clip(t, lo, hi)
+    return t, dr0 + dv * t[..., None], dv
+
+def find_tca(r1, v1, r2, v2, window_s: float, step_s: float = 10.0) -> Tuple[float, float]:
+    """Two-body closest approach over [0, window_s]: sampled, then refined. Returns (tca_s, miss_km)."""
+    if window_s <= 0 or step_s <= 0:
+        raise ValueError("window_s and step_s must be positive.")
+    times = np.arange(0.0, window_s + 0.5 * step_s, step_s)
+    a, _ = kepler(r1, v1, times)
+    b, _ = kepler(r2, v2, times)
+    k = int(np.argmin(np.linalg.norm(b - a, axis=-1)))
+    t, dr, _ = _refine_tca(r1, v1, 0.0, r2, v2, float(times[k]),
+                           max(0.0, times[k] - step_s), min(window_s, times[k] + step_s))
+    return float(t), float(np.linalg.norm(dr))
+
+@dataclass
+class Candidate:
+    dv_m_s: float
+    direction_rtn: Tuple[float, float, float]
+    lead_s: float
+    burn_s: float                 # burn time, s from the state epoch
+    tca_s: float
+    miss_km: float
+    pc: float
+
+    @property
+    def direction(self) -> str:
+        """Readable RTN direction, e.g. "+T" or "+0.87T +0.50R"."""
+        parts = sorted(((abs(x), x, axis) for x, axis in zip(self.direction_rtn, "RTN") if abs(x) >= 0.005),
+                       reverse=True)
+        if len(parts) == 1:
+            return ("+" if parts[0][1] > 0 else "-") + parts[0][2]
+        return " ".join(f"{x:+.2f}{axis}" for _, x, axis in parts)
+
+    def to_dict(self) -> dict:
+        return {
+            "dv_m_s": round(self.dv_m_s, 4),
+            "direction": self.direction,
+            "direction_rtn": [round(x, 4) for x in self.direction_rtn],
+            "lead_s": round(self.lead_s, 1),
+            "burn_s": round(self.burn_s, 1),
+            "tca_s": round(self.tca_s, 3),
+            "miss_km": round(self.miss_km, 4),
+            "pc": self.pc,
+            "risk": collision.risk_label(self.pc),
+        }
+
+@dataclass
+class TradeSpace:
+    tca_s: float                  # baseline (no burn), same dynamics as the candidates
+    miss_km: float
+    pc: float
+    dv_m_s: np.ndarray            # (N,) per candidate
+    directions: np.ndarray        # (N, 3) RTN
+    lead_s: np.ndarray
+    new_tca_s: np.ndarray
+    new_miss_km: np.ndarray
+    new_pc: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.dv_m_s)
+
+    def candidate(self, i: int) -> Candidate:
+        return Candidate(dv_m_s=float(self.dv_m_s[i]), direction_rtn=tuple(float(x) for x in self.directions[i]),
+                         lead_s=float(self.lead_s[i]), burn_s=float(self.tca_s - self.lead_s[i]),
+                         tca_s=float(self.new_tca_s[i]), miss_km=float(self.new_miss_km[i]),
+                         pc=float(self.new_pc[i]))
+
+    def pareto_index(self) -> np.ndarray:
+        """Candidates no other one beats on both delta-v and miss distance, by increasing delta-v."""
+        order = np.lexsort((-self.new_miss_km, self.dv_m_s))
+        miss = self.new_miss_km[order]
+        best_before = np.maximum.accumulate(np.r_[self.miss_km, miss[:-1]])
+        return order[miss > best_before]
+
+    def pareto(self) -> List[Candidate]:
+        return [self.candidate(i) for i in self.pareto_index()]
+
+    def cheapest(self, min_miss_km: Optional[float] = None, max_pc: Optional[float] = None) -> Optional[Candidate]:
+        """Least delta-v candidate meeting the targets (ties: larger miss), or None."""
+        ok = np.ones(len(self), dtype=bool)
+        if min_miss_km is not None:
+            ok &= self.new_miss_km >= min_miss_km
+        if max_pc is not None:
+            ok &= self.new_pc <= max_pc
+        idx = np.flatnonzero(ok)
+        if not len(idx):
+            return None
+        return self.candidate(int(idx[np.lexsort((-self.new_miss_km[idx], self.dv_m_s[idx]))[0]]))
+
+    def to_dict(self) -> dict:
+        return {
+            "baseline": {"tca_s": round(self.tca_s, 3), "miss_km": round(self.miss_km, 4), "pc": self.pc,
+                         "risk": collision.risk_label(self.pc)},
+            "candidates": len(self),
+            "pareto": [c.to_dict() for c in self.pareto()],
+        }
+
+@timed("maneuver")
+def evaluate(r1, v1, r2, v2,
+             tca_s: float,
+             magnitudes_m_s: Sequence[float] = DEFAULT_MAGNITUDES_M_S,
+             directions: Optional[np.ndarray] = None,
+             leads_s: Optional[Sequence[float]] = None,
+             sigma_km: float = collision.DEFAULT_SIGMA_KM,
+             hbr_km: float = collision.DEFAULT_HBR_KM,
+             dynamics: str = "kepler",
+             window_s: Optional[float] = None) -> TradeSpace:
+    """
+    Evaluate every magnitude x direction x lead burn of object 1 against
+    object 2 for the conjunction at tca_s (s from the states' epoch).
+    - directions: (D, 3) RTN vectors (normalised here); default direction_grid().
+    - leads_s: seconds before TCA, at most tca_s; default DEFAULT_LEADS_REV
+      orbits that fit before TCA (else fractions of tca_s).
+    - dynamics: "kepler" or "linear"; use the model that found tca_s.
+    - window_s: TCAs are searched in [0, window_s] (as the screening that
+      found tca_s did); default tca_s +/- 600 s.
+    - Pc uses isotropic sigma_km per object and hbr_km, as in safety().
+    """
+    if dynamics not in DYNAMICS:
+        raise ValueError(f"dynamics must be one of {DYNAMICS}.")
+    r1, v1, r2, v2 = (np.asarray(x, dtype=float).reshape(3) for x in (r1, v1, r2, v2))
+    mags = np.asarray(magnitudes_m_s, dtype=float) / 1000.0
+    dirs = direction_grid() if directions is None else np.asarray(directions, dtype=float).reshape(-1, 3)
+    norm = np.linalg.norm(dirs, axis=1)
+    if not len(mags) or np.any(mags <= 0) or not len(dirs) or np.any(norm == 0):
+        raise ValueError("Magnitudes must be positive and directions non-zero.")
+    dirs = dirs / norm[:, None]
+    tca_s = float(tca_s)
+    lo, hi = (0.0, float(window_s)) if window_s else (tca_s - 600.0, tca_s + 600.0)
+
+    # baseline, same dynamics as the candidates
+    if dynamics == "linear":
+        t0, dr0, dv0 = _linear_tca(r2 - r1, v2 - v1, lo, hi)
+    else:
+        t0, dr0, dv0 = _refine_tca(r1, v1, 0.0, r2, v2, tca_s, lo, hi)
+    t0 = float(t0)
+    pc0 = float(collision.pc_isotropic(collision.plane_miss(dr0, dv0), np.sqrt(2.0) * sigma_km, hbr_km)[0])
+    if t0 <= 0:
+        raise ValueError("The conjunction is at the state epoch; there is no time to maneuver.")
+
+    if leads_s is None:
+        period = period_s(r1, v1)
+        if not np.isfinite(period):
+            raise ValueError("Satellite state is not on a bound orbit.")
+        leads = np.asarray(DEFAULT_LEADS_REV) * period
+        leads = leads[leads <= t0]
+        if not len(leads):
+            leads = np.asarray(_FALLBACK_LEADS) * t0
+    else:
+        leads = np.asarray(leads_s, dtype=float).ravel()
+        if np.any(leads > t0):
+            raise ValueError(f"Lead times must not exceed the time to TCA ({t0:.1f} s).")
+    if not len(leads) or np.any(leads <= 0):
+        raise ValueError("Lead times must be positive.")
+    n = len(leads) * len(dirs) * len(mags)
+    if n > MAX_CANDIDATES:
+        raise ValueError(f"Too many candidates ({n}; max {MAX_CANDIDATES}).")
+
+    # burn states per lead, then (lead, direction, magnitude) delta-v in inertial axes
+    t_burn = t0 - leads
+    if dynamics == "linear":
+        rb, vb = r1 + v1 * t_burn[:, None], np.broadcast_to(v1, (len(leads), 3))
+    else:
+        rb, vb = kepler(r1, v1, t_burn)                              # (L, 3)
+    dv_dirs = np.einsum("dk,lkj->ldj", dirs, rtn_basis(rb, vb))     # (L, D, 3)
+    dv = dv_dirs[:, :, None, :] * mags[None, None, :, None]          # (L, D, M, 3)
+    shape = dv.shape[:-1]
+    rb_c = np.broadcast_to(rb[:, None, None, :], shape + (3,)).reshape(-1, 3)
+    vb_c = (vb[:, None, None, :] + dv).reshape(-1, 3)
+    tb_c = np.broadcast_to(t_burn[:, None, None], shape).ravel()
+
+    if dynamics == "linear":
+        # object 1 after the burn: rb + vb_c (t - t_burn)
+        t, dr, dvel = _linear_tca(r2 - rb_c + vb_c * tb_c[:, None], v2 - vb_c, lo, hi)
+    else:
+        t, dr, dvel = _refine_tca(rb_c, vb_c, tb_c, r2, v2, t0, lo, hi)
+    miss = np.linalg.norm(dr, axis=1)
+    pc = collision.pc_isotropic(collision.plane_miss(dr, dvel), np.sqrt(2.0) * sigma_km, hbr_km)
+    return TradeSpace(
+        tca_s=t0, miss_km=float(np.linalg.norm(dr0)), pc=pc0,
+        dv_m_s=np.broadcast_to(mags[None, None, :] * 1000.0, shape).ravel(),
+        directions=np.broadcast_to(dirs[None, :, None, :], shape + (3,)).reshape(-1, 3),
+        lead_s=np.broadcast_to(leads[:, None, None], shape).ravel(),
+        new_tca_s=t, new_miss_km=miss, new_pc=pc,
+    )
@@ -0,0 +1,232 @@
+# metrics.py
+"""
+In-process latency histograms and counters, rendered as Prometheus text.
+
+- ORBIO_METRICS=0 turns everything off: timed() then returns the wrapped
+  function unchanged / a shared no-op context, so the hot paths pay nothing.
+- timed("stage") works as a decorator or a context manager and records into
+  orbio_stage_seconds{stage="..."}.
+- init_app(app) adds per-route request histograms, Jinja render timing and a
+  /metrics endpoint.
+- ORBIO_PROFILE=<rate> (0..1) runs cProfile on that fraction of requests and
+  dumps .prof files to ORBIO_PROFILE_DIR.
+"""
+from __future__ import annotations
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+ENABLED = os.environ.get("ORBIO_METRICS", "1").lower() not in ("0", "false", "no", "off")
+PROFILE_RATE = float(os.environ.get("ORBIO_PROFILE", "0") or 0)
+PROFILE_DIR = os.environ.get("ORBIO_PROFILE_DIR", "./profiles")
+
+# seconds; spans a cached ROI lookup (~10 us) up to a full catalog screen
+DEFAULT_BUCKETS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(kw: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in kw.items()))
+
+def _fmt_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+class Histogram:
+    def __init__(self, name: str, doc: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name, self.doc, self.buckets = name, doc, tuple(buckets)
+        self._series: Dict[Labels, List[float]] = {}   # bucket counts..., +Inf, sum
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            s[i] += 1
+            s[-1] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for labels, s in sorted(series.items()):
+            acc = 0.0
+            for le, n in zip(self.buckets, s):
+                acc += n
+                yield f"{self.name}_bucket{_fmt_labels(labels, ('le', repr(le)))} {acc:g}"
+            acc += s[len(self.buckets)]
+            yield f"{self.name}_bucket{_fmt_labels(labels, ('le', '+Inf'))} {acc:g}"
+            yield f"{self.name}_sum{_fmt_labels(labels)} {s[-1]:.6g}"
+            yield f"{self.name}_count{_fmt_labels(labels)} {acc:g}"
+
+class Counter:
+    def __init__(self, name: str, doc: str):
+        self.name, self.doc = name, doc
+        self._series: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            series = dict(self._series)
+        for labels, v in sorted(series.items()):
+            yield f"{self.name}{_fmt_labels(labels)} {v:g}"
+
+STAGE_SECONDS = Histogram("orbio_stage_seconds", "Time spent in an instrumented stage.")
+REQUEST_SECONDS = Histogram("orbio_request_seconds", "Request latency by route.")
+RENDER_SECONDS = Histogram("orbio_template_render_seconds", "Jinja render time by template.")
+REQUESTS = Counter("orbio_requests_total", "Requests by route, method and status.")
+
+_METRICS = [STAGE_SECONDS, REQUEST_SECONDS, RENDER_SECONDS, REQUESTS]
+_CACHES: Dict[str, Callable[[], Dict[str, Dict[Labels, float]]]] = {}
+
+def register_cache(name: str, cache) -> None:
+    """Expose an LRUCache-like object's stats() (hits/misses/evictions) and size."""
+    def collect() -> Dict[str, Dict[Labels, float]]:
+        st = cache.stats()
+        lab = (("cache", name),)
+        return {k: {lab: float(st.get(k, 0))} for k in ("hits", "misses", "evictions", "size")}
+    _CACHES[name] = collect
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __call__(self, fn):
+        return fn
+
+class _Timer:
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.t0, stage=self.stage)
+        return False
+
+    def __call__(self, fn):
+        stage = self.stage
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - t0, stage=stage)
+        return wrapper
+
+_NOOP_TIMER = _NoopTimer()
+
+def timed(stage: str):
+    """@timed("stage") or `with timed("stage"):`; free when metrics are disabled."""
+    return _Timer(stage) if ENABLED else _NOOP_TIMER
+
+def render() -> str:
+    lines: List[str] = []
+    for m in _METRICS:
+        lines.extend(m.render())
+    cache_series: Dict[str, Dict[Labels, float]] = {}
+    for collect in list(_CACHES.values()):
+        for metric, series in collect().items():
+            cache_series.setdefault(metric, {}).update(series)
+    for metric, series in sorted(cache_series.items()):
+        name = f"orbio_cache_{metric}" + ("" if metric == "size" else "_total")
+        lines.append(f"# TYPE {name} {'gauge' if metric == 'size' else 'counter'}")
+        lines.extend(f"{name}{_fmt_labels(lab)} {v:g}" for lab, v in sorted(series.items()))
+    return "\n".join(lines) + "\n"
+
+# -------- profiling --------
+@contextmanager
+def _maybe_profile(name: str):
+    if PROFILE_RATE <= 0 or random.random() >= PROFILE_RATE:
+        yield
+        return
+    import cProfile
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            safe = name.strip("/").replace("/", "_").replace("<", "").replace(">", "") or "index"
+            prof.dump_stats(os.path.join(PROFILE_DIR, f"{safe}-{int(time.time() * 1000)}.prof"))
+        except OSError:
+            pass
+
+# -------- Flask wiring --------
+def init_app(app) -> None:
+    """Request/render histograms and GET /metrics (a no-op apart from /metrics when disabled)."""
+    from flask import Response, g, request, template_rendered, before_render_template
+
+    @app.get("/metrics")
+    def metrics_endpoint():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
+
+    if not ENABLED and PROFILE_RATE <= 0:
+        return
+
+    @app.before_request
+    def _start_timer():
+        g._orbio_t0 = time.perf_counter()
+        if PROFILE_RATE > 0:
+            g._orbio_prof = _maybe_profile(request.path)
+            g._orbio_prof.__enter__()
+
+    @app.teardown_request
+    def _stop_timer(exc):
+        prof = g.pop("_orbio_prof", None)
+        if prof is not None:
+            prof.__exit__(None, None, None)
+
+    if not ENABLED:
+        return
+
+    @app.after_request
+    def _record(response):
+        t0 = g.pop("_orbio_t0", None)
+        if t0 is not None and request.endpoint != "metrics_endpoint":
+            route = request.url_rule.rule if request.url_rule else "<unmatched>"
+            # streamed bodies (NDJSON) are timed to the first byte only
+            REQUEST_SECONDS.observe(time.perf_counter() - t0, route=route, method=request.method)
+            REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        return response
+
+    def _render_start(sender, template, context, **extra):
+        g._orbio_render_t0 = time.perf_counter()
+
+    def _render_done(sender, template, context, **extra):
+        t0 = g.pop("_orbio_render_t0", None)
+        if t0 is not None:
+            RENDER_SECONDS.observe(time.perf_counter() - t0, template=template.name or "<string>")
+
+    before_render_template.connect(_render_start, app, weak=False)
+    template_rendered.connect(_render_done, app, weak=False)
@@ -0,0 +1,89 @@
+# page_cache.py
+"""
+Rendered-page cache for templates whose output depends only on their context.
+
+PAGES.render("index.html") renders once, keeps the HTML (plus a gzip copy)
+and a strong ETag, and answers If-None-Match with 304. An entry is dropped
+when the template or anything it extends/includes changes on disk (Jinja's
+own uptodate checks, one stat per dependency) or when the context passed in
+differs (it is part of the key).
+"""
+from __future__ import annotations
+import gzip
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, List, Set, Tuple
+from tle_cache import LRUCache
+
+@dataclass
+class CachedPage:
+    body: bytes
+    gz: bytes
+    etag: str
+    uptodate: Tuple[Callable[[], bool], ...]
+
+    def fresh(self) -> bool:
+        return all(check() for check in self.uptodate)
+
+def _context_key(context: dict) -> str:
+    return hashlib.blake2b(repr(sorted(context.items())).encode("utf-8"), digest_size=12).hexdigest()
+
+class PageCache:
+    def __init__(self, app=None, maxsize: int = 64):
+        self.pages = LRUCache(maxsize=maxsize, ttl_s=None)
+        self.app = app
+
+    def _dependencies(self, name: str) -> Tuple[Callable[[], bool], ...]:
+        # uptodate callbacks for the template and everything it extends / includes
+        from jinja2 import meta
+        env = self.app.jinja_env
+        seen: Set[str] = set()
+        checks: List[Callable[[], bool]] = []
+        todo = [name]
+        while todo:
+            current = todo.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            source, _, uptodate = env.loader.get_source(env, current)
+            if uptodate is not None:
+                checks.append(uptodate)
+            todo.extend(t for t in meta.find_referenced_templates(env.parse(source)) if t)
+        return tuple(checks)
+
+    def _build(self, template: str, context: dict) -> CachedPage:
+        from flask import render_template
+        body = render_template(template, **context).encode("utf-8")
+        return CachedPage(body=body,
+                          gz=gzip.compress(body, compresslevel=6, mtime=0),
+                          etag=hashlib.sha256(body).hexdigest()[:32],
+                          uptodate=self._dependencies(template))
+
+    def render(self, template: str, **context):
+        """Cached equivalent of render_template(...) returning a Response."""
+        from flask import Response, request
+        key = (template, _context_key(context))
+        page = self.pages.get(key)
+        if page is None or not page.fresh():
+            page = self._build(template, context)
+            self.pages.put(key, page)
+
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            resp = Response(page.gz, mimetype="text/html")
+            resp.headers["Content-Encoding"] = "gzip"
+            resp.set_etag(page.etag + "-gz")
+        else:
+            resp = Response(page.body, mimetype="text/html")
+            resp.set_etag(page.etag)
+        resp.headers["Vary"] = "Accept-Encoding"
+        resp.headers["Cache-Control"] = "public, no-cache"   # store, but revalidate (cheap 304)
+        return resp.make_conditional(request)
+
+    def clear(self) -> None:
+        self.pages.clear()
+
+    def stats(self):
+        return self.pages.stats()
+
+    def __len__(self) -> int:
+        return len(self.pages)
@@ -0,0 +1,328 @@
+# passes.py
+"""
+Ground-station pass prediction for many satellites x many stations.
+
+- Every object is propagated once on a coarse grid (step_s, ITRS), in object
+  chunks; each station then needs one vectorised elevation pass per chunk.
+- A pass is a run of samples above the station's elevation mask. Rise / set
+  are the mask crossings at either end of the run, culmination the elevation
+  maximum inside it. All of them are refined together (bisection and
+  golden-section search) on a cubic Hermite interpolant of the ITRS
+  position: SGP4 velocities are its derivatives, so refinement needs no
+  extra propagation and is good to a few ms at step_s = 60.
+- Coarse local maxima just under the mask are refined as well, so short
+  passes that fit between two samples are not lost.
+- Station ECEF positions / ENU rotations are cached per (lat, lon, alt).
+"""
+from __future__ import annotations
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple, Union
+import numpy as np
+from tle_utils import TLEParseResult, norad_id, parse_tle_block, propagate_grid, times_to_jd
+from metrics import timed
+
+DEFAULT_STEP_S = 60.0
+DEFAULT_DAYS = 1.0
+DEFAULT_MIN_EL_DEG = 10.0
+MAX_DAYS = 14.0
+MAX_PAIRS = int(os.environ.get("ORBIO_PASSES_MAX_PAIRS", "50000"))   # objects x stations per call
+GRAZE_DEG = 3.0                  # coarse maxima this far under the mask get refined
+CHUNK_SAMPLES = 2_000_000        # object-epochs propagated at once
+_ROOT_ITERS = 17                 # bisection on <= 1 step: ~0.5 ms at step_s = 60
+_PEAK_ITERS = 28                 # golden section on <= 2 steps: ~0.2 ms
+_GOLDEN = (np.sqrt(5.0) - 1.0) / 2.0
+
+# WGS84
+_A_KM = 6378.137
+_E2 = 6.69437999014e-3
+
+@dataclass(frozen=True)
+class Station:
+    name: str
+    lat_deg: float
+    lon_deg: float
+    alt_km: float = 0.0
+    min_el_deg: float = DEFAULT_MIN_EL_DEG
+
+    def __post_init__(self):
+        if not -90.0 <= self.lat_deg <= 90.0 or not -180.0 <= self.lon_deg <= 360.0:
+            raise ValueError(f"Station {self.name!r}: latitude/longitude out of range.")
+        if not -90.0 < self.min_el_deg < 90.0:
+            raise ValueError(f"Station {self.name!r}: min_el_deg must be within (-90, 90).")
+
+@lru_cache(maxsize=1024)
+def station_frame(lat_deg: float, lon_deg: float, alt_km: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """(ECEF position (3,) km, rows east / north / up (3, 3)) for a geodetic site."""
+    lat, lon = np.radians(lat_deg), np.radians(lon_deg)
+    sl, cl, so, co = np.sin(lat), np.cos(lat), np.sin(lon), np.cos(lon)
+    n = _A_KM / np.sqrt(1.0 - _E2 * sl * sl)
+    ecef = np.array([(n + alt_km) * cl * co, (n + alt_km) * cl * so, (n * (1.0 - _E2) + alt_km) * sl])
+    enu = np.array([[-so, co, 0.0],
+                    [-sl * co, -sl * so, cl],
+                    [cl * co, cl * so, sl]])
+    ecef.flags.writeable = False
+    enu.flags.writeable = False
+    return ecef, enu
+
+@dataclass
+class Pass:
+    obj: str
+    norad: str
+    station: str
+    rise: Optional[datetime]        # None: already above the mask at the window start
+    culmination: datetime
+    set: Optional[datetime]         # None: still above the mask at the window end
+    max_el_deg: float
+    rise_az_deg: Optional[float]
+    culmination_az_deg: float
+    set_az_deg: Optional[float]
+    profile: Optional[List[Tuple[datetime, float, float]]] = None   # (time, el, az) samples
+
+    @property
+    def duration_s(self) -> Optional[float]:
+        if self.rise is None or self.set is None:
+            return None
+        return (self.set - self.rise).total_seconds()
+
+    def to_dict(self) -> dict:
+        iso = lambda t: t.isoformat() if t else None
+        rnd = lambda x: round(x, 3) if x is not None else None
+        out = {
+            "obj": self.obj,
+            "norad": self.norad,
+            "station": self.station,
+            "rise": iso(self.rise),
+            "culmination": iso(self.culmination),
+            "set": iso(self.set),
+            "duration_s": rnd(self.duration_s),
+            "max_el_deg": rnd(self.max_el_deg),
+            "rise_az_deg": rnd(self.rise_az_deg),
+            "culmination_az_deg": rnd(self.culmination_az_deg),
+            "set_az_deg": rnd(self.set_az_deg),
+        }
+        if self.profile is not None:
+            out["profile"] = [[t.isoformat(), round(el, 3), round(az, 3)] for t, el, az in self.profile]
+        return out
+
+class _Track:
+    """Coarse ITRS samples of one object chunk, as seen from one station."""
+
+    def __init__(self, r: np.ndarray, v: np.ndarray, rr: np.ndarray, step_s: float, station: Station):
+        self.r, self.v, self.h = r, v, step_s
+        self.ecef, self.enu = station_frame(station.lat_deg, station.lon_deg, station.alt_km)
+        self.sin_mask = np.sin(np.radians(station.min_el_deg))
+        # |r - s|^2 = |r|^2 - 2 r.s + |s|^2 and (r - s).up, from one product with r
+        q = r @ np.stack([self.enu[2], self.ecef], axis=1)
+        dist = np.sqrt(rr - 2.0 * q[..., 1] + self.ecef @ self.ecef)
+        # sin(elevation) - sin(mask): same sign / roots / maxima as elevation - mask
+        self.f = (q[..., 0] - self.enu[2] @ self.ecef) / dist - self.sin_mask
+        self.f[np.isnan(self.f)] = -2.0        # SGP4 failures never count as visible
+
+    def segments(self, o: np.ndarray, k0: np.ndarray) -> "_Segments":
+        return _Segments(self, o, k0)
+
+    def look(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(elevation, azimuth) in degrees at every sample."""
+        d = (self.r - self.ecef) @ self.enu.T
+        el = np.degrees(np.arcsin(d[..., 2] / np.linalg.norm(d, axis=-1)))
+        return el, np.degrees(np.arctan2(d[..., 0], d[..., 1])) % 360.0
+
+class _Segments:
+    """
+    Cubic Hermite fits of objects o over samples [k0, k0 + 2] in the station's
+    east / north / up frame: all refinement for a batch of events runs on
+    these, without touching the full sample arrays again.
+    """
+
+    def __init__(self, track: _Track, o: np.ndarray, k0: np.ndarray):
+        self.k0 = np.clip(k0, 0, track.r.shape[1] - 3).astype(float)
+        self.sin_mask = track.sin_mask
+        k = self.k0.astype(np.int64)
+        self.coef = []
+        for j in (0, 1):
+            p0, p1 = track.r[o, k + j] - track.ecef, track.r[o, k + j + 1] - track.ecef
+            m0, m1 = track.h * track.v[o, k + j], track.h * track.v[o, k + j + 1]
+            c = np.stack([p0, m0, 3 * (p1 - p0) - 2 * m0 - m1, 2 * (p0 - p1) + m0 + m1], axis=1)
+            self.coef.append(c @ track.enu.T)      # (M, 4, 3)
+
+    def at(self, x: np.ndarray) -> np.ndarray:
+        """(e, n, u) km at fractional sample index x, shape (M, 3)."""
+        u = x - self.k0
+        second = (u >= 1.0)[:, None]
+        out = []
+        for j, c in enumerate(self.coef):
+            t = (u - j)[:, None]
+            out.append(c[:, 0] + t * (c[:, 1] + t * (c[:, 2] + t * c[:, 3])))
+        return np.where(second, out[1], out[0])
+
+    def f(self, x: np.ndarray) -> np.ndarray:
+        p = self.at(x)
+        return p[:, 2] / np.sqrt(np.einsum("mk,mk->m", p, p)) - self.sin_mask
+
+    def root(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        # f(lo) and f(hi) have opposite signs; keep it that way while halving
+        lo, hi = lo.astype(float), hi.astype(float)
+        neg_lo = self.f(lo) < 0
+        for _ in range(_ROOT_ITERS):
+            mid = 0.5 * (lo + hi)
+            same = (self.f(mid) < 0) == neg_lo
+            lo = np.where(same, mid, lo)
+            hi = np.where(same, hi, mid)
+        return 0.5 * (lo + hi)
+
+    def peak(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        lo, hi = lo.astype(float), hi.astype(float)
+        a = hi - _GOLDEN * (hi - lo)
+        b = lo + _GOLDEN * (hi - lo)
+        fa, fb = self.f(a), self.f(b)
+        for _ in range(_PEAK_ITERS):
+            left = fa >= fb                  # maximum lies in [lo, b], else in [a, hi]
+            hi = np.where(left, b, hi)
+            lo = np.where(left, lo, a)
+            a, b = (np.where(left, hi - _GOLDEN * (hi - lo), b),
+                    np.where(left, a, lo + _GOLDEN * (hi - lo)))
+            fx = self.f(np.where(left, a, b))
+            fa, fb = np.where(left, fx, fb), np.where(left, fa, fx)
+        return 0.5 * (lo + hi)
+
+    def look(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(elevation, azimuth) in degrees."""
+        e, n, u = self.at(x).T
+        el = np.degrees(np.arcsin(u / np.sqrt(e * e + n * n + u * u)))
+        return el, np.degrees(np.arctan2(e, n)) % 360.0
+
+def _passes(track: _Track) -> Tuple[np.ndarray, ...]:
+    """
+    (object, rise, culmination, set) per pass as fractional sample indices,
+    plus the matching elevation / azimuth arrays (el_c, az_r, az_c, az_s).
+    Rise / set are NaN when the pass is cut by the window edge.
+    """
+    f = track.f
+    n_obj, n_t = f.shape
+    up = f >= 0
+    # runs of visible samples; row edges act as "not visible" neighbours
+    prev = np.zeros_like(up)
+    prev[:, 1:] = up[:, :-1]
+    nxt = np.zeros_like(up)
+    nxt[:, :-1] = up[:, 1:]
+    so, sk = np.nonzero(up & ~prev)
+    _, ek = np.nonzero(up & ~nxt)           # same row-major order: run i is [sk[i], ek[i]]
+
+    # coarse maximum per run
+    lengths = ek - sk + 1
+    offsets = np.cumsum(lengths) - lengths
+    run = np.repeat(np.arange(len(sk)), lengths)
+    k = np.repeat(sk, lengths) + (np.arange(lengths.sum()) - np.repeat(offsets, lengths))
+    order = np.lexsort((-f[np.repeat(so, lengths), k], run))
+    top = k[order[offsets]]
+
+    # grazing: coarse local maxima just under the mask
+    graze = np.sin(np.radians(GRAZE_DEG))
+    inner = f[:, 1:-1]
+    go, gk = np.nonzero((inner < 0) & (inner > -graze) & (inner > f[:, :-2]) & (inner >= f[:, 2:]))
+    gk = gk + 1
+
+    o = np.concatenate([so, go])
+    top = np.concatenate([top, gk])
+    peaks = track.segments(o, top - 1)
+    culm = peaks.peak(np.maximum(top - 1, 0), np.minimum(top + 1, n_t - 1))
+    f_culm = peaks.f(culm)
+    culm = np.where(f_culm >= f[o, top], culm, top.astype(float))   # never worse than the sample
+    keep = np.ones(len(o), dtype=bool)
+    keep[len(so):] = f_culm[len(so):] >= 0      # grazing maxima that actually clear the mask
+    el_c, az_c = peaks.look(culm)
+    o, top, culm, el_c, az_c = (a[keep] for a in (o, top, culm, el_c, az_c))
+
+    # runs cross the mask inside (sk - 1, sk) and (ek, ek + 1); grazing passes on either side of culm
+    rise_lo = np.concatenate([sk - 1, top[len(so):] - 1]).astype(float)
+    rise_hi = np.concatenate([sk.astype(float), culm[len(so):]])
+    set_lo = np.concatenate([ek.astype(float), culm[len(so):]])
+    set_hi = np.concatenate([ek + 1, top[len(so):] + 1]).astype(float)
+
+    rise, az_r = (np.full(len(o), np.nan) for _ in range(2))
+    sett, az_s = (np.full(len(o), np.nan) for _ in range(2))
+    for lo, hi, x, az in ((rise_lo, rise_hi, rise, az_r), (set_lo, set_hi, sett, az_s)):
+        ok = (lo >= 0) & (hi <= n_t - 1)
+        seg = track.segments(o[ok], np.floor(lo[ok]).astype(np.int64))
+        x[ok] = seg.root(lo[ok], hi[ok])
+        az[ok] = seg.look(x[ok])[1]
+    return o, rise, culm, sett, el_c, az_r, az_c, az_s
+
+def _as_record(tle: Union[str, TLEParseResult]) -> TLEParseResult:
+    return parse_tle_block(tle) if isinstance(tle, str) else tle
+
+@timed("passes")
+def predict(tles: Sequence[Union[str, TLEParseResult]],
+            stations: Sequence[Station],
+            start: Optional[datetime] = None,
+            days: float = DEFAULT_DAYS,
+            step_s: float = DEFAULT_STEP_S,
+            profile: bool = False) -> List[Pass]:
+    """
+    Passes of every object over every station in [start, start + days],
+    ordered by rise (or culmination, for passes cut by the window start).
+    - step_s is the coarse sampling step; passes shorter than it are still
+      found when their coarse maximum is within GRAZE_DEG of the mask.
+    - profile=True attaches the coarse (time, el, az) samples of each pass
+      plus its refined rise / culmination / set points.
+    """
+    if days <= 0 or step_s <= 0:
+        raise ValueError("days and step_s must be positive.")
+    if days > MAX_DAYS:
+        raise ValueError(f"days must be at most {MAX_DAYS:g}.")
+    if not tles:
+        raise ValueError("No TLEs supplied.")
+    if not stations:
+        raise ValueError("No stations supplied.")
+    if len(tles) * len(stations) > MAX_PAIRS:
+        raise ValueError(f"Too many object/station pairs for one request (max {MAX_PAIRS}).")
+    records = [_as_record(t) for t in tles]
+    start = start or datetime.now(timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    n_t = int(days * 86400.0 / step_s) + 1
+    if n_t < 3:
+        raise ValueError("Window must span at least two steps.")
+    t0 = np.datetime64(start.astimezone(timezone.utc).replace(tzinfo=None), "us")
+    jd, fr = times_to_jd(t0 + np.round(np.arange(n_t) * step_s * 1e6).astype("timedelta64[us]"))
+    when = lambda x: start + timedelta(seconds=float(x) * step_s)
+
+    out: List[Pass] = []
+    chunk = max(1, CHUNK_SAMPLES // n_t)
+    for lo in range(0, len(records), chunk):
+        recs = records[lo:lo + chunk]
+        r, v = propagate_grid(recs, (jd, fr), frame="itrs")
+        rr = np.einsum("otk,otk->ot", r, r)
+        for st in stations:
+            track = _Track(r, v, rr, step_s, st)
+            o, rise, culm, sett, el_c, az_r, az_c, az_s = _passes(track)
+            if not len(o):
+                continue
+            samples = track.look() if profile else None
+            ids = [norad_id(rec.line1) for rec in recs]
+            for i in range(len(o)):
+                rec, has_rise, has_set = recs[o[i]], not np.isnan(rise[i]), not np.isnan(sett[i])
+                p = Pass(obj=rec.name or ids[o[i]], norad=ids[o[i]], station=st.name,
+                         rise=when(rise[i]) if has_rise else None,
+                         culmination=when(culm[i]),
+                         set=when(sett[i]) if has_set else None,
+                         max_el_deg=float(el_c[i]),
+                         rise_az_deg=float(az_r[i]) if has_rise else None,
+                         culmination_az_deg=float(az_c[i]),
+                         set_az_deg=float(az_s[i]) if has_set else None)
+                if profile:
+                    pts = {float(x): (float(samples[0][o[i], x]), float(samples[1][o[i], x]))
+                           for x in range(int(np.ceil(rise[i])) if has_rise else 0,
+                                          (int(np.floor(sett[i])) if has_set else n_t - 1) + 1)}
+                    pts[float(culm[i])] = (p.max_el_deg, p.culmination_az_deg)
+                    if has_rise:
+                        pts[float(rise[i])] = (st.min_el_deg, p.rise_az_deg)
+                    if has_set:
+                        pts[float(sett[i])] = (st.min_el_deg, p.set_az_deg)
+                    p.profile = [(when(x), el, az) for x, (el, az) in sorted(pts.items())]
+                out.append(p)
+    out.sort(key=lambda p: (p.rise or p.culmination, p.station, p.norad))
+    return out
@@ -0,0 +1,179 @@
+# portfolio.py
+"""
+Budget-constrained portfolio across EXPERIMENT_LIBRARY-style experiments.
+
+Every experiment can be funded at one of several investment levels (or not at
+all). A level's value is the scenario's expected profit
+
+    value = p(x) * mult * leo_months_saved * annual_market_impact / 12 - x
+
+with p(x) from the investment-boosted scenario curve (scenario_probabilities_vec,
+also behind app.scenario_probabilities).
+"expected" uses the Medium scenario, "risk_adjusted" the Low one. The choice
+is a multiple-choice knapsack solved exactly by DP over a discretised budget
+(vectorised along the budget axis) or greedily by value density for very
+large libraries. One DP pass yields the optimum for every budget at once,
+which is the efficient frontier.
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+DEFAULT_LEVELS = (500_000, 1_000_000, 2_000_000, 5_000_000)
+DEFAULT_UNIT = 50_000              # DP budget granularity ($)
+MAX_DP_CELLS = 50_000_000          # experiments x budget units before falling back to greedy
+FRONTIER_POINTS = 20
+OBJECTIVES = {"expected": "Medium", "risk_adjusted": "Low"}
+
+def flatten_library(library: Dict[str, Dict[str, dict]]) -> List[Tuple[str, str, dict]]:
+    """EXPERIMENT_LIBRARY -> [(field, name, experiment), ...]"""
+    return [(field, name, exp) for field, exps in library.items() for name, exp in exps.items()]
+
+def scenario_probabilities_vec(base_p: np.ndarray, investment_usd: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Low / Medium / High success probability for a base probability and an
+    investment; broadcasts. Investment boosts p by up to 10 pts at $5M+, and
+    the scenario spread is tighter for a strong base.
+    """
+    p = np.clip(np.asarray(base_p, dtype=float), 0.0, 1.0)
+    boost = np.minimum(np.asarray(investment_usd, dtype=float) / 5_000_000.0, 0.10)
+    d_low = np.select([p >= 0.75, p >= 0.55, p >= 0.35], [0.08, 0.12, 0.15], 0.10)
+    d_high = np.select([p >= 0.75, p >= 0.55, p >= 0.35], [0.05, 0.10, 0.12], 0.18)
+    return {
+        "Low": np.clip(p - d_low + 0.30 * boost, 0.0, 1.0),
+        "Medium": np.clip(p + 0.60 * boost, 0.0, 1.0),
+        "High": np.clip(p + d_high + 1.00 * boost, 0.0, 1.0),
+    }
+
+def evaluate(experiments: Sequence[dict], levels: Sequence[float],
+             objective: str = "expected",
+             scenario_mults: Optional[Dict[str, float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """(cost, value) matrices of shape (n_experiments, n_levels)."""
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {sorted(OBJECTIVES)}.")
+    label = OBJECTIVES[objective]
+    mults = scenario_mults or {"Low": 0.6, "Medium": 1.0, "High": 1.4}
+    impact = np.array([float(e["annual_market_impact"]) for e in experiments])
+    months = np.array([float(e["leo_months_saved"]) for e in experiments])
+    base_p = np.array([float(e["success_prob"]) for e in experiments])
+    cost = np.broadcast_to(np.asarray(levels, dtype=float), (len(experiments), len(levels)))
+    p = scenario_probabilities_vec(base_p[:, None], cost)[label]
+    benefit = float(mults[label]) * months * impact / 12.0
+    return np.array(cost), p * benefit[:, None] - cost
+
+def solve_dp(cost: np.ndarray, value: np.ndarray, budget: float, unit: float = DEFAULT_UNIT):
+    """
+    Exact multiple-choice knapsack on a budget grid of `unit` dollars.
+    Returns (best value for every budget 0..B units, choice table (n, B+1)).
+    """
+    units = np.ceil(cost / unit).astype(np.int64)
+    B = int(budget // unit)
+    n, L = value.shape
+    if L > np.iinfo(np.int16).max:
+        raise ValueError(f"At most {np.iinfo(np.int16).max} investment levels are supported.")
+    dp = np.zeros(B + 1)
+    choice = np.full((n, B + 1), -1, dtype=np.int16)
+    for e in range(n):
+        best = dp.copy()
+        pick = choice[e]
+        for l in range(L):
+            c, v = int(units[e, l]), float(value[e, l])
+            if v <= 0 or c > B:
+                continue
+            cand = dp[:B + 1 - c] + v
+            better = cand > best[c:]
+            best[c:][better] = cand[better]
+            pick[c:][better] = l
+        dp = best
+    return dp, choice, units
+
+def _backtrack(choice: np.ndarray, units: np.ndarray, b: int) -> List[Tuple[int, int]]:
+    picks = []
+    for e in range(choice.shape[0] - 1, -1, -1):
+        l = int(choice[e, b])
+        if l >= 0:
+            picks.append((e, l))
+            b -= int(units[e, l])
+    return picks[::-1]
+
+def solve_greedy(cost: np.ndarray, value: np.ndarray, budget: float) -> List[Tuple[int, int]]:
+    """
+    Best value-per-dollar level per experiment, then fill the budget in density
+    order, skipping any experiment that no longer fits.
+    """
+    density = np.where(value > 0, value / cost, -np.inf)
+    lvl = np.argmax(density, axis=1)
+    rows = np.arange(len(lvl))
+    d = density[rows, lvl]
+    order = np.argsort(-d, kind="stable")
+    order = order[np.isfinite(d[order])]
+    take, left = [], budget
+    for e, c in zip(order, cost[order, lvl[order]]):
+        if c <= left:
+            take.append((int(e), int(lvl[e])))
+            left -= c
+    return take
+
+def optimize(items: Sequence[Tuple[str, str, dict]],
+             budget: float,
+             levels: Sequence[float] = DEFAULT_LEVELS,
+             objective: str = "expected",
+             solver: str = "auto",
+             unit: float = DEFAULT_UNIT,
+             scenario_mults: Optional[Dict[str, float]] = None,
+             frontier_points: int = FRONTIER_POINTS) -> dict:
+    """
+    Allocate `budget` across items [(field, name, experiment), ...].
+    Returns the allocation at the full budget plus the efficient frontier.
+    """
+    if not np.isfinite(budget) or budget <= 0:
+        raise ValueError("budget must be a positive, finite amount.")
+    if not items:
+        raise ValueError("No experiments to allocate across.")
+    if not levels or not np.all(np.isfinite(levels)) or min(levels) <= 0:
+        raise ValueError("levels must be positive, finite investment amounts.")
+    cost, value = evaluate([it[2] for it in items], levels, objective, scenario_mults)
+    n_units = int(budget // unit) + 1
+    if solver == "auto":
+        solver = "dp" if len(items) * n_units <= MAX_DP_CELLS else "greedy"
+    budgets = np.linspace(budget / frontier_points, budget, frontier_points)
+
+    if solver == "dp":
+        dp, choice, units = solve_dp(cost, value, budget, unit)
+        picks_at = lambda b: _backtrack(choice, units, int(b // unit))
+    elif solver == "greedy":
+        picks_at = lambda b: solve_greedy(cost, value, b)
+    else:
+        raise ValueError("solver must be 'auto', 'dp' or 'greedy'.")
+
+    def summary(picks):
+        spent = float(sum(cost[e, l] for e, l in picks))
+        total = float(sum(value[e, l] for e, l in picks))
+        return spent, total
+
+    frontier = []
+    for b in budgets:
+        spent, total = summary(picks_at(b))
+        frontier.append({
+            "budget": float(b),
+            "spent": spent,
+            "expected_profit": total,
+            "roi_percent": (total / spent * 100.0) if spent else 0.0,
+        })
+
+    picks = picks_at(budget)
+    spent, total = summary(picks)
+    return {
+        "solver": solver,
+        "objective": objective,
+        "budget": float(budget),
+        "spent": spent,
+        "expected_profit": total,
+        "roi_percent": (total / spent * 100.0) if spent else 0.0,
+        "allocation": [
+            {"field": items[e][0], "experiment": items[e][1],
+             "investment": float(cost[e, l]), "expected_profit": float(value[e, l])}
+            for e, l in picks
+        ],
+        "frontier": frontier,
+    }
@@ -0,0 +1,118 @@
+# roi_grid.py
+"""
+Precomputed ROI sensitivity surfaces per EXPERIMENT_LIBRARY entry.
+
+For each experiment we evaluate ROI % over investment x scenario x months-saved
+and success probability over investment x scenario in one vectorised pass,
+build lazily (or all at once via warm()) and keep the arrays plus their
+serialised JSON/binary forms in memory.
+"""
+from __future__ import annotations
+import json
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from portfolio import scenario_probabilities_vec
+
+SCENARIO_LABELS = ("Low", "Medium", "High")
+DEFAULT_MULTS = {"Low": 0.6, "Medium": 1.0, "High": 1.4}
+INVESTMENT_GRID = np.unique(np.round(np.geomspace(100_000, 50_000_000, 28), -4))
+MONTHS_FACTORS = np.linspace(0.5, 1.5, 11)
+MARKET_SWING = 0.35     # +/- fraction for the tornado's market-impact bar
+
+@dataclass
+class SensitivityGrid:
+    investment: np.ndarray      # (I,) $
+    months_saved: np.ndarray    # (M,)
+    roi_percent: np.ndarray     # (I, S, M) float32
+    success_prob: np.ndarray    # (I, S) float32, 0..1
+    _json: Optional[bytes] = None
+
+    def to_json(self) -> bytes:
+        if self._json is None:
+            self._json = json.dumps({
+                "investment": self.investment.tolist(),
+                "scenarios": list(SCENARIO_LABELS),
+                "months_saved": np.round(self.months_saved, 3).tolist(),
+                "roi_percent": np.round(self.roi_percent, 2).tolist(),
+                "success_prob": np.round(self.success_prob, 4).tolist(),
+            }, separators=(",", ":")).encode("utf-8")
+        return self._json
+
+    def to_bytes(self) -> bytes:
+        # little-endian float32, C order (I, S, M): a browser can wrap it in a Float32Array
+        return self.roi_percent.astype("<f4", copy=False).tobytes()
+
+def _roi(benefit: np.ndarray, inv: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(inv > 0, (benefit - inv) / inv * 100.0, 0.0)
+
+def build_grid(experiment: dict, mults: Optional[Dict[str, float]] = None) -> SensitivityGrid:
+    mults = mults or DEFAULT_MULTS
+    inv = INVESTMENT_GRID.astype(float)
+    months = float(experiment["leo_months_saved"]) * MONTHS_FACTORS
+    mult = np.array([float(mults[k]) for k in SCENARIO_LABELS])
+    monthly_value = float(experiment["annual_market_impact"]) / 12.0
+    benefit = mult[None, :, None] * months[None, None, :] * monthly_value      # (1, S, M)
+    roi = _roi(benefit, inv[:, None, None])                                     # (I, S, M)
+    probs = scenario_probabilities_vec(float(experiment["success_prob"]), inv)
+    success = np.stack([probs[k] for k in SCENARIO_LABELS], axis=1)             # (I, S)
+    return SensitivityGrid(investment=inv, months_saved=months,
+                           roi_percent=roi.astype(np.float32), success_prob=success.astype(np.float32))
+
+def tornado(experiment: dict, investment: float, scenario_index: int = 1,
+            mults: Optional[Dict[str, float]] = None) -> List[dict]:
+    """ROI % at the low/high end of each driver, widest swing first."""
+    mults = mults or DEFAULT_MULTS
+    label = SCENARIO_LABELS[scenario_index] if 0 <= scenario_index < 3 else "Medium"
+    months = float(experiment["leo_months_saved"])
+    impact = float(experiment["annual_market_impact"])
+    inv = float(investment)
+    m = float(mults[label])
+    # rows: (months, impact, mult, investment) at low / high
+    lo_hi = np.array([
+        [[months * MONTHS_FACTORS[0], impact, m, inv], [months * MONTHS_FACTORS[-1], impact, m, inv]],
+        [[months, impact * (1 - MARKET_SWING), m, inv], [months, impact * (1 + MARKET_SWING), m, inv]],
+        [[months, impact, float(mults["Low"]), inv], [months, impact, float(mults["High"]), inv]],
+        [[months, impact, m, inv * 2.0], [months, impact, m, inv * 0.5]],
+    ])
+    benefit = lo_hi[..., 0] * lo_hi[..., 1] / 12.0 * lo_hi[..., 2]
+    roi = _roi(benefit, lo_hi[..., 3])
+    base = float(_roi(np.array(m * months * impact / 12.0), np.array(inv)))
+    names = ("LEO months saved ±50%", f"Market impact ±{MARKET_SWING:.0%}", "Scenario Low↔High", "Investment ×2 / ×½")
+    rows = [{"driver": n, "low": float(lo), "high": float(hi), "base": base}
+            for n, (lo, hi) in zip(names, roi)]
+    rows.sort(key=lambda r: abs(r["high"] - r["low"]), reverse=True)
+    return rows
+
+class GridCache:
+    """Lazily built SensitivityGrid per (field, experiment)."""
+
+    def __init__(self, library: Dict[str, Dict[str, dict]], mults: Optional[Dict[str, float]] = None):
+        self.library = library
+        self.mults = mults
+        self._grids: Dict[Tuple[str, str], SensitivityGrid] = {}
+        self._lock = threading.Lock()
+
+    def get(self, field: str, name: str) -> Optional[SensitivityGrid]:
+        key = (field, name)
+        grid = self._grids.get(key)
+        if grid is None:
+            exp = self.library.get(field, {}).get(name)
+            if not exp:
+                return None
+            grid = build_grid(exp, self.mults)
+            with self._lock:
+                grid = self._grids.setdefault(key, grid)
+        return grid
+
+    def warm(self) -> int:
+        for field, exps in self.library.items():
+            for name in exps:
+                self.get(field, name)
+        return len(self._grids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._grids.clear()
@@ -0,0 +1,111 @@
+# roi_montecarlo.py
+"""
+Monte Carlo ROI for EXPERIMENT_LIBRARY entries.
+
+Each trial draws:
+- annual market impact ~ lognormal around the library value
+- LEO months saved     ~ triangular(1 - spread, 1, 1 + spread) x library value
+- scenario multiplier  ~ triangular(Low, Medium, High) from SCENARIOS
+- success              ~ Bernoulli(scenario probability)
+A failed experiment returns no benefit, so the whole investment is lost.
+Draws are float32 with inverse-CDF triangulars, percentiles come from a
+bounded subsample and the histogram from bincount, so 10^5 trials take ~10
+ms and 10^6 about 100 ms.
+"""
+from __future__ import annotations
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+DEFAULT_TRIALS = 100_000
+MAX_TRIALS = 1_000_000
+HIST_BINS = 40
+QUANTILE_SAMPLE = 200_000   # trials are iid, so a prefix is an unbiased subsample for percentiles
+
+DEFAULT_DISTRIBUTIONS: Dict[str, float] = {
+    "market_sigma": 0.35,            # lognormal sigma of annual market impact
+    "months_spread": 0.5,            # +/- fraction around leo_months_saved
+}
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+def _triangular(u: np.ndarray, lo: float, mid: float, hi: float) -> np.ndarray:
+    # inverse CDF of triangular(lo, mid, hi) applied to uniforms u
+    if hi <= lo:
+        return np.full_like(u, mid)
+    c = (mid - lo) / (hi - lo)
+    left = lo + np.sqrt(u * ((hi - lo) * (mid - lo)))
+    right = hi - np.sqrt((1.0 - u) * ((hi - lo) * (hi - mid)))
+    return np.where(u < c, left, right).astype(u.dtype, copy=False)
+
+def simulate_roi(experiment: dict,
+                 investment: float,
+                 success_prob: Optional[float] = None,
+                 trials: int = DEFAULT_TRIALS,
+                 seed: Optional[int] = None,
+                 dist: Optional[Dict[str, float]] = None,
+                 scenario_mults: Tuple[float, float, float] = (0.6, 1.0, 1.4)) -> Optional[dict]:
+    """
+    ROI distribution for one experiment; all trials are drawn as NumPy arrays.
+    - success_prob defaults to experiment['success_prob'].
+    - dist overrides keys of DEFAULT_DISTRIBUTIONS.
+    """
+    if not experiment:
+        return None
+    cfg = {**DEFAULT_DISTRIBUTIONS, **(dist or {})}
+    n = int(max(1, min(MAX_TRIALS, trials)))
+    rng = np.random.default_rng(seed)
+    inv = float(investment)
+
+    f32 = np.float32
+
+    impact = float(experiment["annual_market_impact"])
+    sigma = max(0.0, float(cfg["market_sigma"]))
+    if impact > 0:
+        # lognormal with the library value as its mean
+        market = rng.standard_normal(n, dtype=f32)
+        market *= sigma
+        market += np.log(impact) - 0.5 * sigma ** 2
+        np.exp(market, out=market)
+    else:
+        market = np.zeros(n, dtype=f32)
+
+    spread = min(max(0.0, float(cfg["months_spread"])), 1.0)
+    months = float(experiment["leo_months_saved"])
+    months_saved = _triangular(rng.random(n, dtype=f32), 1.0 - spread, 1.0, 1.0 + spread) * f32(months)
+
+    lo, mid, hi = (float(m) for m in scenario_mults)
+    mult = _triangular(rng.random(n, dtype=f32), lo, mid, hi)
+
+    p = min(max(float(experiment["success_prob"] if success_prob is None else success_prob), 0.0), 1.0)
+    success = rng.random(n, dtype=f32) < p
+
+    benefit = market
+    benefit *= mult
+    benefit *= months_saved
+    benefit *= f32(1.0 / 12.0)
+    benefit[~success] = 0.0
+    profit = benefit - f32(inv)
+    if inv > 0:
+        roi_pct = profit * f32(100.0 / inv)
+    else:
+        roi_pct = np.zeros(n, dtype=f32)
+
+    qs = np.percentile(roi_pct[:QUANTILE_SAMPLE], (1,) + PERCENTILES + (99,))
+    lo_edge, pct, hi_edge = float(qs[0]), qs[1:-1], float(qs[-1])
+    if hi_edge <= lo_edge:
+        hi_edge = lo_edge + 1.0
+    idx = ((roi_pct - f32(lo_edge)) * f32(HIST_BINS / (hi_edge - lo_edge))).astype(np.int32)
+    np.clip(idx, 0, HIST_BINS - 1, out=idx)
+    counts = np.bincount(idx, minlength=HIST_BINS)
+    edges = np.linspace(lo_edge, hi_edge, HIST_BINS + 1)
+
+    return {
+        "trials": n,
+        "expected_roi_percent": float(roi_pct.mean(dtype=np.float64)),
+        "expected_profit": float(profit.mean(dtype=np.float64)),
+        "expected_benefit": float(benefit.mean(dtype=np.float64)),
+        "prob_loss": float((profit < 0).mean()),
+        "prob_success": float(success.mean()),
+        "percentiles": {f"p{q}": float(v) for q, v in zip(PERCENTILES, pct)},
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
@@ -0,0 +1,367 @@
+# screening.py
+"""
+All-vs-all conjunction screening for a TLE catalog.
+
+    python screening.py catalog.tle --hours 24 --threshold 5
+
+Pipeline: propagate the catalog in time chunks (tle_utils.propagate_grid),
+bucket every object into a uniform spatial hash grid per step, drop pairs whose
+perigee/apogee shells cannot meet, then refine the surviving pairs' TCA.
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import product
+from typing import List, Optional, Sequence, Tuple, Union
+import numpy as np
+from tle_utils import TLEParseResult, parse_tle_block, propagate_grid, times_to_jd, as_satrec, norad_id, diff_catalogs
+from conjunction import linear_tca
+import collision
+from catalog import TLECatalog, iter_tle_lines
+from metrics import timed
+
+DEFAULT_THRESHOLD_KM = 5.0
+DEFAULT_HOURS = 24.0
+DEFAULT_STEP_S = 30.0
+
+_MAX_REL_SPEED_KM_S = 16.0   # head-on LEO encounter
+_SHELL_MARGIN_KM = 25.0      # SGP4 drag/J2 spread around the mean perigee/apogee
+_REFINE_ITERATIONS = 2
+_PASS_GAP_STEPS = 3          # hits of one pair further apart than this belong to separate approaches
+_CHUNK_POINTS = 1_000_000    # objects x steps propagated at once
+_CELL_BITS = 17
+_STEP_BITS = 10
+
+# own cell + the 13 "forward" neighbours: every unordered cell pair is visited once
+_HALF_SHELL = [off for off in product((-1, 0, 1), repeat=3) if off >= (0, 0, 0)]
+_FULL_SHELL = list(product((-1, 0, 1), repeat=3))
+
+@dataclass
+class Conjunction:
+    obj1: str
+    obj2: str
+    tca: datetime
+    miss_km: float
+    rel_speed_km_s: float
+    pc: float = 0.0
+    norad1: str = ""
+    norad2: str = ""
+
+    def to_dict(self) -> dict:
+        return {
+            "obj1": self.obj1,
+            "obj2": self.obj2,
+            "norad1": self.norad1,
+            "norad2": self.norad2,
+            "tca": self.tca.isoformat(),
+            "miss_km": round(self.miss_km, 4),
+            "rel_speed_km_s": round(self.rel_speed_km_s, 4),
+            "pc": self.pc,
+        }
+
+def _cell_keys(step: np.ndarray, cells: np.ndarray) -> np.ndarray:
+    half = 1 << (_CELL_BITS - 1)
+    c = np.clip(cells + half, 0, (1 << _CELL_BITS) - 1)
+    return ((step << (3 * _CELL_BITS))
+            | (c[:, 0] << (2 * _CELL_BITS))
+            | (c[:, 1] << _CELL_BITS)
+            | c[:, 2])
+
+def _expand_ranges(lo: np.ndarray, hi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # (query index, sorted position) for every position in [lo[q], hi[q])
+    counts = hi - lo
+    q = np.repeat(np.arange(len(lo)), counts)
+    first = np.cumsum(counts) - counts
+    pos = np.repeat(lo, counts) + (np.arange(counts.sum()) - np.repeat(first, counts))
+    return q, pos
+
+def _grid_pairs(r: np.ndarray, cell_km: float,
+                is_focus: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Candidate (i, j, step) triples, i < j, for objects in the same or adjacent
+    grid cells at the same step. r is (n_obj, n_step, 3).
+    With is_focus (n_obj,) only pairs touching a focus object are built, by
+    querying the focus points' full 27-cell neighbourhood.
+    """
+    n, c, _ = r.shape
+    obj = np.repeat(np.arange(n), c)
+    step = np.tile(np.arange(c, dtype=np.int64), n)
+    pts = r.reshape(-1, 3)
+    ok = np.isfinite(pts).all(axis=1)
+    obj, step, pts = obj[ok], step[ok], pts[ok]
+    cells = np.floor(pts / cell_km).astype(np.int64)
+    keys = _cell_keys(step, cells)
+    # work in key order: a fixed cell offset then keeps the queries sorted too,
+    # which makes searchsorted a cache-friendly merge
+    order = np.argsort(keys, kind="stable")
+    obj, step, cells, keys = obj[order], step[order], cells[order], keys[order]
+
+    if is_focus is None:
+        src, offsets = None, _HALF_SHELL
+    else:
+        src, offsets = np.flatnonzero(is_focus[obj]), _FULL_SHELL
+    ia, ib = [], []
+    for off in offsets:
+        if src is None:
+            q = _cell_keys(step, cells + np.array(off, dtype=np.int64))
+        else:
+            q = _cell_keys(step[src], cells[src] + np.array(off, dtype=np.int64))
+        lo = np.searchsorted(keys, q, "left")
+        hi = np.searchsorted(keys, q, "right")
+        a, b = _expand_ranges(lo, hi)
+        if src is not None:
+            a = src[a]
+            # focus-focus pairs are found from both ends; keep one
+            keep = (a != b) & (~is_focus[obj[b]] | (a < b))
+            a, b = a[keep], b[keep]
+        elif off == (0, 0, 0):
+            keep = a < b
+            a, b = a[keep], b[keep]
+        ia.append(a)
+        ib.append(b)
+    a, b = np.concatenate(ia), np.concatenate(ib)
+    i, j = obj[a], obj[b]
+    return np.minimum(i, j), np.maximum(i, j), step[a]
+
+def _label(rec: TLEParseResult) -> str:
+    return rec.name or rec.line1[2:7].strip()
+
+def _as_record(tle: Union[str, TLEParseResult]) -> TLEParseResult:
+    return tle if isinstance(tle, TLEParseResult) else parse_tle_block(tle)
+
+@timed("screen_catalog")
+def screen_catalog(tles: Sequence[Union[str, TLEParseResult]],
+                   start: Optional[datetime] = None,
+                   hours: float = DEFAULT_HOURS,
+                   step_s: float = DEFAULT_STEP_S,
+                   threshold_km: float = DEFAULT_THRESHOLD_KM,
+                   sigma_km: float = collision.DEFAULT_SIGMA_KM,
+                   hbr_km: float = collision.DEFAULT_HBR_KM,
+                   focus: Optional[Sequence[int]] = None) -> List[Conjunction]:
+    """
+    Screen every pair in the catalog over [start, start + hours].
+    - Returns one event per close approach, ranked by miss distance; a pair
+      meets once per encounter, so it can have several events in the window.
+    - Each event carries a 2D Pc with isotropic per-object sigma_km and hbr_km.
+    - start defaults to now (UTC).
+    - focus: indices of objects to screen against the rest; only pairs with at
+      least one focus object are reported, and only objects whose shells can
+      reach a focus object are propagated (see rescreen).
+    """
+    if hours <= 0 or step_s <= 0 or threshold_km <= 0:
+        raise ValueError("hours, step_s and threshold_km must be positive.")
+    records = [_as_record(t) for t in tles]
+    n = len(records)
+    if n < 2:
+        return []
+    sats = [as_satrec(rec) for rec in records]
+    is_focus = None
+    if focus is not None:
+        records, sats, is_focus = _focus_subset(records, sats, np.asarray(focus, dtype=np.int64), threshold_km)
+        n = len(records)
+        if n < 2 or not is_focus.any():
+            return []
+    start = (start or datetime.now(timezone.utc))
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    jd0, fr0 = times_to_jd([start])
+    jd0, fr0 = float(jd0[0]), float(fr0[0])
+
+    rp, ra = _shells(sats)
+
+    # whole steps, plus one sample clamped to the window end when hours is not a multiple of step_s
+    window_s = hours * 3600.0
+    n_steps = int(np.ceil(window_s / step_s - 1e-9)) + 1
+    offsets_s = np.minimum(np.arange(n_steps) * step_s, window_s)
+    half = 0.5 * step_s
+    cell_km = threshold_km + _MAX_REL_SPEED_KM_S * half
+    chunk = int(max(1, min(1 << _STEP_BITS, _CHUNK_POINTS // n)))
+
+    hits_i, hits_j, hits_t, hits_d = [], [], [], []
+    for k0 in range(0, n_steps, chunk):
+        t_chunk = offsets_s[k0:k0 + chunk]
+        jd = np.full(len(t_chunk), jd0)
+        # distances are rotation-invariant, so skip the TEME->GCRS step
+        r, v = propagate_grid(sats, (jd, fr0 + t_chunk / 86400.0), frame="teme")
+        i, j, k = _grid_pairs(r, cell_km, is_focus)
+
+        shell_gap = np.maximum(rp[i], rp[j]) - np.minimum(ra[i], ra[j])
+        keep = shell_gap <= threshold_km + _SHELL_MARGIN_KM
+        i, j, k = i[keep], j[keep], k[keep]
+
+        dr = r[j, k] - r[i, k]
+        dv = v[j, k] - v[i, k]
+        keep = np.linalg.norm(dr, axis=1) <= threshold_km + np.linalg.norm(dv, axis=1) * half
+        i, j, k, dr, dv = i[keep], j[keep], k[keep], dr[keep], dv[keep]
+
+        # linear relative motion across [t_k - step/2, t_k + step/2]
+        t_loc, miss = linear_tca(np.zeros_like(dr), np.zeros_like(dv), dr - dv * half, dv, step_s)
+        keep = miss <= 2.0 * threshold_km
+        hits_i.append(i[keep])
+        hits_j.append(j[keep])
+        hits_t.append(t_chunk[k[keep]] - half + t_loc[keep])
+        hits_d.append(miss[keep])
+
+    i, j = np.concatenate(hits_i), np.concatenate(hits_j)
+    t, d = np.concatenate(hits_t), np.concatenate(hits_d)
+    if not len(i):
+        return []
+    # local minima of each pair's hits in time: one per approach (runs of hits
+    # split where they are more than _PASS_GAP_STEPS apart)
+    pair = i.astype(np.int64) * n + j
+    order = np.lexsort((t, pair))
+    p, ts, ds = pair[order], t[order], d[order]
+    linked = (p[1:] == p[:-1]) & (ts[1:] - ts[:-1] <= _PASS_GAP_STEPS * step_s)
+    has_prev, has_next = np.r_[False, linked], np.r_[linked, False]
+    is_min = ((~has_prev | (ds < np.r_[np.inf, ds[:-1]]))
+              & (~has_next | (ds <= np.r_[ds[1:], np.inf])))
+    best = order[is_min]
+
+    found = {}                   # (a, b) -> [(tca, dr, dv)]; minima refining to one TCA are merged
+    for a, b, tca in zip(i[best], j[best], t[best]):
+        tca, dr, dv = _refine(sats[a], sats[b], jd0, fr0, float(tca), half)
+        if dr is None or np.linalg.norm(dr) > threshold_km or not 0.0 <= tca <= window_s:
+            continue
+        same = found.setdefault((a, b), [])
+        dup = next((k for k, prev in enumerate(same) if abs(prev[0] - tca) < step_s), None)
+        if dup is None:
+            same.append((tca, dr, dv))
+        elif np.linalg.norm(dr) < np.linalg.norm(same[dup][1]):
+            same[dup] = (tca, dr, dv)
+    keep_a, keep_b, tcas, drs, dvs = [], [], [], [], []
+    for (a, b), approaches in found.items():
+        for tca, dr, dv in approaches:
+            keep_a.append(a); keep_b.append(b); tcas.append(tca); drs.append(dr); dvs.append(dv)
+    if not tcas:
+        return []
+    dr, dv = np.array(drs), np.array(dvs)
+    pc = collision.pc_2d(dr, dv, collision.default_covariance(sigma_km, len(dr)) * 2, hbr_km)
+
+    out = [Conjunction(obj1=_label(records[a]), obj2=_label(records[b]),
+                       tca=start + timedelta(seconds=tca),
+                       miss_km=float(np.linalg.norm(r)), rel_speed_km_s=float(np.linalg.norm(u)),
+                       pc=float(p), norad1=norad_id(records[a].line1), norad2=norad_id(records[b].line1))
+           for a, b, tca, r, u, p in zip(keep_a, keep_b, tcas, dr, dv, pc)]
+    out.sort(key=lambda c: c.miss_km)
+    return out
+
+@dataclass
+class ScreeningRun:
+    """A screening result plus everything needed to update it incrementally."""
+    records: List[TLEParseResult]
+    events: List[Conjunction]
+    start: datetime
+    hours: float
+    step_s: float
+    threshold_km: float
+    sigma_km: float = collision.DEFAULT_SIGMA_KM
+    hbr_km: float = collision.DEFAULT_HBR_KM
+    stats: Optional[dict] = None
+
+    def params(self) -> tuple:
+        return (self.start, self.hours, self.step_s, self.threshold_km, self.sigma_km, self.hbr_km)
+
+def screen_run(tles: Sequence[Union[str, TLEParseResult]], start: Optional[datetime] = None,
+               hours: float = DEFAULT_HOURS, step_s: float = DEFAULT_STEP_S,
+               threshold_km: float = DEFAULT_THRESHOLD_KM,
+               sigma_km: float = collision.DEFAULT_SIGMA_KM,
+               hbr_km: float = collision.DEFAULT_HBR_KM) -> ScreeningRun:
+    """Full screen_catalog, kept as a ScreeningRun for later rescreen() calls."""
+    records = [_as_record(t) for t in tles]
+    start = start or datetime.now(timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    events = screen_catalog(records, start, hours, step_s, threshold_km, sigma_km, hbr_km)
+    return ScreeningRun(records, events, start, hours, step_s, threshold_km, sigma_km, hbr_km,
+                        stats={"mode": "full", "objects": len(records), "screened": len(records),
+                               "reused_events": 0, "new_events": len(events)})
+
+@timed("rescreen")
+def rescreen(previous: ScreeningRun, tles: Sequence[Union[str, TLEParseResult]]) -> ScreeningRun:
+    """
+    Update a run for a newly published catalog over the same window.
+    Events between two unchanged objects are reused; added / changed objects
+    are screened against their shell neighbours only (screen_catalog focus).
+    Removed or superseded element sets drop their events and cached Satrecs.
+    """
+    records = [_as_record(t) for t in tles]
+    diff = diff_catalogs(previous.records, records)
+    dirty = diff.dirty_ids
+    kept = [ev for ev in previous.events if ev.norad1 not in dirty and ev.norad2 not in dirty]
+    fresh_ids = {norad_id(r.line1) for r in (*diff.added, *diff.changed)}
+    focus = [k for k, rec in enumerate(records) if norad_id(rec.line1) in fresh_ids]
+    fresh = screen_catalog(records, previous.start, previous.hours, previous.step_s, previous.threshold_km,
+                           previous.sigma_km, previous.hbr_km, focus=focus) if focus else []
+    events = sorted(kept + fresh, key=lambda c: c.miss_km)
+    return ScreeningRun(records, events, previous.start, previous.hours, previous.step_s,
+                        previous.threshold_km, previous.sigma_km, previous.hbr_km,
+                        stats={"mode": "incremental", "objects": len(records), **diff.summary(),
+                               "screened": len(focus), "reused_events": len(kept), "new_events": len(fresh)})
+
+def _shells(sats) -> Tuple[np.ndarray, np.ndarray]:
+    # perigee / apogee radius (km from Earth centre)
+    re_km = np.array([s.radiusearthkm for s in sats])
+    return (1.0 + np.array([s.altp for s in sats])) * re_km, (1.0 + np.array([s.alta for s in sats])) * re_km
+
+def _focus_subset(records, sats, focus: np.ndarray, threshold_km: float):
+    # keep the focus objects plus every object whose shell overlaps the union of theirs
+    rp, ra = _shells(sats)
+    margin = threshold_km + _SHELL_MARGIN_KM
+    lo, hi = rp[focus] - margin, ra[focus] + margin
+    order = np.argsort(lo)
+    lo, hi = lo[order], np.maximum.accumulate(hi[order])
+    # object overlaps some focus interval iff the last interval starting below its apogee reaches its perigee
+    idx = np.searchsorted(lo, ra, side="right") - 1
+    near = (idx >= 0) & (hi[np.maximum(idx, 0)] >= rp)
+    near[focus] = True
+    keep = np.flatnonzero(near)
+    is_focus = np.zeros(len(records), dtype=bool)
+    is_focus[focus] = True
+    return [records[k] for k in keep], [sats[k] for k in keep], is_focus[keep]
+
+def _refine(sat1, sat2, jd0: float, fr0: float, t_s: float, half: float):
+    # re-linearise around the current TCA estimate using fresh SGP4 states;
+    # returns (tca_s, relative position at TCA, relative velocity)
+    miss_vec = dv = None
+    for _ in range(_REFINE_ITERATIONS):
+        fr = fr0 + t_s / 86400.0
+        e1, r1, v1 = sat1.sgp4(jd0, fr)
+        e2, r2, v2 = sat2.sgp4(jd0, fr)
+        if e1 or e2:
+            return t_s, None, None
+        dr = np.subtract(r2, r1)
+        dv = np.subtract(v2, v1)
+        t_loc, _ = linear_tca(np.zeros(3), np.zeros(3), dr - dv * half, dv, 2.0 * half)
+        miss_vec = dr + dv * (float(t_loc) - half)
+        t_s = t_s - half + float(t_loc)
+        half = max(half / 4.0, 1.0)
+    return t_s, miss_vec, dv
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Screen a TLE catalog for close approaches.")
+    ap.add_argument("catalog", help="2LE/3LE, OMM .csv/.json or saved .npy catalog ('-' for 2LE/3LE on stdin)")
+    ap.add_argument("--start", help="UTC start, ISO 8601 (default: now)")
+    ap.add_argument("--hours", type=float, default=DEFAULT_HOURS)
+    ap.add_argument("--step", type=float, default=DEFAULT_STEP_S, help="coarse step in seconds")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD_KM, help="miss distance in km")
+    ap.add_argument("--top", type=int, default=0, help="only print the N closest events")
+    args = ap.parse_args(argv)
+
+    if args.catalog == "-":
+        cat = TLECatalog.from_records(iter_tle_lines(sys.stdin))
+    else:
+        cat = TLECatalog.from_file(args.catalog)
+    start = datetime.fromisoformat(args.start) if args.start else None
+    events = screen_catalog(cat, start=start, hours=args.hours,
+                            step_s=args.step, threshold_km=args.threshold)
+    if args.top > 0:
+        events = events[:args.top]
+    json.dump([ev.to_dict() for ev in events], sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write("\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
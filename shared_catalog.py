@@ -0,0 +1,130 @@
+# shared_catalog.py
+"""
+One TLE catalog shared by every worker process, with atomic hot swap.
+
+A published catalog is an immutable, NORAD-sorted TLECatalog .npy under
+ORBIO_CATALOG_DIR (point it at /dev/shm for a RAM-backed store):
+
+    <name>-<version>.npy     the snapshot
+    <name>.current           text pointer to the live snapshot, replaced atomically
+
+Workers open snapshots with mmap (read-only), so the pages live once in the
+OS page cache however many workers attach: per-worker memory stays flat as
+the catalog grows. Each lookup stats the pointer file; when it changes, the
+worker maps the new snapshot and drops the old one. Old snapshots are
+unlinked after publishing, which is safe while mapped (POSIX).
+
+Satrec objects are C structs that cannot be shared; they are still built per
+worker, on demand, through tle_utils' LRU cache.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from catalog import TLECatalog
+from tle_utils import TLEParseResult
+
+STORE_DIR = os.environ.get("ORBIO_CATALOG_DIR", "./catalogs")
+DEFAULT_NAME = "active"
+KEEP_VERSIONS = 2
+
+@dataclass(frozen=True)
+class Snapshot:
+    name: str
+    version: str
+    path: str
+    catalog: TLECatalog
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    def find(self, norad: Sequence[int]) -> Tuple[List[TLEParseResult], List[int]]:
+        """Records for the given NORAD IDs (binary search on the sorted column) and the IDs not found."""
+        ids = np.asarray(list(norad), dtype=np.int64)
+        col = self.catalog.data["norad"]
+        pos = np.searchsorted(col, ids)
+        hit = (pos < len(col)) & (col[np.minimum(pos, len(col) - 1)] == ids)
+        found = [self.catalog[int(p)] for p in pos[hit]]
+        return found, ids[~hit].tolist()
+
+    def info(self) -> dict:
+        return {"name": self.name, "version": self.version, "objects": len(self.catalog)}
+
+class CatalogStore:
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+        self._open: Dict[str, Tuple[Tuple[int, int], Snapshot]] = {}   # name -> (pointer stat, snapshot)
+        self._lock = threading.Lock()
+
+    def _pointer(self, name: str) -> str:
+        return os.path.join(self.root, f"{name}.current")
+
+    def publish(self, catalog: TLECatalog, name: str = DEFAULT_NAME) -> Snapshot:
+        """Write a new snapshot and switch the pointer to it; readers never see a partial file."""
+        if not name.isidentifier():
+            raise ValueError("Catalog name must be a plain identifier.")
+        if len(catalog) == 0:
+            raise ValueError("Refusing to publish an empty catalog.")
+        os.makedirs(self.root, exist_ok=True)
+        data = catalog.data[np.argsort(catalog.data["norad"], kind="stable")]
+        version = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{os.getpid()}-{time.monotonic_ns() % 1_000_000:06d}"
+        fname = f"{name}-{version}.npy"
+        tmp = os.path.join(self.root, f".{fname}.tmp")
+        with open(tmp, "wb") as fh:
+            np.save(fh, data, allow_pickle=False)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, os.path.join(self.root, fname))
+        ptr_tmp = self._pointer(name) + f".{os.getpid()}.tmp"
+        with open(ptr_tmp, "w", encoding="ascii") as fh:
+            fh.write(fname)
+        os.replace(ptr_tmp, self._pointer(name))
+        self._prune(name, keep=fname)
+        return self.current(name)
+
+    def _prune(self, name: str, keep: str) -> None:
+        olds = sorted(f for f in os.listdir(self.root)
+                      if f.startswith(f"{name}-") and f.endswith(".npy") and f != keep)
+        for f in olds[:max(0, len(olds) - (KEEP_VERSIONS - 1))]:
+            try:
+                os.unlink(os.path.join(self.root, f))
+            except OSError:
+                pass
+
+    def current(self, name: str = DEFAULT_NAME) -> Optional[Snapshot]:
+        """The live snapshot (mmap'd, read-only), or None if nothing is published."""
+        try:
+            st = os.stat(self._pointer(name))
+        except OSError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_ino)
+        cached = self._open.get(name)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        with self._lock:
+            cached = self._open.get(name)
+            if cached and cached[0] == stamp:
+                return cached[1]
+            try:
+                with open(self._pointer(name), encoding="ascii") as fh:
+                    fname = fh.read().strip()
+                path = os.path.join(self.root, fname)
+                snap = Snapshot(name=name, version=fname[len(name) + 1:-4], path=path,
+                                catalog=TLECatalog.load(path, mmap=True))
+            except (OSError, ValueError):
+                # pointer raced with a publish/prune; keep serving what we have
+                return cached[1] if cached else None
+            self._open[name] = (stamp, snap)
+            return snap
+
+    def records(self, norad: Iterable[int], name: str = DEFAULT_NAME) -> List[TLEParseResult]:
+        snap = self.current(name)
+        if snap is None:
+            raise ValueError("No catalog has been published.")
+        found, missing = snap.find(norad)
+        if missing:
+            raise ValueError(f"NORAD IDs not in catalog {snap.version}: {missing[:20]}")
+        return found
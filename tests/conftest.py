@@ -0,0 +1,7 @@
+# tests/conftest.py
+"""Modules live flat at the repo root; tests run with ORBIO_DB=off (no history writes)."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ORBIO_DB", "off")
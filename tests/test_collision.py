@@ -0,0 +1,26 @@
+# tests/test_collision.py
+"""Analytic 2D Pc against Monte Carlo sampling of the same encounter."""
+import numpy as np
+import pytest
+
+import collision
+
+@pytest.mark.parametrize("dr, dv, sigma_km, hbr_km", [
+    ([0.05, 0.0, 0.0], [0.0, 7.5, 0.0], 0.1, 0.02),           # head-on-ish, near miss
+    ([0.2, 0.1, 0.0], [1.0, -10.0, 3.0], 0.15, 0.01),
+    ([0.0, 0.0, 0.3], [0.5, 0.5, 0.1], 0.2, 0.05),
+])
+def test_pc_2d_matches_monte_carlo(dr, dv, sigma_km, hbr_km):
+    cov = collision.default_covariance(sigma_km) * 2
+    pc = float(collision.pc_2d(dr, dv, cov, hbr_km)[0])
+    mc, err = collision.pc_monte_carlo(dr, dv, cov[0], hbr_km, samples=400_000, seed=7)
+    assert mc > 0
+    assert pc == pytest.approx(mc, abs=5 * err)
+
+def test_pc_2d_uses_the_encounter_plane_miss():
+    # an along-track offset (TCA clipped to a window edge) does not change Pc
+    cov = collision.default_covariance(0.1) * 2
+    dv = np.array([0.0, 7.5, 0.0])
+    at_tca = collision.pc_2d([0.05, 0.0, 0.0], dv, cov, 0.02)[0]
+    clipped = collision.pc_2d([0.05, 3.0, 0.0], dv, cov, 0.02)[0]
+    assert clipped == pytest.approx(at_tca)
@@ -0,0 +1,48 @@
+# tests/test_portfolio.py
+"""Knapsack solvers against exhaustive search on tiny inputs."""
+from itertools import product
+
+import numpy as np
+import pytest
+
+import portfolio
+
+def _exhaustive(cost, value, budget):
+    n, L = value.shape
+    best = 0.0
+    for levels in product(range(-1, L), repeat=n):          # -1 = not funded
+        picks = [(e, l) for e, l in enumerate(levels) if l >= 0]
+        if sum(cost[e, l] for e, l in picks) <= budget:
+            best = max(best, sum(value[e, l] for e, l in picks))
+    return best
+
+@pytest.mark.parametrize("seed", range(8))
+def test_solve_dp_matches_exhaustive(seed):
+    rng = np.random.default_rng(seed)
+    n, L = 4, 3
+    cost = rng.integers(1, 8, size=(n, L)).astype(float)
+    value = rng.normal(5.0, 4.0, size=(n, L))
+    budget = float(rng.integers(3, 20))
+    dp, choice, units = portfolio.solve_dp(cost, value, budget, unit=1.0)
+    picks = portfolio._backtrack(choice, units, int(budget))
+    assert dp[int(budget)] == pytest.approx(_exhaustive(cost, value, budget))
+    assert sum(cost[e, l] for e, l in picks) <= budget
+    assert sum(value[e, l] for e, l in picks) == pytest.approx(dp[int(budget)])
+
+def test_solve_dp_handles_many_levels():
+    levels = np.arange(1.0, 200.0)
+    cost = np.tile(levels, (2, 1))
+    value = cost * np.array([[1.0], [1.1]])
+    dp, choice, units = portfolio.solve_dp(cost, value, 300.0, unit=1.0)
+    assert portfolio._backtrack(choice, units, 300) == [(0, 100), (1, 198)]
+
+def test_solve_greedy_skips_items_that_do_not_fit():
+    cost = np.array([[5.0], [3.0], [2.0]])
+    value = np.array([[50.0], [6.0], [3.9]])
+    assert portfolio.solve_greedy(cost, value, 7.0) == [(0, 0), (2, 0)]
+
+def test_optimize_rejects_non_finite_budget():
+    items = portfolio.flatten_library({"F": {"E": {"annual_market_impact": 1e7, "leo_months_saved": 6,
+                                                   "success_prob": 0.5}}})
+    with pytest.raises(ValueError):
+        portfolio.optimize(items, budget=float("inf"))
@@ -0,0 +1,65 @@
+# tests/test_screening.py
+"""screen_catalog and its chunked job form against brute force / an unsplit run."""
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+import bench
+from jobs import JobManager
+from screening import screen_catalog
+from tle_utils import as_satrec, norad_id, parse_tle_block, propagate_grid, times_to_jd
+
+HOURS = 1.0
+THRESHOLD_KM = 40.0
+
+@pytest.fixture(scope="module")
+def blocks():
+    return bench._blocks(bench.synthetic_catalog(400, seed=5))
+
+@pytest.fixture(scope="module")
+def events(blocks):
+    return screen_catalog(blocks, start=bench.EPOCH, hours=HOURS, threshold_km=THRESHOLD_KM)
+
+def _brute_minima(blocks, step_s=2.0):
+    # per-pair minimum separation sampled every step_s (km), in TEME
+    jd0, fr0 = times_to_jd([bench.EPOCH])
+    t = np.arange(0.0, HOURS * 3600.0 + 0.5 * step_s, step_s)
+    r, _ = propagate_grid([as_satrec(b) for b in blocks],
+                          (np.full(len(t), jd0[0]), fr0[0] + t / 86400.0), frame="teme")
+    ids = [norad_id(parse_tle_block(b).line1) for b in blocks]
+    return {(ids[a], ids[b]): float(np.linalg.norm(r[a] - r[b], axis=-1).min())
+            for a, b in combinations(range(len(blocks)), 2)}
+
+def test_screen_catalog_matches_brute_force(blocks, events):
+    brute = _brute_minima(blocks)
+    best = {}
+    for ev in events:
+        key = (ev.norad1, ev.norad2)
+        best[key] = min(best.get(key, np.inf), ev.miss_km)
+    assert best, "fixture should produce close approaches"
+    # 2 s samples are within ~8 km of the true minimum at LEO closing speeds
+    for key, d in brute.items():
+        if d <= THRESHOLD_KM - 10.0:
+            assert key in best, key
+    for key, miss in best.items():
+        assert miss <= brute[key] + 1e-3
+        assert miss >= brute[key] - 10.0
+
+def test_chunked_job_matches_unsplit_run(blocks, events, tmp_path):
+    tles = [tuple(b.split("\n")) for b in blocks]
+    jobs = JobManager(str(tmp_path), max_workers=1)
+    try:
+        job = jobs.submit_screen(tles, start=bench.EPOCH, hours=HOURS, threshold_km=THRESHOLD_KM,
+                                 chunk_hours=0.13)
+        assert len(job.chunks) > 1
+        for _ in jobs.iter_chunks(job, timeout_s=300):
+            pass
+        merged = jobs.screen_results(job)
+    finally:
+        jobs.shutdown()
+    assert job.status == "done"
+    assert len(merged) == len(events)
+    for ev, got in zip(events, merged):
+        assert (got["norad1"], got["norad2"]) == (ev.norad1, ev.norad2)
+        assert got["miss_km"] == pytest.approx(ev.miss_km, abs=1e-4)        # to_dict rounds to 0.1 m
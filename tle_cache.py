@@ -0,0 +1,89 @@
+# tle_cache.py
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+DEFAULT_MAXSIZE = int(os.environ.get("ORBIO_TLE_CACHE_SIZE", "2048"))
+DEFAULT_TTL_S = float(os.environ.get("ORBIO_TLE_CACHE_TTL", "0")) or None  # 0 = never expire
+
+def tle_key(line1: str, line2: str) -> Tuple[str, str]:
+    """Normalised cache key: surrounding whitespace stripped (TLE columns are fixed)."""
+    return (line1.strip(), line2.strip())
+
+_MISSING = object()
+
+class LRUCache:
+    """
+    Bounded, thread-safe LRU map with optional TTL and hit/miss counters.
+    The factory runs outside the lock, so a slow build never blocks readers;
+    two threads racing on the same cold key may both build it (last one wins).
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl_s: Optional[float] = DEFAULT_TTL_S):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive.")
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                stamp, value = item
+                if self.ttl_s is None or now - stamp < self.ttl_s:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
@@ -1,37 +1,21 @@
 # tle_utils.py
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional, Tuple
-from math import sin, cos, pi
+import os
+from typing import List, Optional, Sequence, Tuple, Union
 from datetime import datetime, timezone
-from sgp4.api import Satrec, jday
-
-def _wrap_angle(x: float) -> float:
-    twopi = 2.0 * pi
-    x = x % twopi
-    return x if x >= 0 else x + twopi
-
-def _gmst_rad(jd_ut1: float) -> float:
-    # IAU 1982 GMST approximation (good enough for our use)
-    T = (jd_ut1 - 2451545.0) / 36525.0
-    gmst_sec = (67310.54841
-                + (876600.0 * 3600 + 8640184.812866) * T
-                + 0.093104 * T**2
-                - 6.2e-6 * T**3)
-    return _wrap_angle((gmst_sec % 86400.0) * (2.0 * pi / 86400.0))
-
-def _R3(theta: float):
-    c, s = cos(theta), sin(theta)
-    return (( c,  s, 0.0),
-            (-s,  c, 0.0),
-            (0.0, 0.0, 1.0))
-
-def _matvec3(M, v):
-    return (
-        M[0][0]*v[0] + M[0][1]*v[1] + M[0][2]*v[2],
-        M[1][0]*v[0] + M[1][1]*v[1] + M[1][2]*v[2],
-        M[2][0]*v[0] + M[2][1]*v[1] + M[2][2]*v[2],
-    )
+import numpy as np
+from sgp4.api import Satrec, SatrecArray, jday
+from tle_cache import LRUCache, tle_key
+from frames import from_teme
+from metrics import timed
+
+# Satrec objects keyed by normalised line1/line2 (see tle_cache for env config).
+# Interactive single-object calls use SATREC_CACHE; catalog-sized work (screening,
+# batch / grid propagation) uses BULK_SATREC_CACHE, so one large upload cannot
+# evict the hot entries of interactive clients.
+SATREC_CACHE = LRUCache()
+BULK_SATREC_CACHE = LRUCache(maxsize=int(os.environ.get("ORBIO_BULK_SATREC_CACHE_SIZE", "32768")))
 
 @dataclass
 class TLEParseResult:
@@ -54,34 +38,165 @@ def parse_tle_block(text: str) -> TLEParseResult:
             raise ValueError("Could not find proper TLE Line 1 / Line 2.")
     return TLEParseResult(name=name, line1=l1, line2=l2)
 
-def tle_to_state_km(tle_text: str, when: Optional[datetime] = None) -> Tuple[Tuple[float,float,float], Tuple[float,float,float]]:
+@timed("tle_parse")
+def parse_tle_catalog(text: str) -> List[TLEParseResult]:
+    """Split a multi-object 2LE/3LE text into TLEParseResult records."""
+    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    out: List[TLEParseResult] = []
+    name = None
+    i = 0
+    while i < len(lines):
+        ln = lines[i]
+        if ln.startswith("1 ") and i + 1 < len(lines) and lines[i + 1].startswith("2 "):
+            out.append(TLEParseResult(name=name, line1=ln, line2=lines[i + 1]))
+            name = None
+            i += 2
+            continue
+        name = ln
+        i += 1
+    return out
+
+def norad_id(line1: str) -> str:
+    """Catalog number as written in columns 3-7 (kept as text: Alpha-5 IDs are not ints)."""
+    return line1[2:7].strip()
+
+_ALPHA5 = "ABCDEFGHJKLMNPQRSTUVWXYZ"     # no I or O: A=10 ... Z=33
+
+def norad_number(catnum) -> int:
+    """
+    Integer catalog number from "25544", "A0001" (Alpha-5 = 100001) or an int.
+    - Alpha-5: leading letter gives the ten-thousands (A=10, skipping I and O).
+    """
+    text = str(catnum).strip().upper()
+    if text[:1] in _ALPHA5 and len(text) == 5 and text[1:].isdigit():
+        return (_ALPHA5.index(text[0]) + 10) * 10_000 + int(text[1:])
+    return int(text)
+
+@dataclass
+class CatalogDiff:
+    added: List[TLEParseResult]
+    removed: List[TLEParseResult]
+    changed: List[TLEParseResult]       # new element sets for objects already known
+    superseded: List[TLEParseResult]    # the element sets they replace
+    unchanged: int
+
+    @property
+    def dirty_ids(self) -> set:
+        """NORAD IDs whose previous results can no longer be trusted."""
+        return {norad_id(r.line1) for r in (*self.added, *self.removed, *self.changed)}
+
+    def summary(self) -> dict:
+        return {"added": len(self.added), "removed": len(self.removed),
+                "changed": len(self.changed), "unchanged": self.unchanged}
+
+def diff_catalogs(old: Sequence[TLEParseResult], new: Sequence[TLEParseResult],
+                  invalidate: bool = True) -> CatalogDiff:
+    """
+    Compare two catalogs by NORAD ID. An object is changed when its epoch
+    (line 1 columns 19-32) or any element differs. With invalidate, Satrecs
+    of superseded / removed element sets are evicted from both Satrec caches.
+    """
+    before = {norad_id(r.line1): r for r in old}
+    after = {norad_id(r.line1): r for r in new}
+    added, changed, superseded = [], [], []
+    unchanged = 0
+    for key, rec in after.items():
+        prev = before.get(key)
+        if prev is None:
+            added.append(rec)
+        elif prev.line1[18:32] != rec.line1[18:32] or tle_key(prev.line1, prev.line2) != tle_key(rec.line1, rec.line2):
+            changed.append(rec)
+            superseded.append(prev)
+        else:
+            unchanged += 1
+    removed = [rec for key, rec in before.items() if key not in after]
+    if invalidate:
+        for rec in (*superseded, *removed):
+            key = tle_key(rec.line1, rec.line2)
+            SATREC_CACHE.pop(key)
+            BULK_SATREC_CACHE.pop(key)
+    return CatalogDiff(added=added, removed=removed, changed=changed,
+                       superseded=superseded, unchanged=unchanged)
+
+def satrec_from_lines(line1: str, line2: str, cache: LRUCache = SATREC_CACHE) -> Satrec:
+    """Cached Satrec.twoline2rv; repeated element sets skip SGP4 initialisation."""
+    key = tle_key(line1, line2)
+    return cache.get_or_create(key, lambda: Satrec.twoline2rv(*key))
+
+@timed("propagate_single")
+def tle_to_state_km(tle_text: str, when: Optional[datetime] = None, frame: str = "gcrs") -> Tuple[Tuple[float,float,float], Tuple[float,float,float]]:
     """
-    Convert TLE to ECI-like (x,y,z) km and (vx,vy,vz) km/s.
-    - Propagates with SGP4 in TEME frame.
-    - Rotate TEME->ECI using GMST about Z (sufficient for your distance calc).
+    Convert TLE to (x,y,z) km and (vx,vy,vz) km/s.
+    - Propagates with SGP4 in TEME, then converts via frames.from_teme:
+      "gcrs" (inertial, default), "itrs" (Earth-fixed, velocity includes
+      Earth rotation) or "teme" (raw SGP4 output).
     - By default, evaluate at the TLE epoch (deterministic). Pass 'when' (UTC) to override.
     """
     parsed = parse_tle_block(tle_text)
-    sat = Satrec.twoline2rv(parsed.line1, parsed.line2)
+    sat = satrec_from_lines(parsed.line1, parsed.line2)
 
     if when is None:
-        jd = sat.jdsatepoch + sat.jdsatepochF
-        jd_int = int(jd)
-        jd_frac = jd - jd_int
-        e, r_teme_km, v_teme_km_s = sat.sgp4(jd_int, jd_frac)
-        gmst = _gmst_rad(jd)
+        jd, fr = sat.jdsatepoch, sat.jdsatepochF
     else:
         if when.tzinfo is None:
             when = when.replace(tzinfo=timezone.utc)
         when = when.astimezone(timezone.utc)
         jd, fr = jday(when.year, when.month, when.day, when.hour, when.minute, when.second + when.microsecond/1e6)
-        e, r_teme_km, v_teme_km_s = sat.sgp4(jd, fr)
-        gmst = _gmst_rad(jd + fr)
+    e, r_teme_km, v_teme_km_s = sat.sgp4(jd, fr)
 
     if e != 0:
         raise ValueError(f"SGP4 propagation error code: {e}")
 
-    R = _R3(gmst)
-    r_eci = _matvec3(R, r_teme_km)
-    v_eci = _matvec3(R, v_teme_km_s)
-    return r_eci, v_eci
+    r, v = from_teme(np.array([r_teme_km]), np.array([v_teme_km_s]), jd, fr, frame)
+    return tuple(float(x) for x in r[0]), tuple(float(x) for x in v[0])
+
+_UNIX_EPOCH_JD = 2440587.5  # JD of 1970-01-01T00:00Z
+
+def times_to_jd(times) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split a sequence of UTC instants into sgp4 (jd, fr) arrays.
+    Accepts datetimes (naive = UTC) or a numpy datetime64 array.
+    """
+    arr = np.asarray(times)
+    if np.issubdtype(arr.dtype, np.datetime64):
+        days = arr.astype("datetime64[us]").astype(np.int64) / 86_400e6
+        whole = np.floor(days)
+        return whole + _UNIX_EPOCH_JD, days - whole
+    jd = np.empty(arr.size)
+    fr = np.empty(arr.size)
+    for i, when in enumerate(arr.ravel()):
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        when = when.astimezone(timezone.utc)
+        jd[i], fr[i] = jday(when.year, when.month, when.day, when.hour, when.minute,
+                            when.second + when.microsecond/1e6)
+    return jd, fr
+
+def as_satrec(tle: Union[str, TLEParseResult, Satrec], cache: LRUCache = BULK_SATREC_CACHE) -> Satrec:
+    """Satrec for TLE text, a parsed record or a Satrec (passed through), via `cache`."""
+    if isinstance(tle, Satrec):
+        return tle
+    if isinstance(tle, str):
+        tle = parse_tle_block(tle)
+    return satrec_from_lines(tle.line1, tle.line2, cache)
+
+@timed("propagate_grid")
+def propagate_grid(tles: Sequence[Union[str, TLEParseResult, Satrec]], times,
+                   frame: str = "gcrs") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Propagate many TLEs over many epochs in one SatrecArray call.
+    - tles: TLE text blocks, TLEParseResult or Satrec objects.
+    - times: datetimes / datetime64 array, or a (jd, fr) tuple of arrays.
+    - Returns (r, v), each (n_obj, n_time, 3), in `frame` (see tle_to_state_km).
+      Points where SGP4 fails are NaN.
+    """
+    if isinstance(times, tuple) and len(times) == 2:
+        jd, fr = (np.atleast_1d(np.asarray(x, dtype=float)) for x in times)
+    else:
+        jd, fr = times_to_jd(times)
+    sats = SatrecArray([as_satrec(t) for t in tles])
+    e, r, v = sats.sgp4(jd, fr)
+    bad = e != 0
+    r[bad] = np.nan
+    v[bad] = np.nan
+    return from_teme(r, v, jd, fr, frame)